@@ -85,6 +85,20 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Background workers (document previews, quote documents) write from their
+        # own threads while requests run. Every atomic() block in PlaterBuilder
+        # reads before it writes, and select_for_update() is a no-op on SQLite,
+        # so a DEFERRED transaction that meets a worker's write fails at once
+        # with "database is locked": SQLite does not retry a lock upgrade.
+        # IMMEDIATE takes the write lock at BEGIN, where the busy timeout does
+        # apply. It only changes explicit transactions; reads in autocommit
+        # never take the lock. The timeout covers the longest writers, a
+        # budget rebuild or controls regeneration on a large line, which can
+        # hold the lock for longer than the default 5 seconds.
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
     }
 }
 
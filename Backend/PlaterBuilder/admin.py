@@ -1,13 +1,24 @@
 from django.contrib import admin
-from .models import (Projects, Customers, ProductionGoal,
-                     SimulationParameters, SimulationResult, Station, Recipe, RecipeStep)
+from .models import (Projects, Customers, ProductionGoal, ProductionCalendar,
+                     SimulationParameters, SimulationResult, Station, Recipe, RecipeStep,
+                     Element, Part_Size, StoredDocument, UploadSession, ProcessParameter, ControlPoint,
+                     Budget, BudgetLine, Quote)
 
 admin.site.register(Projects)
 admin.site.register(Customers)
 admin.site.register(ProductionGoal)
+admin.site.register(ProductionCalendar)
 admin.site.register(SimulationParameters)
 admin.site.register(SimulationResult)
 admin.site.register(Station)
 admin.site.register(Recipe)
 admin.site.register(RecipeStep)
-
+admin.site.register(Element)
+admin.site.register(Part_Size)
+admin.site.register(StoredDocument)
+admin.site.register(UploadSession)
+admin.site.register(ProcessParameter)
+admin.site.register(ControlPoint)
+admin.site.register(Budget)
+admin.site.register(BudgetLine)
+admin.site.register(Quote)
@@ -0,0 +1,254 @@
+"""
+Equipment budget rolled up from the line definition.
+
+Costed items are BudgetLine rows:
+
+* tanks: per process station, parallel tanks x (base + volume x cost per m³);
+* rectifiers: per plating station, one per tank, sized for the largest
+  rack current of any step there (rectifier current, or current density
+  x plated area x the parts per rack the recipe's rack can hold, see
+  rack_packing.recipe_rack_loads);
+* hoists: the manual or calculated hoist count per process line, plus the
+  transfer shuttle. Until a count has been calculated the line is costed
+  at one hoist and marked unresolved; the budget never runs a simulation;
+* controls: the I/O points of the controls matrix.
+
+Budget keeps a cached total per category. Signals (see signals.py)
+recompute only the lines a change affects: a station or step edit
+revisits the stations involved, and a parameter, recipe or part size edit
+the hoists or rectifiers. A tank size edit also revisits the rectifiers,
+since it can change how many parts fit on a rack. Bulk writers that bypass signals recost what
+they change themselves (see services.apply_goal_seek). The difference is added to the totals with an F() update.
+The controls line follows the lazily generated controls matrix and is
+checked when the budget is read. Reading the budget then takes a fixed
+handful of queries, however long the line is.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Avg, F, Q, Sum
+
+from .controls_matrix import controls_stale, regenerate_controls_matrix
+from .models import (Budget, BudgetLine, ControlPoint, Recipe, RecipeStep, SimulationParameters, Station)
+from .rack_packing import recipe_rack_loads
+
+CATEGORIES = ('tanks', 'rectifiers', 'hoists', 'controls')
+
+
+def _line(category, key, description, quantity, unit_cost):
+    return {'category': category, 'key': key, 'description': description,
+            'quantity': quantity, 'unit_cost': round(unit_cost, 2), 'amount': round(quantity * unit_cost, 2)}
+
+
+def _parameters(project):
+    try:
+        return project.simulation_parameters
+    except SimulationParameters.DoesNotExist:
+        return None
+
+
+def tank_line(budget, station):
+    """Cost of a station's tanks; loading and unloading stations have none."""
+    if station.is_loading_station or station.is_unloading_station:
+        return None
+    volume = (station.tank_length or 0) * (station.tank_width or 0) * budget.tank_depth
+    unit_cost = budget.tank_base_cost + budget.tank_cost_per_m3 * volume
+    return _line('tanks', f'station:{station.id}',
+                 f"Tank {station.station_number} {station.process_name} ({volume:.2f} m³)",
+                 max(1, station.parallel_tanks or 1), unit_cost)
+
+
+def rack_currents(project, station_ids=None):
+    """Largest rack current in amps per plating station (0 where no current is known)."""
+    steps = (RecipeStep.objects.filter(recipe__project=project)
+             .filter(Q(element__isnull=False) | Q(current_density__isnull=False)
+                     | Q(rectifier_current__isnull=False)))
+    if station_ids is not None:
+        steps = steps.filter(station_id__in=station_ids)
+    rows = list(steps.values_list('recipe_id', 'station_id', 'current_density', 'rectifier_current',
+                                  'recipe__part_size__plated_area'))
+    loads = recipe_rack_loads(Recipe.objects.filter(id__in={row[0] for row in rows})
+                              .select_related('part_size').prefetch_related('steps__station'),
+                              _parameters(project))
+    currents = defaultdict(float)
+    for recipe_id, station_id, density, rectifier, area in rows:
+        if rectifier:
+            current = rectifier
+        elif density and area:
+            current = density * 100 * area * loads[recipe_id]  # A/dm² -> A/m²
+        else:
+            current = 0.0
+        currents[station_id] = max(currents[station_id], current)
+    return currents
+
+
+def rectifier_line(budget, station, current):
+    unit_cost = budget.rectifier_base_cost + budget.rectifier_cost_per_amp * current
+    return _line('rectifiers', f'station:{station.id}',
+                 f"Rectifier {station.station_number} ({current:.0f} A)",
+                 max(1, station.parallel_tanks or 1), unit_cost)
+
+
+def hoist_lines(budget, project):
+    params = _parameters(project)
+    lines_count = max(1, params.process_lines) if params else 1
+    hoists = (params.manual_hoist_count or params.calculated_hoist_count) if params else None
+    source = 'manual' if params and params.manual_hoist_count else 'calculated'
+    if not hoists or hoists <= 0:
+        # Costed at the minimum until the simulation parameters are saved
+        hoists, source = 1, 'unresolved'
+    lines = [_line('hoists', 'line', f"Hoists ({hoists} per line, {source})", hoists * lines_count, budget.hoist_cost)]
+    if params and params.has_transfer_shuttle:
+        lines.append(_line('hoists', 'shuttle', "Transfer shuttle", 1, budget.shuttle_cost))
+    return lines
+
+
+def controls_line(budget, io_points):
+    return _line('controls', 'line', f"Controls I/O ({io_points} points)", io_points, budget.control_point_cost)
+
+
+def io_points(project):
+    """Total controls I/O, regenerating the controls matrix first if the line changed."""
+    if controls_stale(project):
+        regenerate_controls_matrix(project)
+    return ControlPoint.objects.filter(project=project).aggregate(total=Sum('quantity'))['total'] or 0
+
+
+def _apply(budget, scope, lines):
+    """
+    Replace the lines in ``scope`` (category, key) pairs with ``lines`` and
+    add each category's change to the cached totals.
+    """
+    keys = {key for _, key in scope}
+    categories = {category for category, _ in scope}
+    existing = {(line.category, line.key): line for line in BudgetLine.objects.filter(
+        project_id=budget.project_id, category__in=categories, key__in=keys)}
+    existing = {pair: line for pair, line in existing.items() if pair in scope}
+    deltas = defaultdict(float)
+    to_create, to_update = [], []
+    for values in lines:
+        line = existing.pop((values['category'], values['key']), None)
+        if line is None:
+            to_create.append(BudgetLine(project_id=budget.project_id, **values))
+        else:
+            deltas[values['category']] -= line.amount
+            for field, value in values.items():
+                setattr(line, field, value)
+            to_update.append(line)
+        deltas[values['category']] += values['amount']
+    for line in existing.values():
+        deltas[line.category] -= line.amount
+
+    with transaction.atomic():
+        if existing:
+            BudgetLine.objects.filter(id__in=[line.id for line in existing.values()]).delete()
+        BudgetLine.objects.bulk_create(to_create)
+        BudgetLine.objects.bulk_update(to_update, ['description', 'quantity', 'unit_cost', 'amount'])
+        changed = {f'{category}_total': F(f'{category}_total') + delta
+                   for category, delta in deltas.items() if delta}
+        if changed:
+            Budget.objects.filter(pk=budget.pk).update(**changed)
+
+
+def rebuild_budget(budget):
+    """Cost every line of the project from scratch and reset the totals."""
+    project = budget.project
+    stations = list(Station.objects.filter(project=project))
+    currents = rack_currents(project)
+    lines = [line for line in (tank_line(budget, station) for station in stations) if line]
+    lines += [rectifier_line(budget, station, currents[station.id]) for station in stations if station.id in currents]
+    lines += hoist_lines(budget, project)
+    lines.append(controls_line(budget, io_points(project)))
+
+    totals = defaultdict(float)
+    for values in lines:
+        totals[values['category']] += values['amount']
+    with transaction.atomic():
+        BudgetLine.objects.filter(project=project).delete()
+        BudgetLine.objects.bulk_create([BudgetLine(project=project, **values) for values in lines])
+        Budget.objects.filter(pk=budget.pk).update(
+            **{f'{category}_total': round(totals[category], 2) for category in CATEGORIES})
+    budget.refresh_from_db()
+    return budget
+
+
+def refresh_stations(budget, stations, deleted=False):
+    """Recost the tanks and rectifiers of some stations."""
+    scope = {(category, f'station:{station.id}') for station in stations for category in ('tanks', 'rectifiers')}
+    lines = []
+    if not deleted:
+        currents = rack_currents(budget.project, [station.id for station in stations])
+        for station in stations:
+            tank = tank_line(budget, station)
+            if tank:
+                lines.append(tank)
+            if station.id in currents:
+                lines.append(rectifier_line(budget, station, currents[station.id]))
+    _apply(budget, scope, lines)
+
+
+def refresh_station(budget, station, deleted=False):
+    """Recost one station's tank and rectifier."""
+    refresh_stations(budget, [station], deleted)
+
+
+def refresh_rectifiers(budget):
+    """Recost every rectifier, e.g. after parts per rack or a part's plated area changed."""
+    project = budget.project
+    stations = {station.id: station for station in Station.objects.filter(project=project)}
+    currents = rack_currents(project)
+    scope = {('rectifiers', key) for key in BudgetLine.objects.filter(
+        project=project, category='rectifiers').values_list('key', flat=True)}
+    scope |= {('rectifiers', f'station:{station_id}') for station_id in currents}
+    lines = [rectifier_line(budget, stations[station_id], current)
+             for station_id, current in currents.items() if station_id in stations]
+    _apply(budget, scope, lines)
+
+
+def refresh_hoists(budget):
+    _apply(budget, {('hoists', 'line'), ('hoists', 'shuttle')}, hoist_lines(budget, budget.project))
+
+
+def refresh_controls(budget):
+    """
+    Recost the controls I/O if it changed. Controls points are generated
+    lazily, so this runs on read rather than from the signals.
+    """
+    points = io_points(budget.project)
+    current = BudgetLine.objects.filter(project_id=budget.project_id, category='controls', key='line').first()
+    if current is None or current.quantity != points or current.unit_cost != round(budget.control_point_cost, 2):
+        _apply(budget, {('controls', 'line')}, [controls_line(budget, points)])
+
+
+def get_budget(project):
+    """The project's budget, created and costed in full on first use."""
+    budget = Budget.objects.filter(project=project).first()
+    if budget is None:
+        budget = rebuild_budget(Budget.objects.create(project=project))
+    return budget
+
+
+def budget_summary(budget):
+    lines = list(BudgetLine.objects.filter(project_id=budget.project_id)
+                 .values('category', 'key', 'description', 'quantity', 'unit_cost', 'amount'))
+    categories = {category: round(getattr(budget, f'{category}_total'), 2) for category in CATEGORIES}
+    subtotal = sum(categories.values())
+    contingency = subtotal * budget.contingency_pct / 100
+    return {
+        'categories': categories,
+        'subtotal': round(subtotal, 2),
+        'contingency_pct': budget.contingency_pct,
+        'contingency': round(contingency, 2),
+        'total': round(subtotal + contingency, 2),
+        'lines': lines,
+    }
+
+
+def goal_seek_costs(project):
+    """Hoist and average tank cost from the budget, for ranking goal-seek options."""
+    budget = Budget.objects.filter(project=project).first()
+    if budget is None:
+        return {}
+    tank = (BudgetLine.objects.filter(project=project, category='tanks')
+            .aggregate(avg=Avg('unit_cost'))['avg']) or budget.tank_base_cost
+    return {'hoist': budget.hoist_cost, 'tank': tank}
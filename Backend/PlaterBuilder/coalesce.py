@@ -0,0 +1,201 @@
+"""
+Single-flight coalescing of identical concurrent computations.
+
+Several users opening the same project fire the same simulation requests
+at the same moment. ``single_flight(key, compute)`` runs ``compute`` once
+for all callers that ask for the same key while it is running. Every
+caller gets the same result, or the same exception.
+
+* Within a process, the first caller for a key computes and the others
+  wait on an event.
+* Across processes (several server workers), that first caller also takes
+  an exclusive lock on a lock file. A process that finds the lock held
+  leaves a marker file for its key and then waits for the lock. If the
+  marker is there when the computing process finishes, that process writes
+  its result, stamped with the time it finished, next to the lock file.
+  With no marker nothing is written. A process that was waiting reads the
+  result instead of computing again, but only if it was written after the
+  process started waiting: the computation was in flight when its request
+  arrived. An older result is never reused, so this is not a cache. File
+  locking needs fcntl; where it is missing, coalescing is per process only.
+
+Lock files are shared by keys in a fixed number of slots and are never
+removed. Removing a lock file that another process has open would let
+two processes hold "the" lock at once.
+
+Keys include ``project_fingerprint``, which changes whenever the line is
+edited (see signals.py and the bulk writers that call
+``bump_line_version``). A request made after an edit therefore never
+joins a computation that started before it. Results shared across
+processes must be JSON-serialisable. The computing caller returns its
+result as it comes back from JSON too, so every caller sees the same
+types (lists rather than tuples, ISO strings rather than datetimes).
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import F
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import Projects
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+# Keys hash into this many lock files
+LOCK_SLOTS = 256
+# Result files untouched for this long are removed
+STALE_FILE_SECONDS = 3600
+PRUNE_EVERY = 100
+
+_lock = threading.Lock()
+# key -> _Flight for computations running in this process
+_flights = {}
+_writes = 0
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def project_fingerprint(project):
+    """Identifies the state of the project's line; changes on every edit."""
+    return f'{project.pk}@v{project.line_version}'
+
+
+def bump_line_version(project_id):
+    """Mark the project's line as changed, giving it a new fingerprint."""
+    Projects.objects.filter(pk=project_id).update(line_version=F('line_version') + 1)
+
+
+def _directory():
+    directory = os.path.join(
+        getattr(settings, 'FILE_UPLOAD_TEMP_DIR', None) or tempfile.gettempdir(),
+        'platerbuilder-coalesce')
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def _paths(key):
+    """
+    The key's lock file (shared with other keys in its slot), its own
+    result file and the marker that says another process is waiting for it.
+    """
+    digest = hashlib.sha256(key.encode()).hexdigest()
+    directory = _directory()
+    return (os.path.join(directory, f'slot-{int(digest[:8], 16) % LOCK_SLOTS}.lock'),
+            os.path.join(directory, f'{digest[:32]}.json'),
+            os.path.join(directory, f'{digest[:32]}.waiting'))
+
+
+def _prune():
+    """Remove result files of keys not used for a while; every edit leaves a new key behind."""
+    cutoff = time.time() - STALE_FILE_SECONDS
+    with os.scandir(_directory()) as entries:
+        for entry in entries:
+            if entry.name.endswith('.lock'):
+                continue
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except OSError:
+                pass
+
+
+def _read_shared(path, since):
+    """The result in ``path`` if it was written at or after ``since``, else None."""
+    try:
+        with open(path, encoding='utf-8') as fh:
+            shared = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(shared, dict) or shared.get('written', 0) < since:
+        return None
+    return shared
+
+
+def _encode(result):
+    """The result file contents for ``result``, or None if it is not JSON-serialisable."""
+    try:
+        return json.dumps({'written': time.time(), 'result': result}, cls=JSONEncoder)
+    except (TypeError, ValueError):
+        return None
+
+
+def _write_shared(path, encoded):
+    partial = f'{path}.{os.getpid()}.tmp'
+    with open(partial, 'w', encoding='utf-8') as fh:
+        fh.write(encoded)
+    os.replace(partial, path)
+
+    global _writes
+    _writes += 1
+    if _writes % PRUNE_EVERY == 0:
+        _prune()
+
+
+def _compute_across_processes(key, compute):
+    if fcntl is None:
+        return compute()
+    lock_path, result_path, waiting_path = _paths(key)
+    arrived = time.time()
+    with open(lock_path, 'a') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            waited = False
+        except BlockingIOError:
+            # Tell the process holding the lock that a result is wanted here
+            open(waiting_path, 'a').close()
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            waited = True
+        try:
+            if waited:
+                # Only a result finished while this request waited was in flight for it
+                shared = _read_shared(result_path, arrived)
+                if shared is not None:
+                    return shared['result']
+            result = compute()
+            encoded = _encode(result)
+            if encoded is None:
+                return result
+            if os.path.exists(waiting_path):
+                _write_shared(result_path, encoded)
+                os.remove(waiting_path)
+            return json.loads(encoded)['result']
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def single_flight(key, compute):
+    """Run ``compute()`` once for concurrent callers with the same ``key``."""
+    with _lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+    if not leader:
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    try:
+        flight.result = _compute_across_processes(key, compute)
+    except Exception as exc:
+        flight.error = exc
+        raise
+    finally:
+        with _lock:
+            del _flights[key]
+        flight.done.set()
+    return flight.result
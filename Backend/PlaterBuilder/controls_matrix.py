@@ -0,0 +1,301 @@
+"""
+Controls I/O matrix generated from the line model.
+
+Each station is reduced to a set of facts:
+
+* ``always``, for every station;
+* ``flag:<name>``, for its set boolean flags;
+* ``keyword:<group>``, from words in its process name (rinse, dry, ...);
+* ``param:<name>``, for process matrix parameters set at the station;
+* ``chemistry``, counted once per chem:* parameter;
+* ``plating``, if any recipe plates at the station.
+
+RULES maps facts to the devices and I/O they imply. The table is compiled
+once, at import, into a fact -> rules index and a single keyword regex.
+A station's points are then a few dictionary lookups. Hoist and shuttle
+axes come from the simulation parameters.
+
+Regeneration reads the whole line in a fixed number of queries and
+replaces the generated points in one transaction. Manual points are kept,
+and a manual point with the same tag suppresses the generated one. The
+project records the line version the points were built from. Line edits
+only bump the line version (see signals.py and coalesce.bump_line_version),
+and the next read in any worker sees the mismatch and regenerates once, so
+editing a 100-station line costs no per-station recomputation.
+"""
+import re
+from collections import Counter, defaultdict, namedtuple
+
+from django.db import transaction
+from django.db.models import Q
+
+from .models import ControlPoint, ProcessParameter, Projects, RecipeStep, SimulationParameters, Station
+
+Rule = namedtuple('Rule', 'key code device io_type quantity triggers unless per_tank counted')
+
+
+def _rule(key, code, device, io_type, triggers, quantity=1, unless=(), per_tank=True, counted=False):
+    return Rule(key, code, device, io_type, quantity, tuple(triggers), tuple(unless), per_tank, counted)
+
+
+STATION_FLAGS = ('is_loading_station', 'is_unloading_station', 'requires_manual_handling')
+OPERATOR_FLAGS = ('flag:is_loading_station', 'flag:is_unloading_station')
+
+# Words in a station's process name that imply equipment
+KEYWORDS = {
+    'heated': ('clean', 'degreas', 'soak', 'seal', 'hot', 'heated'),
+    'rinse': ('rinse',),
+    'dry': ('dry', 'dryer', 'oven'),
+    'fume': ('etch', 'pickl', 'acid', 'strip', 'chrom'),
+    'agitated': ('agitat', 'air'),
+}
+
+RULES = (
+    _rule('hoist_position', 'ZS', 'Hoist position target', 'DI', ['always']),
+    _rule('level_low', 'LSL', 'Tank level switch (low)', 'DI', ['always'], unless=OPERATOR_FLAGS),
+    _rule('temperature', 'TT', 'Temperature transmitter', 'AI', ['param:temperature', 'keyword:heated', 'keyword:dry']),
+    _rule('heater', 'HTR', 'Heater contactor', 'DO', ['param:temperature', 'keyword:heated', 'keyword:dry']),
+    _rule('rectifier_setpoint', 'RECT-SP', 'Rectifier current setpoint', 'AO', ['plating']),
+    _rule('rectifier_feedback', 'RECT-FB', 'Rectifier current and voltage feedback', 'AI', ['plating'], quantity=2),
+    _rule('rectifier_enable', 'RECT-EN', 'Rectifier enable', 'DO', ['plating']),
+    _rule('rectifier_fault', 'RECT-F', 'Rectifier fault', 'DI', ['plating']),
+    _rule('ph', 'AT-PH', 'pH transmitter', 'AI', ['param:ph']),
+    _rule('agitation', 'AG', 'Agitation blower / pump', 'DO', ['param:agitation', 'keyword:agitated']),
+    _rule('dosing', 'DP', 'Chemistry dosing pump', 'DO', ['chemistry'], counted=True),
+    _rule('rinse_valve', 'XV', 'Rinse water inlet valve', 'DO', ['keyword:rinse']),
+    _rule('conductivity', 'AT-C', 'Rinse conductivity transmitter', 'AI', ['keyword:rinse']),
+    _rule('dryer_blower', 'BLW', 'Dryer blower', 'DO', ['keyword:dry']),
+    _rule('exhaust', 'EXH', 'Fume exhaust fan', 'DO', ['keyword:fume'], per_tank=False),
+    _rule('operator_ready', 'HS', 'Operator ready pushbutton', 'DI', OPERATOR_FLAGS, per_tank=False),
+    _rule('operator_beacon', 'XL', 'Operator beacon', 'DO', OPERATOR_FLAGS, per_tank=False),
+    _rule('light_curtain', 'LC', 'Safety light curtain', 'DI', ['flag:requires_manual_handling'],
+          quantity=2, per_tank=False),
+)
+
+# Per hoist (tag H<n>-<code>) and for the transfer shuttle (SH-<code>)
+HOIST_POINTS = (
+    ('X', 'Travel drive', 'FB', 1),
+    ('Z', 'Lift drive', 'FB', 1),
+    ('LS', 'Travel and lift limit switches', 'DI', 4),
+    ('ES', 'Emergency stop', 'DI', 1),
+)
+ANTI_COLLISION_POINT = ('AC', 'Anti-collision sensor', 'DI', 1)
+SHUTTLE_POINTS = (
+    ('Y', 'Shuttle drive', 'FB', 1),
+    ('LS', 'Shuttle limit switches', 'DI', 2),
+)
+
+
+CompiledRules = namedtuple('CompiledRules', 'by_fact keyword_pattern')
+
+
+def compile_rules(rules, keywords):
+    """Index rules by triggering fact and fold the keyword table into one regex."""
+    by_fact = defaultdict(list)
+    for rule in rules:
+        for fact in rule.triggers:
+            by_fact[fact].append(rule)
+    # Words match at the start of a word: "rinse" in "Cold Rinse", not "air" in "repair"
+    pattern = re.compile('|'.join(
+        f"(?P<{group}>\\b(?:{'|'.join(re.escape(word) for word in words)}))"
+        for group, words in keywords.items()), re.IGNORECASE)
+    return CompiledRules({fact: tuple(matched) for fact, matched in by_fact.items()}, pattern)
+
+
+COMPILED = compile_rules(RULES, KEYWORDS)
+
+
+def controls_stale(project):
+    """Whether the line changed since its points were last generated."""
+    line_version, controls_version = (Projects.objects.filter(pk=project.pk)
+                                      .values_list('line_version', 'controls_version').get())
+    return controls_version != line_version
+
+
+def invalidate_controls_matrix(project_pk):
+    """Regenerate on the next read although the line itself did not change."""
+    Projects.objects.filter(pk=project_pk).update(controls_version=None)
+
+
+def _line_facts(project, stations):
+    """Counter of facts per station id, from two queries for the whole line."""
+    facts = {}
+    for station in stations:
+        counter = Counter({'always': 1})
+        for flag in STATION_FLAGS:
+            if getattr(station, flag):
+                counter[f'flag:{flag}'] = 1
+        for match in COMPILED.keyword_pattern.finditer(station.process_name or ''):
+            counter[f'keyword:{match.lastgroup}'] = 1
+        facts[station.id] = counter
+
+    for station_id, parameter in (ProcessParameter.objects.filter(project=project)
+                                  .values_list('station_id', 'parameter').distinct()):
+        counter = facts.get(station_id)
+        if counter is None:
+            continue
+        if parameter.startswith('chem:'):
+            counter['chemistry'] += 1
+        elif parameter in ('current_density', 'rectifier_current', 'element'):
+            counter['plating'] = 1
+        else:
+            counter[f'param:{parameter}'] = 1
+
+    plating = (RecipeStep.objects.filter(recipe__project=project)
+               .filter(Q(element__isnull=False) | Q(current_density__isnull=False)
+                       | Q(rectifier_current__isnull=False))
+               .values_list('station_id', flat=True).distinct())
+    for station_id in plating:
+        if station_id in facts:
+            facts[station_id]['plating'] = 1
+    return facts
+
+
+def station_points(station, facts):
+    """Generated ControlPoints for one station from its facts (no queries)."""
+    rules = {}
+    for fact in facts:
+        for rule in COMPILED.by_fact.get(fact, ()):
+            rules[rule.key] = rule
+    points = []
+    for rule in rules.values():
+        if any(fact in facts for fact in rule.unless):
+            continue
+        quantity = rule.quantity
+        if rule.counted:
+            quantity *= sum(facts[fact] for fact in rule.triggers)
+        if rule.per_tank:
+            quantity *= max(1, station.parallel_tanks or 1)
+        points.append(ControlPoint(
+            project_id=station.project_id, station=station, tag=f'{station.station_number}-{rule.code}',
+            device=rule.device, io_type=rule.io_type, quantity=quantity, rule=rule.key,
+            source='generated'))
+    return points
+
+
+def line_points(project, params):
+    """Generated ControlPoints for the hoists and transfer shuttle."""
+    hoists = 1
+    shuttle = False
+    if params is not None:
+        hoists = max(1, params.manual_hoist_count or params.calculated_hoist_count or 1) * max(1, params.process_lines)
+        shuttle = params.has_transfer_shuttle
+    points = []
+    for hoist in range(1, hoists + 1):
+        specs = HOIST_POINTS + ((ANTI_COLLISION_POINT,) if hoists > 1 else ())
+        for code, device, io_type, quantity in specs:
+            points.append(ControlPoint(project=project, tag=f'H{hoist}-{code}', device=f'Hoist {hoist} {device.lower()}',
+                                       io_type=io_type, quantity=quantity, rule='hoist', source='generated'))
+    if shuttle:
+        for code, device, io_type, quantity in SHUTTLE_POINTS:
+            points.append(ControlPoint(project=project, tag=f'SH-{code}', device=device, io_type=io_type,
+                                       quantity=quantity, rule='shuttle', source='generated'))
+    return points
+
+
+def regenerate_controls_matrix(project):
+    """Rebuild every generated point of the project in one transaction."""
+    # Read before the line: an edit made meanwhile leaves the points stale
+    line_version = Projects.objects.values_list('line_version', flat=True).get(pk=project.pk)
+    stations = list(Station.objects.filter(project=project).order_by('position_index'))
+    facts = _line_facts(project, stations)
+    try:
+        params = project.simulation_parameters
+    except SimulationParameters.DoesNotExist:
+        params = None
+
+    points = line_points(project, params)
+    for station in stations:
+        points.extend(station_points(station, facts[station.id]))
+
+    with transaction.atomic():
+        ControlPoint.objects.filter(project=project, source='generated').delete()
+        manual_tags = set(ControlPoint.objects.filter(project=project).values_list('tag', flat=True))
+        points = [point for point in points if point.tag not in manual_tags]
+        ControlPoint.objects.bulk_create(points, batch_size=1000)
+        Projects.objects.filter(pk=project.pk).update(controls_version=line_version)
+    return len(points)
+
+
+def controls_matrix(project, regenerate=False):
+    """The project's I/O points and totals per I/O type, regenerated first if stale."""
+    regenerated = regenerate or controls_stale(project)
+    if regenerated:
+        regenerate_controls_matrix(project)
+    points = list(ControlPoint.objects.filter(project=project)
+                  .order_by('station__position_index', 'tag')
+                  .values('id', 'station_id', 'station__station_number', 'tag', 'device', 'io_type',
+                          'quantity', 'description', 'rule', 'source'))
+    totals = Counter()
+    for point in points:
+        totals[point['io_type']] += point['quantity']
+        point['station_number'] = point.pop('station__station_number')
+    return {
+        'points': points,
+        'io_totals': {io_type: totals.get(io_type, 0) for io_type, _ in ControlPoint.IO_TYPE_CHOICES},
+        'total_io': sum(totals.values()),
+        'regenerated': regenerated,
+    }
+
+
+def upsert_manual_points(project, points):
+    """
+    Bulk write manual points by tag. A point with quantity 0 is removed.
+    Manual points survive regeneration and replace generated ones.
+    """
+    if not isinstance(points, list):
+        return {"error": "points must be a list"}
+    io_types = {io_type for io_type, _ in ControlPoint.IO_TYPE_CHOICES}
+    stations = dict(Station.objects.filter(project=project).values_list('station_number', 'id'))
+
+    cleaned = {}
+    for position, point in enumerate(points):
+        if not isinstance(point, dict) or not str(point.get('tag') or '').strip():
+            return {"error": f"points[{position}]: tag is required"}
+        tag = str(point['tag']).strip()[:40]
+        try:
+            quantity = int(point.get('quantity', 1))
+        except (TypeError, ValueError):
+            return {"error": f"points[{position}]: quantity must be an integer"}
+        if quantity < 0:
+            return {"error": f"points[{position}]: quantity cannot be negative"}
+        station = point.get('station_number')
+        if station and station not in stations:
+            return {"error": f"points[{position}]: station {station} is not on this line"}
+        if quantity and point.get('io_type') not in io_types:
+            return {"error": f"points[{position}]: io_type must be one of {', '.join(sorted(io_types))}"}
+        cleaned[tag] = {
+            'quantity': quantity,
+            'station_id': stations.get(station),
+            'device': str(point.get('device') or tag)[:100],
+            'io_type': point.get('io_type') or '',
+            'description': str(point.get('description') or '')[:200],
+        }
+
+    existing = {point.tag: point for point in ControlPoint.objects.filter(project=project, tag__in=list(cleaned))}
+    to_create, to_update, to_delete = [], [], []
+    for tag, values in cleaned.items():
+        point = existing.get(tag)
+        if not values['quantity']:
+            if point is not None:
+                to_delete.append(point.id)
+            continue
+        if point is None:
+            to_create.append(ControlPoint(project=project, tag=tag, source='manual', **values))
+        else:
+            for field, value in values.items():
+                setattr(point, field, value)
+            point.source = 'manual'
+            point.rule = ''
+            to_update.append(point)
+
+    with transaction.atomic():
+        if to_delete:
+            ControlPoint.objects.filter(id__in=to_delete).delete()
+        ControlPoint.objects.bulk_create(to_create, batch_size=1000)
+        ControlPoint.objects.bulk_update(
+            to_update, ['quantity', 'station_id', 'device', 'io_type', 'description', 'source', 'rule'],
+            batch_size=1000)
+    # A removed manual point may uncover a generated one
+    invalidate_controls_matrix(project.pk)
+    return {'created': len(to_create), 'updated': len(to_update), 'deleted': len(to_delete)}
@@ -0,0 +1,127 @@
+"""
+Content-addressed store for project documents.
+
+Each unique file is kept once, at ``documents/blobs/<aa>/<sha256><ext>``,
+with a StoredDocument row that counts the project fields linking to it.
+``Projects.spec_document`` and ``sketch`` hold the blob name, so URLs and
+serializers are unchanged.
+
+Uploads are hashed as they are read, so a file already in the store never
+reaches storage a second time. A client that sends the hash up front skips
+the transfer only for a blob its project already links, e.g. the same file
+as spec and sketch. A hash is not proof that the client holds the content,
+so linking any other project's blob that way would hand it over. Counts change with
+F() updates inside the transaction that relinks the project field. A blob
+whose count drops to zero is deleted, with its preview, once that
+transaction commits. New blobs are queued for a preview (see previews).
+"""
+import hashlib
+import os
+
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import Projects, StoredDocument
+from .previews import schedule_preview
+
+BLOB_DIRECTORY = 'documents/blobs'
+HASH_CHUNK_SIZE = 1024 * 1024
+DOCUMENT_FIELDS = ('spec_document', 'sketch')
+
+
+def blob_name(sha256, filename):
+    ext = os.path.splitext(filename)[1].lower()[:16]
+    return f'{BLOB_DIRECTORY}/{sha256[:2]}/{sha256}{ext}'
+
+
+def hash_file(fh, length=None):
+    """SHA-256 of a file object read in fixed-size pieces, from the start up to ``length`` bytes."""
+    digest = hashlib.sha256()
+    fh.seek(0)
+    remaining = length
+    while remaining is None or remaining > 0:
+        piece = fh.read(HASH_CHUNK_SIZE if remaining is None else min(HASH_CHUNK_SIZE, remaining))
+        if not piece:
+            break
+        digest.update(piece)
+        if remaining is not None:
+            remaining -= len(piece)
+    fh.seek(0)
+    return digest
+
+
+def find_document(sha256, size=None, project=None):
+    """The StoredDocument for a hash, if any. With ``project``, only one that project already links."""
+    documents = StoredDocument.objects.filter(sha256=sha256)
+    if size is not None:
+        documents = documents.filter(size=size)
+    if project is not None:
+        documents = documents.filter(file__in=[name for name in (
+            getattr(project, field).name for field in DOCUMENT_FIELDS) if name])
+    return documents.first()
+
+
+def store_document(content, sha256, size, filename):
+    """
+    The StoredDocument for ``content``, writing the blob only if the hash
+    is new. ``content`` is a django File; storage moves it when it can.
+    """
+    existing = find_document(sha256)
+    if existing is not None:
+        return existing
+    name = blob_name(sha256, filename)
+    stored = default_storage.save(name, content)
+    try:
+        with transaction.atomic():
+            document = StoredDocument.objects.create(sha256=sha256, file=stored, size=size)
+    except IntegrityError:
+        # Another upload of the same content got there first
+        default_storage.delete(stored)
+        return StoredDocument.objects.get(sha256=sha256)
+    transaction.on_commit(lambda: schedule_preview(document))
+    return document
+
+
+def _release(name):
+    """Drop one link to ``name``; delete the blob after commit if it was the last."""
+    documents = StoredDocument.objects.filter(file=name)
+    if not documents.update(ref_count=F('ref_count') - 1):
+        # A file saved before the store existed belongs to this field alone
+        transaction.on_commit(lambda: default_storage.delete(name))
+        return
+    released = documents.filter(ref_count=0)
+    previews = [preview for preview in released.values_list('preview', flat=True) if preview]
+    if released.delete()[0]:
+        for stale in [name, *previews]:
+            transaction.on_commit(lambda stale=stale: default_storage.delete(stale))
+
+
+def link_document(project, field, document):
+    """
+    Point ``project.<field>`` at a stored document. The project row is
+    locked while the old link is released and the new one counted.
+    Raises StoredDocument.DoesNotExist if the blob was released meanwhile.
+    """
+    with transaction.atomic():
+        locked = Projects.objects.select_for_update().get(pk=project.pk)
+        previous = getattr(locked, field).name
+        if previous == document.file.name:
+            return previous
+        if not StoredDocument.objects.filter(pk=document.pk).update(ref_count=F('ref_count') + 1):
+            raise StoredDocument.DoesNotExist(document.sha256)
+        setattr(locked, field, document.file.name)
+        locked.save(update_fields=[field, 'last_updated'])
+        if previous:
+            _release(previous)
+    setattr(project, field, document.file.name)
+    return document.file.name
+
+
+def unlink_documents(project, fields=DOCUMENT_FIELDS):
+    """Release the project's document links, e.g. when the project is deleted."""
+    with transaction.atomic():
+        for field in fields:
+            name = getattr(project, field).name
+            if name:
+                _release(name)
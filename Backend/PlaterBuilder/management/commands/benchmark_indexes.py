@@ -0,0 +1,170 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from PlaterBuilder.models import (Customers, Projects, Station, Recipe, RecipeStep,
+                                  SimulationResult)
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    """
+    Seed a throwaway dataset and compare query plans / latency of the hot
+    simulation lookups with and without the composite indexes.
+
+    Everything runs inside a single transaction that is rolled back, so the
+    database is left untouched.
+    """
+    help = "Benchmark hot simulation queries with and without composite indexes"
+
+    # (model, index name) pairs added in 0006_hot_lookup_indexes
+    BENCH_INDEXES = [
+        (Station, 'station_project_position_idx'),
+        (Recipe, 'recipe_project_active_idx'),
+        (SimulationResult, 'simresult_project_date_idx'),
+    ]
+
+    def add_arguments(self, parser):
+        parser.add_argument('--projects', type=int, default=10000, help="Number of projects to seed")
+        parser.add_argument('--stations', type=int, default=10, help="Stations per project")
+        parser.add_argument('--recipes', type=int, default=3, help="Recipes per project")
+        parser.add_argument('--results', type=int, default=5, help="Simulation results per project")
+        parser.add_argument('--iterations', type=int, default=2000, help="Lookups per query")
+
+    def handle(self, *args, **options):
+        # SQLite only allows DDL inside the transaction if FK checks were
+        # switched off before it started.
+        with connection.constraint_checks_disabled():
+            try:
+                with transaction.atomic():
+                    project_ids = self._seed(options)
+                    self.stdout.write("\n=== Without composite indexes ===")
+                    self._drop_indexes()
+                    before = self._measure(project_ids, options['iterations'])
+                    self._restore_indexes()
+                    self.stdout.write("\n=== With composite indexes ===")
+                    after = self._measure(project_ids, options['iterations'])
+                    self._report(before, after)
+                    raise _Rollback()
+            except _Rollback:
+                pass
+
+    # ------------------------------------------------------------------
+    # Seeding
+    # ------------------------------------------------------------------
+    def _seed(self, options):
+        started = time.perf_counter()
+        n_projects = options['projects']
+        customer = Customers.objects.create(company_name="Benchmark", point_of_contact="bench",
+                                            email="bench@example.com")
+
+        projects = Projects.objects.bulk_create([
+            Projects(project_id=f"B{i:07d}", project_name=f"Bench {i}", customer=customer,
+                     process="bench", substrate="bench")
+            for i in range(n_projects)
+        ], batch_size=2000)
+        if projects[0].pk is None:
+            projects = list(Projects.objects.filter(customer=customer))
+
+        # Insert positions in reverse so physical order differs from insert order
+        Station.objects.bulk_create([
+            Station(project=p, station_number=f"S{s}", process_name=f"Process {s}",
+                    position_index=options['stations'] - s)
+            for p in projects for s in range(options['stations'])
+        ], batch_size=5000)
+        Recipe.objects.bulk_create([
+            Recipe(project=p, name=f"Recipe {r}", production_ratio=r + 1, is_active=(r % 2 == 0))
+            for p in projects for r in range(options['recipes'])
+        ], batch_size=5000)
+
+        stations_by_project = {}
+        for station_id, project_id in Station.objects.filter(project__in=projects).values_list('id', 'project_id'):
+            stations_by_project.setdefault(project_id, []).append(station_id)
+        steps = []
+        for recipe_id, project_id in Recipe.objects.filter(project__in=projects).values_list('id', 'project_id'):
+            for order, station_id in enumerate(stations_by_project[project_id]):
+                steps.append(RecipeStep(recipe_id=recipe_id, station_id=station_id, step_order=order,
+                                        dwell_time=60, drip_time=10))
+        RecipeStep.objects.bulk_create(steps, batch_size=5000)
+
+        results = SimulationResult.objects.bulk_create([
+            SimulationResult(project=p, name=f"Run {n}", parts_per_hour=1, parts_per_day=1,
+                             parts_per_week=1, parts_per_month=1, parts_per_year=1, cycle_time=1,
+                             total_process_time=1, total_transfer_time=1, total_drip_time=1,
+                             hoist_count=1, hoist_utilization=1)
+            for p in projects for n in range(options['results'])
+        ], batch_size=5000)
+
+        self.stdout.write(
+            f"Seeded {len(projects)} projects, {len(projects) * options['stations']} stations, "
+            f"{len(steps)} recipe steps, {len(results)} results "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+        return [p.pk for p in projects]
+
+    # ------------------------------------------------------------------
+    # Index toggling
+    # ------------------------------------------------------------------
+    def _drop_indexes(self):
+        with connection.schema_editor(atomic=False) as editor:
+            for model, name in self.BENCH_INDEXES:
+                editor.remove_index(model, self._index(model, name))
+
+    def _restore_indexes(self):
+        with connection.schema_editor(atomic=False) as editor:
+            for model, name in self.BENCH_INDEXES:
+                editor.add_index(model, self._index(model, name))
+
+    @staticmethod
+    def _index(model, name):
+        return next(index for index in model._meta.indexes if index.name == name)
+
+    # ------------------------------------------------------------------
+    # Measurement
+    # ------------------------------------------------------------------
+    QUERIES = {
+        'stations by position': lambda project_pk, recipe_pk:
+            Station.objects.filter(project_id=project_pk).order_by('position_index'),
+        'active recipes': lambda project_pk, recipe_pk:
+            Recipe.objects.filter(project_id=project_pk, is_active=True),
+        'recipe steps by order': lambda project_pk, recipe_pk:
+            RecipeStep.objects.filter(recipe_id=recipe_pk).order_by('step_order'),
+        'results by date': lambda project_pk, recipe_pk:
+            SimulationResult.objects.filter(project_id=project_pk).order_by('-simulation_date'),
+    }
+
+    def _measure(self, project_ids, iterations):
+        # Refresh planner statistics so re-created indexes are costed properly
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+        sample = random.Random(42).choices(project_ids, k=iterations)
+        first_recipe = {}
+        for recipe_pk, project_pk in Recipe.objects.filter(project_id__in=set(sample)).values_list('id', 'project_id'):
+            first_recipe.setdefault(project_pk, recipe_pk)
+        lookups = [(pk, first_recipe[pk]) for pk in sample]
+
+        timings = {}
+        for label, build in self.QUERIES.items():
+            self.stdout.write(f"-- {label}\n{build(*lookups[0]).explain()}")
+            for lookup in lookups[:100]:
+                list(build(*lookup))
+            querysets = [build(*lookup) for lookup in lookups]
+            started = time.perf_counter()
+            for qs in querysets:
+                list(qs)
+            timings[label] = (time.perf_counter() - started) / iterations * 1000
+        return timings
+
+    def _report(self, before, after):
+        self.stdout.write("\n=== Mean latency per lookup (ms) ===")
+        self.stdout.write(f"{'query':<24}{'before':>10}{'after':>10}{'speedup':>10}")
+        for label, before_ms in before.items():
+            after_ms = after[label]
+            speedup = before_ms / after_ms if after_ms else 0
+            self.stdout.write(f"{label:<24}{before_ms:>10.3f}{after_ms:>10.3f}{speedup:>9.1f}x")
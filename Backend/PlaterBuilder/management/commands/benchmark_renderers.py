@@ -0,0 +1,134 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+
+from PlaterBuilder.models import Customers, Projects, Recipe, RecipeStep, SimulationResult, Station
+from PlaterBuilder.renderers import FastJSONRenderer, orjson
+from PlaterBuilder.serializers import (RECIPE_STEP_VALUES, SIMULATION_SUMMARY_VALUES, SIMULATION_VALUES,
+                                       STATION_VALUES, RecipeSerializer, RecipeStepSerializer,
+                                       SimulationResultSerializer, StationSerializer, recipe_tree)
+
+
+class _Rollback(Exception):
+    pass
+
+
+class _SimulationSummarySerializer(serializers.ModelSerializer):
+    # What SIMULATION_SUMMARY_VALUES returns, the ModelSerializer way
+    class Meta:
+        model = SimulationResult
+        exclude = ('station_utilization', 'recipe_results')
+
+
+class Command(BaseCommand):
+    """
+    Seed one large throwaway project and compare the read endpoints'
+    ModelSerializer + JSONRenderer path with the values() + FastJSONRenderer
+    fast path: query, serialize and render, as the views do. Both outputs
+    are checked to decode to the same data.
+
+    Everything runs inside a single transaction that is rolled back, so the
+    database is left untouched.
+    """
+    help = "Benchmark the fast JSON read path against DRF serializers"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stations', type=int, default=300, help="Stations in the project")
+        parser.add_argument('--steps', type=int, default=300, help="Steps in the benchmarked recipe")
+        parser.add_argument('--results', type=int, default=500, help="Simulation results in the history")
+        parser.add_argument('--iterations', type=int, default=20, help="Renders per endpoint and path")
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                project, recipe = self._seed(options)
+                self._report(self._measure(project, recipe, options['iterations']))
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+    def _seed(self, options):
+        customer = Customers.objects.create(company_name="Benchmark", point_of_contact="bench",
+                                            email="bench@example.com")
+        project = Projects.objects.create(project_id="BENCHJSON", project_name="Bench", customer=customer,
+                                          process="bench", substrate="bench")
+        stations = Station.objects.bulk_create([
+            Station(project=project, station_number=f"S{s}", process_name=f"Process {s}", position_index=s,
+                    tank_length=1.5, tank_width=0.8, notes="")
+            for s in range(options['stations'])
+        ])
+        if stations[0].pk is None:
+            stations = list(Station.objects.filter(project=project).order_by('position_index'))
+        recipe = Recipe.objects.create(project=project, name="Bench recipe")
+        RecipeStep.objects.bulk_create([
+            RecipeStep(recipe=recipe, station=stations[n % len(stations)], step_order=n, dwell_time=60,
+                       drip_time=10, current_density=2.5)
+            for n in range(options['steps'])
+        ])
+        SimulationResult.objects.bulk_create([
+            SimulationResult(project=project, name=f"Run {n}", parts_per_hour=12.5, parts_per_day=300,
+                             parts_per_week=1500, parts_per_month=6500, parts_per_year=78000,
+                             cycle_time=288.0, total_process_time=4000, total_transfer_time=600,
+                             total_drip_time=200, hoist_count=2, hoist_utilization=81.5,
+                             bottleneck_station="S3", recommendations="Add a parallel tank at S3")
+            for n in range(options['results'])
+        ])
+        return project, recipe
+
+    def _measure(self, project, recipe, iterations):
+        drf, fast = JSONRenderer(), FastJSONRenderer()
+        endpoints = {
+            'stations': (
+                lambda: drf.render(StationSerializer(Station.objects.filter(project=project), many=True).data),
+                lambda: fast.render(STATION_VALUES.data(Station.objects.filter(project=project))),
+            ),
+            'recipe steps': (
+                lambda: drf.render(RecipeStepSerializer(
+                    RecipeStep.objects.filter(recipe=recipe).select_related('station'), many=True).data),
+                lambda: fast.render(RECIPE_STEP_VALUES.data(RecipeStep.objects.filter(recipe=recipe))),
+            ),
+            'recipe detail': (
+                lambda: drf.render(RecipeSerializer(
+                    Recipe.objects.annotate(step_count=Count('steps')).prefetch_related('steps__station')
+                    .get(pk=recipe.pk)).data),
+                lambda: fast.render(recipe_tree(Recipe.objects.annotate(step_count=Count('steps'))
+                                                .filter(pk=recipe.pk))),
+            ),
+            'simulation history': (
+                lambda: drf.render(SimulationResultSerializer(
+                    SimulationResult.objects.filter(project=project), many=True).data),
+                lambda: fast.render(SIMULATION_VALUES.data(SimulationResult.objects.filter(project=project))),
+            ),
+            'history summary': (
+                lambda: drf.render(_SimulationSummarySerializer(
+                    SimulationResult.objects.filter(project=project), many=True).data),
+                lambda: fast.render(SIMULATION_SUMMARY_VALUES.data(SimulationResult.objects.filter(project=project))),
+            ),
+        }
+        timings = {}
+        for label, (slow_path, fast_path) in endpoints.items():
+            slow_body, fast_body = slow_path(), fast_path()
+            if json.loads(slow_body) != json.loads(fast_body):
+                self.stderr.write(f"{label}: fast path output differs from the serializer's")
+            timings[label] = tuple(self._time(path, iterations) for path in (slow_path, fast_path))
+        return timings
+
+    @staticmethod
+    def _time(path, iterations):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            path()
+        return (time.perf_counter() - started) / iterations * 1000
+
+    def _report(self, timings):
+        self.stdout.write(f"JSON encoder: {'orjson' if orjson else 'json (orjson not installed)'}")
+        self.stdout.write("\n=== Mean time per response (ms) ===")
+        self.stdout.write(f"{'endpoint':<20}{'serializer':>12}{'fast path':>12}{'speedup':>10}")
+        for label, (slow_ms, fast_ms) in timings.items():
+            speedup = slow_ms / fast_ms if fast_ms else 0
+            self.stdout.write(f"{label:<20}{slow_ms:>12.2f}{fast_ms:>12.2f}{speedup:>9.1f}x")
@@ -0,0 +1,53 @@
+import os
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from PlaterBuilder.document_store import BLOB_DIRECTORY, hash_file, link_document, store_document
+from PlaterBuilder.models import Projects
+
+
+class Command(BaseCommand):
+    """
+    Move project documents saved before the content-addressed store into
+    it. Identical files across projects collapse into one blob, and the
+    per-project copies are deleted as each field is relinked.
+    """
+    help = "Move existing project documents into the deduplicating document store"
+
+    FIELDS = ('spec_document', 'sketch')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Report without changing anything")
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        moved = saved_bytes = missing = 0
+        seen = set()
+        for project in Projects.objects.all():
+            for field in self.FIELDS:
+                name = getattr(project, field).name
+                if not name or name.startswith(f'{BLOB_DIRECTORY}/'):
+                    continue
+                if not default_storage.exists(name):
+                    missing += 1
+                    self.stderr.write(f"{project.project_id} {field}: {name} is missing")
+                    continue
+                with default_storage.open(name, 'rb') as fh:
+                    sha256 = hash_file(fh).hexdigest()
+                    size = default_storage.size(name)
+                    if sha256 in seen:
+                        saved_bytes += size
+                    seen.add(sha256)
+                    if not dry_run:
+                        document = store_document(fh, sha256, size, os.path.basename(name))
+                if not dry_run:
+                    # Releases and deletes the old per-project copy
+                    link_document(project, field, document)
+                moved += 1
+                self.stdout.write(f"{project.project_id} {field}: {name} -> {sha256[:12]}")
+
+        verb = "Would move" if dry_run else "Moved"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {moved} documents ({len(seen)} unique), "
+            f"freeing at least {saved_bytes / 1024 / 1024:.1f} MB; {missing} missing"))
@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from PlaterBuilder.uploads import UPLOAD_EXPIRY, expire_uploads
+
+
+class Command(BaseCommand):
+    """
+    Abort chunked uploads that have stopped making progress and delete
+    their partial files, along with partial files no pending upload owns.
+    Meant to run periodically, e.g. daily from cron.
+    """
+    help = "Abort stale chunked uploads and remove their partial files"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=float, default=UPLOAD_EXPIRY.total_seconds() / 3600,
+                            help="Age without progress after which a pending upload expires")
+
+    def handle(self, *args, **options):
+        sessions, files = expire_uploads(timedelta(hours=options['hours']))
+        self.stdout.write(self.style.SUCCESS(
+            f"Expired {sessions} pending uploads; removed {files} orphaned partial files"))
@@ -0,0 +1,25 @@
+# Generated by Django 5.2 on 2026-10-19 06:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('PlaterBuilder', '0005_productiongoal_target_parts_per_shift_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['project', 'name'], name='recipe_project_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='simulationresult',
+            index=models.Index(fields=['project', '-simulation_date'], name='simresult_project_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='station',
+            index=models.Index(fields=['project', 'position_index'], name='station_project_position_idx'),
+        ),
+    ]
@@ -0,0 +1,128 @@
+# Generated by Django 5.2 on 2026-10-19 06:17
+
+from django.db import migrations, models
+
+# The version 1 codec as it was when this migration was written; migrations
+# must not import application code that keeps changing.
+CODEC_VERSION = 1
+STATION_COLUMNS = ('occupied_time', 'utilization_pct')
+RECIPE_COLUMNS = ('production_ratio', 'cycle_time', 'parts_per_hour', 'parts_per_day')
+
+
+def _delta_encode(ids):
+    encoded = []
+    previous = 0
+    for value in ids:
+        encoded.append(value - previous)
+        previous = value
+    return encoded
+
+
+def _delta_decode(deltas):
+    decoded = []
+    current = 0
+    for delta in deltas:
+        current += delta
+        decoded.append(current)
+    return decoded
+
+
+def _is_packed(value):
+    return isinstance(value, dict) and value.get('v') == CODEC_VERSION
+
+
+def _pack(rows, id_key, columns):
+    if rows is None or _is_packed(rows):
+        return rows
+    packed = {'v': CODEC_VERSION, id_key: _delta_encode([row[id_key] for row in rows])}
+    for column in columns:
+        packed[column] = [row.get(column) for row in rows]
+    return packed
+
+
+def encode_station_utilization(rows):
+    return _pack(rows, 'station_id', STATION_COLUMNS)
+
+
+def encode_recipe_results(rows):
+    return _pack(rows, 'recipe_id', RECIPE_COLUMNS)
+
+
+def decode_station_utilization(packed, stations):
+    if packed is None or not _is_packed(packed):
+        return packed
+    rows = []
+    for i, station_id in enumerate(_delta_decode(packed.get('station_id', []))):
+        station = stations.get(station_id)
+        rows.append({
+            'station_id': station_id,
+            'station_number': station.station_number if station else None,
+            'process_name': station.process_name if station else None,
+            'occupied_time': packed['occupied_time'][i],
+            'utilization_pct': packed['utilization_pct'][i],
+        })
+    return rows
+
+
+def decode_recipe_results(packed, recipes):
+    if packed is None or not _is_packed(packed):
+        return packed
+    rows = []
+    for i, recipe_id in enumerate(_delta_decode(packed.get('recipe_id', []))):
+        recipe = recipes.get(recipe_id)
+        row = {'recipe_id': recipe_id, 'recipe_name': recipe.name if recipe else None}
+        for column in RECIPE_COLUMNS:
+            row[column] = packed[column][i]
+        rows.append(row)
+    return rows
+
+
+def pack_breakdowns(apps, schema_editor):
+    SimulationResult = apps.get_model('PlaterBuilder', 'SimulationResult')
+    batch = []
+    for result in SimulationResult.objects.only('id', 'station_utilization', 'recipe_results').iterator():
+        result.station_utilization = encode_station_utilization(result.station_utilization)
+        result.recipe_results = encode_recipe_results(result.recipe_results)
+        batch.append(result)
+        if len(batch) >= 500:
+            SimulationResult.objects.bulk_update(batch, ['station_utilization', 'recipe_results'])
+            batch = []
+    SimulationResult.objects.bulk_update(batch, ['station_utilization', 'recipe_results'])
+
+
+def unpack_breakdowns(apps, schema_editor):
+    SimulationResult = apps.get_model('PlaterBuilder', 'SimulationResult')
+    Station = apps.get_model('PlaterBuilder', 'Station')
+    Recipe = apps.get_model('PlaterBuilder', 'Recipe')
+    stations = Station.objects.in_bulk()
+    recipes = Recipe.objects.in_bulk()
+    batch = []
+    for result in SimulationResult.objects.only('id', 'station_utilization', 'recipe_results').iterator():
+        result.station_utilization = decode_station_utilization(result.station_utilization, stations)
+        result.recipe_results = decode_recipe_results(result.recipe_results, recipes)
+        batch.append(result)
+        if len(batch) >= 500:
+            SimulationResult.objects.bulk_update(batch, ['station_utilization', 'recipe_results'])
+            batch = []
+    SimulationResult.objects.bulk_update(batch, ['station_utilization', 'recipe_results'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('PlaterBuilder', '0006_hot_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='simulationresult',
+            name='recipe_results',
+            field=models.JSONField(blank=True, help_text='Per-recipe throughput breakdown (packed)', null=True),
+        ),
+        migrations.AlterField(
+            model_name='simulationresult',
+            name='station_utilization',
+            field=models.JSONField(blank=True, help_text='Per-station utilization data (packed)', null=True),
+        ),
+        migrations.RunPython(pack_breakdowns, unpack_breakdowns),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-19 06:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('PlaterBuilder', '0007_pack_simulation_breakdowns'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='simulationparameters',
+            name='lift_height',
+            field=models.FloatField(default=0.0, help_text='Vertical lift / lower distance per move in meters'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-19 06:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('PlaterBuilder', '0008_simulationparameters_lift_height'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='station',
+            name='parallel_tanks',
+            field=models.PositiveIntegerField(default=1, help_text='Duplicate tanks running this process side by side'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-19 06:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('PlaterBuilder', '0009_station_parallel_tanks'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='simulationresult',
+            name='parts_per_month',
+            field=models.FloatField(help_text='Estimated parts produced per month (a twelfth of the calendar year)'),
+        ),
+        migrations.CreateModel(
+            name='ProductionCalendar',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shifts_per_day', models.PositiveIntegerField(default=1, help_text='Shifts worked per working day')),
+                ('shift_length_hours', models.FloatField(default=8.0, help_text='Paid length of one shift in hours')),
+                ('break_minutes_per_shift', models.FloatField(default=0.0, help_text='Unproductive break time per shift in minutes')),
+                ('working_days_per_week', models.PositiveIntegerField(default=5, help_text='Working days per week')),
+                ('planned_downtime_hours_per_week', models.FloatField(default=0.0, help_text='Planned maintenance / changeover hours per week')),
+                ('holidays_per_year', models.PositiveIntegerField(default=0, help_text='Working days lost to holidays per year')),
+                ('date_created', models.DateTimeField(auto_now_add=True)),
+                ('last_updated', models.DateTimeField(auto_now=True)),
+                ('project', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='production_calendar', to='PlaterBuilder.projects')),
+            ],
+        ),
+    ]
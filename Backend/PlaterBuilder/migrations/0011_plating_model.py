@@ -0,0 +1,101 @@
+# Generated by Django 5.2 on 2026-10-19 06:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# name, atomic number, symbol, atomic weight (g/mol), valence, density (g/cm³)
+PLATING_METALS = [
+    ('Chromium', 24, 'Cr', 51.996, 6, 7.19),
+    ('Nickel', 28, 'Ni', 58.693, 2, 8.908),
+    ('Copper', 29, 'Cu', 63.546, 2, 8.96),
+    ('Zinc', 30, 'Zn', 65.38, 2, 7.14),
+    ('Silver', 47, 'Ag', 107.868, 1, 10.49),
+    ('Tin', 50, 'Sn', 118.71, 2, 7.265),
+    ('Gold', 79, 'Au', 196.967, 1, 19.3),
+]
+
+
+def seed_plating_metals(apps, schema_editor):
+    Element = apps.get_model('PlaterBuilder', 'Element')
+    for name, atomic_number, symbol, atomic_weight, valence, density in PLATING_METALS:
+        Element.objects.update_or_create(
+            atomic_number=atomic_number,
+            defaults={'name': name, 'symbol': symbol, 'atomic_weight': atomic_weight,
+                      'valence': valence, 'density': density},
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('PlaterBuilder', '0010_production_calendar'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Element',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('atomic_number', models.IntegerField(unique=True)),
+                ('symbol', models.CharField(max_length=3, unique=True)),
+                ('atomic_weight', models.FloatField(blank=True, help_text='Molar mass in grams per mole', null=True)),
+                ('valence', models.PositiveIntegerField(blank=True, help_text='Electrons transferred per deposited ion', null=True)),
+                ('density', models.FloatField(blank=True, help_text='Deposit density in grams per cubic centimetre', null=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Elements',
+                'ordering': ['atomic_number'],
+            },
+        ),
+        migrations.AddField(
+            model_name='recipestep',
+            name='cathode_efficiency',
+            field=models.FloatField(default=1.0, help_text='Cathode current efficiency (0-1)'),
+        ),
+        migrations.AddField(
+            model_name='recipestep',
+            name='current_density',
+            field=models.FloatField(blank=True, help_text='Cathode current density in A/dm²', null=True),
+        ),
+        migrations.AddField(
+            model_name='recipestep',
+            name='rectifier_current',
+            field=models.FloatField(blank=True, help_text="Rectifier current in amps, shared over the rack's plated area (used when no current density)", null=True),
+        ),
+        migrations.AddField(
+            model_name='recipestep',
+            name='target_thickness',
+            field=models.FloatField(blank=True, help_text='Target deposit thickness in micrometres', null=True),
+        ),
+        migrations.AddField(
+            model_name='recipestep',
+            name='element',
+            field=models.ForeignKey(blank=True, help_text='Metal deposited in this step', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='recipe_steps', to='PlaterBuilder.element'),
+        ),
+        migrations.CreateModel(
+            name='Part_Size',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('length', models.FloatField()),
+                ('width', models.FloatField()),
+                ('height', models.FloatField()),
+                ('volume', models.FloatField()),
+                ('weight', models.FloatField()),
+                ('total_surface_area', models.FloatField()),
+                ('plated_area', models.FloatField()),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='part_sizes', to='PlaterBuilder.projects')),
+            ],
+            options={
+                'verbose_name_plural': 'Part Sizes',
+                'ordering': ['length'],
+            },
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='part_size',
+            field=models.ForeignKey(blank=True, help_text='Part plated by this recipe', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='recipes', to='PlaterBuilder.part_size'),
+        ),
+        migrations.RunPython(seed_plating_metals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-19 06:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('PlaterBuilder', '0011_plating_model'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='simulationparameters',
+            name='part_spacing',
+            field=models.FloatField(default=0.02, help_text='Gap between parts on a rack, and to the tank walls, in meters'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2 on 2026-10-19 06:36
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('PlaterBuilder', '0012_simulationparameters_part_spacing'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('field', models.CharField(choices=[('spec_document', 'Specification Document'), ('sketch', 'Sketch')], max_length=20)),
+                ('filename', models.CharField(max_length=255)),
+                ('total_size', models.BigIntegerField(help_text='Size of the complete file in bytes')),
+                ('received_bytes', models.BigIntegerField(default=0, help_text='Bytes stored so far; the next chunk starts here')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('complete', 'Complete'), ('aborted', 'Aborted')], default='pending', max_length=10)),
+                ('file_path', models.CharField(blank=True, help_text='Storage path once complete', max_length=500)),
+                ('date_created', models.DateTimeField(auto_now_add=True)),
+                ('last_updated', models.DateTimeField(auto_now=True)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to='PlaterBuilder.projects')),
+            ],
+            options={
+                'ordering': ['-date_created'],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-19 06:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('PlaterBuilder', '0013_upload_session'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('file', models.FileField(help_text='documents/blobs/<aa>/<sha256><ext>', max_length=255, upload_to='')),
+                ('size', models.BigIntegerField(help_text='Size in bytes')),
+                ('ref_count', models.PositiveIntegerField(default=0, help_text='Project fields linking to this blob')),
+                ('date_created', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='uploadsession',
+            name='sha256',
+            field=models.CharField(blank=True, help_text='Content hash, declared by the client or computed on completion', max_length=64),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-19 06:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('PlaterBuilder', '0014_stored_document'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storeddocument',
+            name='preview',
+            field=models.FileField(blank=True, help_text='Downscaled PNG, generated in the background', max_length=255, upload_to=''),
+        ),
+        migrations.AddField(
+            model_name='storeddocument',
+            name='preview_status',
+            field=models.CharField(blank=True, choices=[('', 'Not Requested'), ('pending', 'Pending'), ('ready', 'Ready'), ('unsupported', 'Unsupported'), ('failed', 'Failed')], default='', max_length=12),
+        ),
+    ]
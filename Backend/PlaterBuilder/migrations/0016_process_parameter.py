@@ -0,0 +1,33 @@
+# Generated by Django 5.2 on 2026-10-19 06:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('PlaterBuilder', '0015_document_preview'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProcessParameter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('parameter', models.CharField(help_text='e.g. temperature, current_density, chem:nickel_sulfate', max_length=50)),
+                ('value', models.FloatField(blank=True, null=True)),
+                ('text_value', models.CharField(blank=True, help_text='Non-numeric values, e.g. an element symbol', max_length=100)),
+                ('unit', models.CharField(blank=True, max_length=20)),
+                ('source', models.CharField(choices=[('manual', 'Manual'), ('derived', 'Derived from recipe steps')], default='manual', max_length=10)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='process_parameters', to='PlaterBuilder.projects')),
+                ('recipe', models.ForeignKey(blank=True, help_text='Empty for a station-wide value such as bath temperature', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='process_parameters', to='PlaterBuilder.recipe')),
+                ('station', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='process_parameters', to='PlaterBuilder.station')),
+            ],
+            options={
+                'ordering': ['station__position_index', 'recipe_id', 'parameter'],
+                'indexes': [models.Index(fields=['project', 'parameter'], name='process_param_project_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('recipe__isnull', True)), fields=('station', 'parameter'), name='process_param_station_unique'), models.UniqueConstraint(condition=models.Q(('recipe__isnull', False)), fields=('station', 'recipe', 'parameter'), name='process_param_recipe_unique')],
+            },
+        ),
+    ]
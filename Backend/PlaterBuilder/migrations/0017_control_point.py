@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-19 06:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('PlaterBuilder', '0016_process_parameter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ControlPoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tag', models.CharField(help_text='Instrument tag, e.g. S03-TT', max_length=40)),
+                ('device', models.CharField(max_length=100)),
+                ('io_type', models.CharField(choices=[('DI', 'Digital Input'), ('DO', 'Digital Output'), ('AI', 'Analog Input'), ('AO', 'Analog Output'), ('FB', 'Fieldbus')], max_length=2)),
+                ('quantity', models.PositiveIntegerField(default=1, help_text='Number of I/O points')),
+                ('description', models.CharField(blank=True, max_length=200)),
+                ('rule', models.CharField(blank=True, help_text='Generation rule that produced this point', max_length=40)),
+                ('source', models.CharField(choices=[('generated', 'Generated'), ('manual', 'Manual')], default='manual', max_length=10)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='control_points', to='PlaterBuilder.projects')),
+                ('station', models.ForeignKey(blank=True, help_text='Empty for line equipment such as hoists', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='control_points', to='PlaterBuilder.station')),
+            ],
+            options={
+                'ordering': ['station__position_index', 'tag'],
+                'indexes': [models.Index(fields=['project', 'source'], name='control_point_source_idx')],
+                'constraints': [models.UniqueConstraint(fields=('project', 'tag'), name='control_point_project_tag_unique')],
+            },
+        ),
+    ]
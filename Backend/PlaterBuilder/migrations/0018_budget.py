@@ -0,0 +1,53 @@
+# Generated by Django 5.2 on 2026-10-19 06:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('PlaterBuilder', '0017_control_point'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Budget',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tank_base_cost', models.FloatField(default=5000.0, help_text='Fixed cost per tank')),
+                ('tank_cost_per_m3', models.FloatField(default=3000.0, help_text='Tank cost per cubic metre of volume')),
+                ('tank_depth', models.FloatField(default=1.2, help_text='Tank depth in meters, for the volume')),
+                ('hoist_cost', models.FloatField(default=40000.0, help_text='Cost per hoist')),
+                ('shuttle_cost', models.FloatField(default=30000.0, help_text='Cost of the transfer shuttle')),
+                ('rectifier_base_cost', models.FloatField(default=2000.0, help_text='Fixed cost per rectifier')),
+                ('rectifier_cost_per_amp', models.FloatField(default=15.0, help_text='Rectifier cost per amp of rack current')),
+                ('control_point_cost', models.FloatField(default=250.0, help_text='Cost per controls I/O point')),
+                ('contingency_pct', models.FloatField(default=10.0, help_text='Contingency added to the equipment total (%)')),
+                ('tanks_total', models.FloatField(default=0.0)),
+                ('rectifiers_total', models.FloatField(default=0.0)),
+                ('hoists_total', models.FloatField(default=0.0)),
+                ('controls_total', models.FloatField(default=0.0)),
+                ('date_created', models.DateTimeField(auto_now_add=True)),
+                ('last_updated', models.DateTimeField(auto_now=True)),
+                ('project', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='budget', to='PlaterBuilder.projects')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='BudgetLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(choices=[('tanks', 'Tanks'), ('rectifiers', 'Rectifiers'), ('hoists', 'Hoists & Transfer'), ('controls', 'Controls')], max_length=20)),
+                ('key', models.CharField(max_length=40)),
+                ('description', models.CharField(max_length=200)),
+                ('quantity', models.FloatField(default=1)),
+                ('unit_cost', models.FloatField(default=0.0)),
+                ('amount', models.FloatField(default=0.0)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='budget_lines', to='PlaterBuilder.projects')),
+            ],
+            options={
+                'ordering': ['category', 'key'],
+                'constraints': [models.UniqueConstraint(fields=('project', 'category', 'key'), name='budget_line_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2 on 2026-10-19 06:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('PlaterBuilder', '0018_budget'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Quote',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('input_hash', models.CharField(max_length=64)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('file', models.FileField(blank=True, upload_to='quotes/')),
+                ('size', models.PositiveBigIntegerField(default=0, help_text='Document size in bytes')),
+                ('error', models.TextField(blank=True)),
+                ('date_created', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quotes', to='PlaterBuilder.projects')),
+            ],
+            options={
+                'ordering': ['-date_created'],
+                'constraints': [models.UniqueConstraint(fields=('project', 'input_hash'), name='quote_project_input_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-19 07:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('PlaterBuilder', '0019_quote'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='projects',
+            name='line_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-19 07:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('PlaterBuilder', '0020_projects_line_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='projects',
+            name='controls_version',
+            field=models.PositiveIntegerField(editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,113 @@
+# Generated by Django 5.2 on 2026-10-19 07:40
+
+import base64
+import json
+import zlib
+
+from django.db import migrations
+
+# Codecs as they were when this migration was written; migrations must not
+# import application code that keeps changing.
+STATION_NAMES = ('station_number', 'process_name')
+STATION_COLUMNS = ('occupied_time', 'utilization_pct')
+RECIPE_NAMES = ('recipe_name',)
+RECIPE_COLUMNS = ('production_ratio', 'cycle_time', 'parts_per_hour', 'parts_per_day')
+
+
+def _delta_decode(deltas):
+    decoded = []
+    current = 0
+    for delta in deltas:
+        current += delta
+        decoded.append(current)
+    return decoded
+
+
+def _v1_to_arrays(packed, id_key, names, lookup):
+    """Version 1 columns plus the names of the rows they reference today."""
+    ids = _delta_decode(packed.get(id_key, []))
+    arrays = {id_key: packed.get(id_key, [])}
+    for name, attribute in names:
+        arrays[name] = [getattr(lookup[item_id], attribute) if item_id in lookup else None for item_id in ids]
+    for column, values in packed.items():
+        if column not in ('v', id_key):
+            arrays[column] = values
+    return arrays
+
+
+def _list_to_arrays(rows, id_key, columns):
+    arrays = {id_key: []}
+    previous = 0
+    for row in rows:
+        arrays[id_key].append(row[id_key] - previous)
+        previous = row[id_key]
+    for column in columns:
+        arrays[column] = [row.get(column) for row in rows]
+    return arrays
+
+
+def _v2(arrays, id_key):
+    data = zlib.compress(json.dumps(arrays, separators=(',', ':')).encode(), 9)
+    return {'v': 2, 'rows': len(arrays[id_key]), 'data': base64.b64encode(data).decode('ascii')}
+
+
+def _repack(value, id_key, names, columns, lookup):
+    if isinstance(value, dict) and value.get('v') == 1:
+        return _v2(_v1_to_arrays(value, id_key, names, lookup), id_key)
+    if isinstance(value, list):
+        return _v2(_list_to_arrays(value, id_key, [name for name, _ in names] + list(columns)), id_key)
+    return value
+
+
+def _unpack_to_v1(value, id_key, names):
+    if not (isinstance(value, dict) and value.get('v') == 2):
+        return value
+    arrays = json.loads(zlib.decompress(base64.b64decode(value['data'])))
+    packed = {'v': 1}
+    packed.update((column, values) for column, values in arrays.items() if column not in names)
+    return packed
+
+
+def _each_result(apps, convert):
+    SimulationResult = apps.get_model('PlaterBuilder', 'SimulationResult')
+    batch = []
+    for result in SimulationResult.objects.only('id', 'station_utilization', 'recipe_results').iterator():
+        convert(result)
+        batch.append(result)
+        if len(batch) >= 500:
+            SimulationResult.objects.bulk_update(batch, ['station_utilization', 'recipe_results'])
+            batch = []
+    SimulationResult.objects.bulk_update(batch, ['station_utilization', 'recipe_results'])
+
+
+def add_names(apps, schema_editor):
+    stations = apps.get_model('PlaterBuilder', 'Station').objects.in_bulk()
+    recipes = apps.get_model('PlaterBuilder', 'Recipe').objects.in_bulk()
+    station_names = tuple(zip(STATION_NAMES, STATION_NAMES))
+    recipe_names = (('recipe_name', 'name'),)
+
+    def convert(result):
+        result.station_utilization = _repack(result.station_utilization, 'station_id', station_names,
+                                             STATION_COLUMNS, stations)
+        result.recipe_results = _repack(result.recipe_results, 'recipe_id', recipe_names, RECIPE_COLUMNS, recipes)
+
+    _each_result(apps, convert)
+
+
+def drop_names(apps, schema_editor):
+    def convert(result):
+        result.station_utilization = _unpack_to_v1(result.station_utilization, 'station_id', STATION_NAMES)
+        result.recipe_results = _unpack_to_v1(result.recipe_results, 'recipe_id', RECIPE_NAMES)
+
+    _each_result(apps, convert)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('PlaterBuilder', '0021_projects_controls_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_names, drop_names),
+    ]
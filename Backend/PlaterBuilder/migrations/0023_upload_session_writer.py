@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-19 07:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('PlaterBuilder', '0022_repack_breakdowns_with_names'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadsession',
+            name='writer',
+            field=models.UUIDField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='uploadsession',
+            name='writer_heartbeat',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-19 07:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('PlaterBuilder', '0023_upload_session_writer'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storeddocument',
+            name='preview_started',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='storeddocument',
+            name='preview_status',
+            field=models.CharField(blank=True, choices=[('', 'Not Requested'), ('pending', 'Pending'), ('rendering', 'Rendering'), ('ready', 'Ready'), ('unsupported', 'Unsupported'), ('failed', 'Failed')], default='', max_length=12),
+        ),
+    ]
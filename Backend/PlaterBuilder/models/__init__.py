@@ -1,18 +1,32 @@
 from .projects import EquipmentTypeChoices, Projects
 from .customers import Customers
-from .production import ProductionGoal
+from .production import ProductionGoal, ProductionCalendar
 from .simulation import SimulationParameters, SimulationResult
 from .station import Station
 from .recipe import Recipe, RecipeStep
+from .substrate import Element, Part_Size
+from .documents import StoredDocument, UploadSession
+from .equipment_matrix import ProcessParameter, ControlPoint
+from .budget import Budget, BudgetLine, Quote
 
 __all__ = [
     'EquipmentTypeChoices',
     'Customers',
     'Projects',
     'ProductionGoal',
+    'ProductionCalendar',
     'SimulationParameters',
     'SimulationResult',
     'Station',
     'Recipe',
     'RecipeStep',
+    'Element',
+    'Part_Size',
+    'StoredDocument',
+    'UploadSession',
+    'ProcessParameter',
+    'ControlPoint',
+    'Budget',
+    'BudgetLine',
+    'Quote',
 ]
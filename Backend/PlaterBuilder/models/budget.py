@@ -0,0 +1,101 @@
+from django.db import models
+from .projects import Projects
+
+
+class Budget(models.Model):
+    """
+    Equipment budget for the project: the unit costs, and cached totals
+    per cost category. The totals are kept in step with the BudgetLine
+    rows as stations and parameters change, so reading the budget does
+    not roll the line up again.
+    """
+    project = models.OneToOneField(Projects, on_delete=models.CASCADE, related_name='budget')
+
+    # Unit costs
+    tank_base_cost = models.FloatField(default=5000.0, help_text="Fixed cost per tank")
+    tank_cost_per_m3 = models.FloatField(default=3000.0, help_text="Tank cost per cubic metre of volume")
+    tank_depth = models.FloatField(default=1.2, help_text="Tank depth in meters, for the volume")
+    hoist_cost = models.FloatField(default=40000.0, help_text="Cost per hoist")
+    shuttle_cost = models.FloatField(default=30000.0, help_text="Cost of the transfer shuttle")
+    rectifier_base_cost = models.FloatField(default=2000.0, help_text="Fixed cost per rectifier")
+    rectifier_cost_per_amp = models.FloatField(default=15.0, help_text="Rectifier cost per amp of rack current")
+    control_point_cost = models.FloatField(default=250.0, help_text="Cost per controls I/O point")
+    contingency_pct = models.FloatField(default=10.0, help_text="Contingency added to the equipment total (%)")
+
+    # Cached category totals, updated incrementally
+    tanks_total = models.FloatField(default=0.0)
+    rectifiers_total = models.FloatField(default=0.0)
+    hoists_total = models.FloatField(default=0.0)
+    controls_total = models.FloatField(default=0.0)
+
+    date_created = models.DateTimeField(auto_now_add=True)
+    last_updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Budget for {self.project.project_name}"
+
+
+class BudgetLine(models.Model):
+    """
+    One costed item of the budget. ``key`` identifies what it was costed
+    from (``station:<id>`` or ``line``), so a change to one station only
+    revisits that station's lines.
+    """
+    CATEGORY_CHOICES = [
+        ('tanks', 'Tanks'),
+        ('rectifiers', 'Rectifiers'),
+        ('hoists', 'Hoists & Transfer'),
+        ('controls', 'Controls'),
+    ]
+
+    project = models.ForeignKey(Projects, on_delete=models.CASCADE, related_name='budget_lines')
+    category = models.CharField(max_length=20, choices=CATEGORY_CHOICES)
+    key = models.CharField(max_length=40)
+    description = models.CharField(max_length=200)
+    quantity = models.FloatField(default=1)
+    unit_cost = models.FloatField(default=0.0)
+    amount = models.FloatField(default=0.0)
+
+    class Meta:
+        ordering = ['category', 'key']
+        constraints = [
+            models.UniqueConstraint(fields=['project', 'category', 'key'], name='budget_line_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.description}: {self.amount:.2f}"
+
+
+class Quote(models.Model):
+    """
+    A generated quote document. ``input_hash`` fingerprints the version
+    stamps of everything the document is built from, so asking again for
+    an unchanged project returns the stored document instead of generating
+    a new one.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('rendering', 'Rendering'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
+
+    project = models.ForeignKey(Projects, on_delete=models.CASCADE, related_name='quotes')
+    input_hash = models.CharField(max_length=64)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    file = models.FileField(upload_to='quotes/', blank=True)
+    size = models.PositiveBigIntegerField(default=0, help_text="Document size in bytes")
+    error = models.TextField(blank=True)
+    date_created = models.DateTimeField(auto_now_add=True)
+    # When the quote was queued, or claimed by the worker rendering it
+    started_at = models.DateTimeField(null=True, blank=True, editable=False)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-date_created']
+        constraints = [
+            models.UniqueConstraint(fields=['project', 'input_hash'], name='quote_project_input_unique'),
+        ]
+
+    def __str__(self):
+        return f"Quote {self.input_hash[:12]} for {self.project.project_name} ({self.status})"
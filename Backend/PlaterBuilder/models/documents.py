@@ -0,0 +1,76 @@
+import uuid
+
+from django.db import models
+from .projects import Projects
+
+
+class StoredDocument(models.Model):
+    """
+    One unique document blob, addressed by the SHA-256 of its content.
+    Project fields that link to ``file`` are counted in ``ref_count``; the
+    blob is deleted when the last link goes.
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    file = models.FileField(max_length=255, help_text="documents/blobs/<aa>/<sha256><ext>")
+    size = models.BigIntegerField(help_text="Size in bytes")
+    ref_count = models.PositiveIntegerField(default=0, help_text="Project fields linking to this blob")
+    preview = models.FileField(max_length=255, blank=True, help_text="Downscaled PNG, generated in the background")
+    preview_status = models.CharField(
+        max_length=12,
+        choices=[
+            ('', 'Not Requested'),
+            ('pending', 'Pending'),
+            ('rendering', 'Rendering'),
+            ('ready', 'Ready'),
+            ('unsupported', 'Unsupported'),
+            ('failed', 'Failed'),
+        ],
+        default='',
+        blank=True,
+    )
+    # When the preview was queued, or claimed by the worker rendering it
+    preview_started = models.DateTimeField(null=True, blank=True, editable=False)
+    date_created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.size} bytes, {self.ref_count} links)"
+
+
+class UploadSession(models.Model):
+    """
+    A chunked, resumable upload of a project document. Bytes are appended
+    at ``received_bytes`` until ``total_size`` is reached, then the file is
+    attached to the project field named by ``field``.
+    """
+    FIELD_CHOICES = [
+        ('spec_document', 'Specification Document'),
+        ('sketch', 'Sketch'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('complete', 'Complete'),
+        ('aborted', 'Aborted'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    project = models.ForeignKey(Projects, on_delete=models.CASCADE, related_name='upload_sessions')
+    field = models.CharField(max_length=20, choices=FIELD_CHOICES)
+    filename = models.CharField(max_length=255)
+    total_size = models.BigIntegerField(help_text="Size of the complete file in bytes")
+    received_bytes = models.BigIntegerField(default=0, help_text="Bytes stored so far; the next chunk starts here")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    sha256 = models.CharField(max_length=64, blank=True,
+                              help_text="Content hash, declared by the client or computed on completion")
+    file_path = models.CharField(max_length=500, blank=True, help_text="Storage path once complete")
+    # The request appending a chunk, and when it last wrote; claimed with a conditional update
+    writer = models.UUIDField(null=True, blank=True, editable=False)
+    writer_heartbeat = models.DateTimeField(null=True, blank=True, editable=False)
+
+    date_created = models.DateTimeField(auto_now_add=True)
+    last_updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.filename} for {self.project.project_name} ({self.received_bytes}/{self.total_size})"
+
+    class Meta:
+        ordering = ['-date_created']
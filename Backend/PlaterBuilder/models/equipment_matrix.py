@@ -0,0 +1,88 @@
+from django.db import models
+from .projects import Projects
+from .station import Station
+from .recipe import Recipe
+
+
+class ProcessParameter(models.Model):
+    """
+    One cell of the process matrix: the value of a process parameter at a
+    station, for one recipe or (recipe left empty) for every recipe using
+    the station. Cells that are not set have no row.
+    """
+    SOURCE_CHOICES = [
+        ('manual', 'Manual'),
+        ('derived', 'Derived from recipe steps'),
+    ]
+
+    project = models.ForeignKey(Projects, on_delete=models.CASCADE, related_name='process_parameters')
+    station = models.ForeignKey(Station, on_delete=models.CASCADE, related_name='process_parameters')
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, null=True, blank=True,
+                               related_name='process_parameters',
+                               help_text="Empty for a station-wide value such as bath temperature")
+    parameter = models.CharField(max_length=50, help_text="e.g. temperature, current_density, chem:nickel_sulfate")
+    value = models.FloatField(null=True, blank=True)
+    text_value = models.CharField(max_length=100, blank=True, help_text="Non-numeric values, e.g. an element symbol")
+    unit = models.CharField(max_length=20, blank=True)
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES, default='manual')
+
+    class Meta:
+        ordering = ['station__position_index', 'recipe_id', 'parameter']
+        constraints = [
+            models.UniqueConstraint(fields=['station', 'parameter'], condition=models.Q(recipe__isnull=True),
+                                    name='process_param_station_unique'),
+            models.UniqueConstraint(fields=['station', 'recipe', 'parameter'],
+                                    condition=models.Q(recipe__isnull=False),
+                                    name='process_param_recipe_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['project', 'parameter'], name='process_param_project_idx'),
+        ]
+
+    def __str__(self):
+        scope = self.recipe.name if self.recipe_id else "all recipes"
+        return f"{self.station} / {scope}: {self.parameter} = {self.value if self.value is not None else self.text_value}"
+
+
+class ControlPoint(models.Model):
+    """
+    One line of the controls I/O matrix: a device at a station (or on the
+    line, for hoists) and the I/O it needs. Generated points are rebuilt
+    from the line model; manual points are kept and override generated
+    points with the same tag.
+    """
+    IO_TYPE_CHOICES = [
+        ('DI', 'Digital Input'),
+        ('DO', 'Digital Output'),
+        ('AI', 'Analog Input'),
+        ('AO', 'Analog Output'),
+        ('FB', 'Fieldbus'),
+    ]
+    SOURCE_CHOICES = [
+        ('generated', 'Generated'),
+        ('manual', 'Manual'),
+    ]
+
+    project = models.ForeignKey(Projects, on_delete=models.CASCADE, related_name='control_points')
+    station = models.ForeignKey(Station, on_delete=models.CASCADE, null=True, blank=True,
+                                related_name='control_points',
+                                help_text="Empty for line equipment such as hoists")
+    tag = models.CharField(max_length=40, help_text="Instrument tag, e.g. S03-TT")
+    device = models.CharField(max_length=100)
+    io_type = models.CharField(max_length=2, choices=IO_TYPE_CHOICES)
+    quantity = models.PositiveIntegerField(default=1, help_text="Number of I/O points")
+    description = models.CharField(max_length=200, blank=True)
+    rule = models.CharField(max_length=40, blank=True, help_text="Generation rule that produced this point")
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES, default='manual')
+
+    class Meta:
+        ordering = ['station__position_index', 'tag']
+        constraints = [
+            models.UniqueConstraint(fields=['project', 'tag'], name='control_point_project_tag_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['project', 'source'], name='control_point_source_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.tag} {self.device} ({self.io_type} x{self.quantity})"
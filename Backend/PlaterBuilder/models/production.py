@@ -34,4 +34,28 @@ class ProductionGoal(models.Model):
     last_updated = models.DateTimeField(auto_now=True)
     
     def __str__(self):
-        return f"Production Goals for {self.project.project_name}" 
\ No newline at end of file
+        return f"Production Goals for {self.project.project_name}" 
+
+class ProductionCalendar(models.Model):
+    """
+    Working calendar for the project: shifts, breaks, planned downtime and
+    holidays. Production projections use it instead of a flat hours-per-day.
+    """
+    project = models.OneToOneField(Projects, on_delete=models.CASCADE, related_name='production_calendar')
+
+    # Shift pattern
+    shifts_per_day = models.PositiveIntegerField(default=1, help_text="Shifts worked per working day")
+    shift_length_hours = models.FloatField(default=8.0, help_text="Paid length of one shift in hours")
+    break_minutes_per_shift = models.FloatField(default=0.0, help_text="Unproductive break time per shift in minutes")
+    working_days_per_week = models.PositiveIntegerField(default=5, help_text="Working days per week")
+
+    # Lost time
+    planned_downtime_hours_per_week = models.FloatField(
+        default=0.0, help_text="Planned maintenance / changeover hours per week")
+    holidays_per_year = models.PositiveIntegerField(default=0, help_text="Working days lost to holidays per year")
+
+    date_created = models.DateTimeField(auto_now_add=True)
+    last_updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Production Calendar for {self.project.project_name}"
@@ -20,6 +20,10 @@ class Projects(models.Model):
     last_updated = models.DateTimeField(auto_now=True)
     spec_document = models.FileField(upload_to='documents/specs/', blank=True, null=True)
     sketch = models.FileField(upload_to='documents/sketches/', blank=True, null=True)
+    # bumped on every edit of the line (see signals.py); identifies its state for derived data
+    line_version = models.PositiveIntegerField(default=0, editable=False)
+    # line_version the generated controls points were built from
+    controls_version = models.PositiveIntegerField(null=True, editable=False)
     
     #equipment info
     equipment_type = models.CharField(
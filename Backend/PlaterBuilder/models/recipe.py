@@ -1,6 +1,7 @@
 from django.db import models
 from .projects import Projects
 from .station import Station
+from .substrate import Element, Part_Size
 
 
 class Recipe(models.Model):
@@ -13,6 +14,8 @@ class Recipe(models.Model):
     description = models.TextField(blank=True, null=True)
     production_ratio = models.IntegerField(default=1, help_text="Weight in the production mix (e.g. 3 in a 3:2:1 split)")
     is_active = models.BooleanField(default=True)
+    part_size = models.ForeignKey(Part_Size, on_delete=models.SET_NULL, null=True, blank=True,
+                                  related_name='recipes', help_text="Part plated by this recipe")
 
     date_created = models.DateTimeField(auto_now_add=True)
     last_updated = models.DateTimeField(auto_now=True)
@@ -20,6 +23,10 @@ class Recipe(models.Model):
     class Meta:
         verbose_name_plural = "Recipes"
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['project', 'name'], condition=models.Q(is_active=True),
+                         name='recipe_project_active_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} (ratio: {self.production_ratio})"
@@ -39,6 +46,16 @@ class RecipeStep(models.Model):
     max_dwell_time = models.IntegerField(blank=True, null=True, help_text="Maximum dwell time in seconds")
     drip_time = models.IntegerField(default=0, help_text="Drip time after lifting in seconds")
 
+    # Plating parameters: when set, dwell_time is derived from Faraday's law
+    element = models.ForeignKey(Element, on_delete=models.SET_NULL, null=True, blank=True,
+                                related_name='recipe_steps', help_text="Metal deposited in this step")
+    target_thickness = models.FloatField(null=True, blank=True, help_text="Target deposit thickness in micrometres")
+    current_density = models.FloatField(null=True, blank=True, help_text="Cathode current density in A/dm²")
+    rectifier_current = models.FloatField(
+        null=True, blank=True,
+        help_text="Rectifier current in amps, shared over the rack's plated area (used when no current density)")
+    cathode_efficiency = models.FloatField(default=1.0, help_text="Cathode current efficiency (0-1)")
+
     # Metadata
     notes = models.TextField(blank=True, null=True)
 
@@ -1,5 +1,6 @@
 from django.db import models
 from .projects import Projects
+from .. import result_codec
 
 class SimulationParameters(models.Model):
     """
@@ -17,11 +18,13 @@ class SimulationParameters(models.Model):
     hoist_speed_horizontal = models.FloatField(default=0.5, help_text="Hoist horizontal speed in meters per second")
     hoist_speed_vertical = models.FloatField(default=0.2, help_text="Hoist vertical speed in meters per second")
     hoist_acceleration = models.FloatField(default=0.1, help_text="Hoist acceleration in meters per second²")
+    lift_height = models.FloatField(default=0.0, help_text="Vertical lift / lower distance per move in meters")
     
     # Time parameters
     transfer_time = models.IntegerField(default=10, help_text="Time to transfer between stations in seconds")
     parts_per_rack = models.IntegerField(default=1, help_text="Number of parts loaded on each rack")
     rack_spacing = models.FloatField(default=0.5, help_text="Minimum spacing between racks in meters")
+    part_spacing = models.FloatField(default=0.02, help_text="Gap between parts on a rack, and to the tank walls, in meters")
     
     # Schedule parameters
     working_hours_per_day = models.FloatField(default=8.0, help_text="Working hours per day")
@@ -61,7 +64,7 @@ class SimulationResult(models.Model):
     parts_per_hour = models.FloatField(help_text="Estimated parts produced per hour")
     parts_per_day = models.FloatField(help_text="Estimated parts produced per day")
     parts_per_week = models.FloatField(help_text="Estimated parts produced per week")
-    parts_per_month = models.FloatField(help_text="Estimated parts produced per month (based on 4 weeks)")
+    parts_per_month = models.FloatField(help_text="Estimated parts produced per month (a twelfth of the calendar year)")
     parts_per_year = models.FloatField(help_text="Estimated parts produced per year")
     
     # Time calculations
@@ -84,15 +87,30 @@ class SimulationResult(models.Model):
     # Recommendations
     recommendations = models.TextField(blank=True, null=True, help_text="Recommendations for improvement")
     
-    # Multi-recipe results
-    recipe_results = models.JSONField(null=True, blank=True, help_text="Per-recipe throughput breakdown")
-    station_utilization = models.JSONField(null=True, blank=True, help_text="Per-station utilization data")
+    # Multi-recipe results, stored in the compact format from result_codec
+    recipe_results = models.JSONField(null=True, blank=True, help_text="Per-recipe throughput breakdown (packed)")
+    station_utilization = models.JSONField(null=True, blank=True, help_text="Per-station utilization data (packed)")
 
     # Metadata
     notes = models.TextField(blank=True, null=True, help_text="Additional notes about the simulation")
 
     def __str__(self):
         return f"Simulation for {self.project.project_name} on {self.simulation_date.strftime('%Y-%m-%d')}"
+
+    def get_station_utilization(self):
+        """Expanded per-station rows, decoded on first access only."""
+        if not hasattr(self, '_station_utilization_rows'):
+            self._station_utilization_rows = result_codec.decode_station_utilization(self.station_utilization)
+        return self._station_utilization_rows
+
+    def get_recipe_results(self):
+        """Expanded per-recipe rows, decoded on first access only."""
+        if not hasattr(self, '_recipe_results_rows'):
+            self._recipe_results_rows = result_codec.decode_recipe_results(self.recipe_results)
+        return self._recipe_results_rows
     
     class Meta:
-        ordering = ['-simulation_date'] 
\ No newline at end of file
+        ordering = ['-simulation_date']
+        indexes = [
+            models.Index(fields=['project', '-simulation_date'], name='simresult_project_date_idx'),
+        ] 
\ No newline at end of file
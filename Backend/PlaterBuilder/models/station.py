@@ -16,6 +16,7 @@ class Station(models.Model):
     tank_length = models.FloatField(default=0.0, help_text="Tank length in meters")
     tank_width = models.FloatField(default=0.0, help_text="Tank width in meters")
     distance_to_next = models.FloatField(default=0.0, help_text="Distance to next station in meters")
+    parallel_tanks = models.PositiveIntegerField(default=1, help_text="Duplicate tanks running this process side by side")
 
     # Station flags
     is_loading_station = models.BooleanField(default=False)
@@ -29,6 +30,9 @@ class Station(models.Model):
         verbose_name_plural = "Stations"
         ordering = ['position_index']
         unique_together = [['project', 'station_number']]
+        indexes = [
+            models.Index(fields=['project', 'position_index'], name='station_project_position_idx'),
+        ]
 
     def __str__(self):
         return f"Station {self.station_number}: {self.process_name}"
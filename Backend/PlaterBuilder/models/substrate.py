@@ -9,6 +9,11 @@ class Element(models.Model):
     atomic_number = models.IntegerField(unique=True)
     symbol = models.CharField(max_length=3, unique=True)
 
+    # Electrodeposition properties (Faraday's law)
+    atomic_weight = models.FloatField(null=True, blank=True, help_text="Molar mass in grams per mole")
+    valence = models.PositiveIntegerField(null=True, blank=True, help_text="Electrons transferred per deposited ion")
+    density = models.FloatField(null=True, blank=True, help_text="Deposit density in grams per cubic centimetre")
+
     def __str__(self):
         return self.name
     class Meta:
@@ -19,7 +24,8 @@ class Part_Size(models.Model):
     """
     Represents the size of a part in the plating process.
     """
-    project = models.ForeignKey(Projects, on_delete=models.CASCADE)
+    project = models.ForeignKey(Projects, on_delete=models.CASCADE, related_name='part_sizes')
+    name = models.CharField(max_length=100)
     length = models.FloatField() # Length in meters
     width = models.FloatField() # Width in meters
     height = models.FloatField() # Height in meters
@@ -32,4 +38,4 @@ class Part_Size(models.Model):
         return self.name
     class Meta:
         verbose_name_plural = "Part Sizes"
-        ordering = ['length']
\ No newline at end of file
+        ordering = ['length']
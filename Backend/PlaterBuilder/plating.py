@@ -0,0 +1,124 @@
+"""
+Plating-rate model: dwell time from target thickness by Faraday's law.
+
+    thickness rate = j x efficiency x M / (n x F x density)
+
+with j the cathode current density. A step gives it either directly
+(``current_density``, A/dm²), or as a ``rectifier_current`` shared over
+the plated area of one rack (part plated_area x parts per rack). In the
+second case the dwell time follows the part geometry. Parts per rack is
+what the recipe's rack can physically hold (rack_packing.recipe_rack_loads),
+the same figure throughput and rectifier sizing use.
+
+All steps of a project are computed in one pass. The per-element factor
+M / (n x F x density) is worked out once per element, and the changed
+dwell times are written back with a single bulk_update.
+"""
+import math
+
+from .coalesce import bump_line_version
+from .models import Recipe, RecipeStep, SimulationParameters
+from .rack_packing import recipe_rack_loads
+
+FARADAY = 96485.332  # C/mol
+
+
+def _deposit_factor(element):
+    """Metres of deposit per coulomb per square metre, or None if unknown."""
+    if not (element.atomic_weight and element.valence and element.density):
+        return None
+    # density g/cm³ -> g/m³
+    return element.atomic_weight / (element.valence * FARADAY * element.density * 1e6)
+
+
+def _current_density(step, plated_area, parts_per_rack):
+    """Cathode current density in A/m²."""
+    if step.current_density:
+        return step.current_density * 100  # A/dm² -> A/m²
+    if step.rectifier_current and plated_area:
+        return step.rectifier_current / (plated_area * parts_per_rack)
+    return None
+
+
+def plating_dwell_times(project, recipe_ids=None, part_size_ids=None):
+    """
+    Required dwell time for every plating step of the project.
+
+    Returns ``(steps, rows)``: the RecipeStep instances with ``dwell_time``
+    set to the computed value, and one report row per plating step.
+    Steps missing an input are reported with a ``reason`` and left alone.
+    """
+    try:
+        params = project.simulation_parameters
+    except SimulationParameters.DoesNotExist:
+        params = None
+
+    qs = (RecipeStep.objects
+          .filter(recipe__project=project, element__isnull=False, target_thickness__isnull=False)
+          .select_related('element', 'station', 'recipe__part_size'))
+    if recipe_ids is not None:
+        qs = qs.filter(recipe_id__in=recipe_ids)
+    if part_size_ids is not None:
+        qs = qs.filter(recipe__part_size_id__in=part_size_ids)
+
+    qs = list(qs)
+    loads = recipe_rack_loads(Recipe.objects.filter(id__in={step.recipe_id for step in qs})
+                              .select_related('part_size').prefetch_related('steps__station'), params)
+    factors = {}
+    steps, rows = [], []
+    for step in qs:
+        element = step.element
+        if element.id not in factors:
+            factors[element.id] = _deposit_factor(element)
+        factor = factors[element.id]
+        part = step.recipe.part_size
+        plated_area = part.plated_area if part else None
+        parts_per_rack = loads[step.recipe_id]
+        density = _current_density(step, plated_area, parts_per_rack)
+
+        row = {
+            'step_id': step.id,
+            'recipe_id': step.recipe_id,
+            'recipe_name': step.recipe.name,
+            'step_order': step.step_order,
+            'station_number': step.station.station_number,
+            'element': element.symbol,
+            'target_thickness': step.target_thickness,
+            'current_dwell_time': step.dwell_time,
+            'parts_per_rack': parts_per_rack,
+        }
+        efficiency = step.cathode_efficiency or 0
+        if factor is None:
+            row['reason'] = f"{element.name} is missing atomic weight, valence or density"
+        elif density is None:
+            row['reason'] = "Set a current density, or a rectifier current and the recipe's part plated area"
+        elif density <= 0 or efficiency <= 0:
+            row['reason'] = "Current density and cathode efficiency must be positive"
+        else:
+            rate = density * efficiency * factor  # m/s
+            dwell = math.ceil(step.target_thickness * 1e-6 / rate)
+            row.update({
+                'current_density': round(density / 100, 4),
+                'deposition_rate_um_per_min': round(rate * 1e6 * 60, 4),
+                'dwell_time': dwell,
+                'rack_current': round(density * plated_area * parts_per_rack, 2) if plated_area else None,
+                'exceeds_max_dwell': bool(step.max_dwell_time and dwell > step.max_dwell_time),
+                'below_min_dwell': bool(step.min_dwell_time and dwell < step.min_dwell_time),
+            })
+            step.dwell_time = dwell
+            steps.append(step)
+        rows.append(row)
+    return steps, rows
+
+
+def apply_plating_dwell_times(project, **filters):
+    """Compute and save dwell times in one bulk update. Returns the report rows."""
+    steps, rows = plating_dwell_times(project, **filters)
+    previous = {row['step_id']: row['current_dwell_time'] for row in rows}
+    changed = [step for step in steps if previous[step.id] != step.dwell_time]
+    if changed:
+        RecipeStep.objects.bulk_update(changed, ['dwell_time'])
+        bump_line_version(project.pk)
+    for row in rows:
+        row['updated'] = 'dwell_time' in row and row['current_dwell_time'] != row['dwell_time']
+    return rows
@@ -0,0 +1,198 @@
+"""
+Background preview images for project documents.
+
+Previews belong to StoredDocument blobs, so each unique sketch or spec is
+rendered once, however many projects link to it. Rendering runs on a
+small in-process thread pool (``PREVIEW_WORKERS``, default 2), queued
+when a new blob is stored. Every server process has its own pool, so a
+worker claims a document in the database (pending -> rendering, with a
+conditional update) before rendering it; a task whose document is
+already claimed does nothing. A blob whose preview was never requested,
+or whose queue entry or claim is older than ``PREVIEW_TIMEOUT`` (the
+process died), is queued again the first time its status is asked.
+
+Raster sketches are decoded with Pillow. JPEGs use draft mode, so a large
+photo is decoded at close to the preview size. The first page of a PDF is
+rendered with PyMuPDF. Both libraries are optional: without them those
+documents are reported as unsupported, and the page shows the plain
+download link. PyMuPDF is AGPL-3.0, so it is not in requirements.txt; it
+is installed from requirements-pdf.txt where that licence is acceptable.
+
+The preview URL contains the content hash, so it never changes for a
+given image. It is served with a year-long immutable Cache-Control.
+"""
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections
+from django.db.models import Q
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import StoredDocument
+
+try:
+    from PIL import Image, UnidentifiedImageError
+except ImportError:  # Pillow is optional
+    Image = None
+
+try:
+    import fitz  # PyMuPDF, optional
+except ImportError:
+    fitz = None
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_SIZE = 480
+PREVIEW_DIRECTORY = 'documents/previews'
+PREVIEW_CACHE_SECONDS = 365 * 24 * 3600
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.gif', '.bmp', '.tif', '.tiff', '.webp'}
+# A queued or claimed preview untouched for this long is taken over
+PREVIEW_TIMEOUT = timedelta(minutes=2)
+IN_PROGRESS = ('pending', 'rendering')
+
+_executor = None
+_lock = threading.Lock()
+# Document ids queued or rendering in this process
+_queued = set()
+
+
+def _pool():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=getattr(settings, 'PREVIEW_WORKERS', 2),
+                                           thread_name_prefix='preview')
+    return _executor
+
+
+def preview_name(document):
+    return f'{PREVIEW_DIRECTORY}/{document.sha256[:2]}/{document.sha256}-{PREVIEW_SIZE}.png'
+
+
+def _render_image(fh):
+    try:
+        image = Image.open(fh)
+    except UnidentifiedImageError:
+        return None
+    # JPEG decodes straight to a reduced scale
+    image.draft('RGB', (PREVIEW_SIZE, PREVIEW_SIZE))
+    image.thumbnail((PREVIEW_SIZE, PREVIEW_SIZE))
+    if image.mode not in ('1', 'L', 'P', 'RGB', 'RGBA'):
+        image = image.convert('RGB')
+    out = io.BytesIO()
+    image.save(out, 'PNG', optimize=True)
+    return out.getvalue()
+
+
+def _render_pdf(fh):
+    # Let PyMuPDF page through a local file rather than reading it all in
+    local = getattr(fh, 'name', None)
+    source = fitz.open(local) if local and os.path.isfile(local) else fitz.open(stream=fh.read(), filetype='pdf')
+    with source as pdf:
+        if not pdf.page_count:
+            return None
+        page = pdf[0]
+        zoom = PREVIEW_SIZE / max(page.rect.width, page.rect.height)
+        return page.get_pixmap(matrix=fitz.Matrix(zoom, zoom)).tobytes('png')
+
+
+def render_preview(document):
+    """PNG bytes of the document's preview, or None if its type is unsupported."""
+    ext = os.path.splitext(document.file.name)[1].lower()
+    if ext == '.pdf' and fitz is not None:
+        renderer = _render_pdf
+    elif ext in IMAGE_EXTENSIONS and Image is not None:
+        renderer = _render_image
+    else:
+        return None
+    with default_storage.open(document.file.name, 'rb') as fh:
+        return renderer(fh)
+
+
+def _claim(document_id):
+    """Claim the document's preview for this worker; returns the claim time, or None if taken."""
+    started = timezone.now()
+    lapsed = Q(preview_started__isnull=True) | Q(preview_started__lt=started - PREVIEW_TIMEOUT)
+    claimed = StoredDocument.objects.filter(
+        Q(preview_status='pending') | Q(lapsed, preview_status='rendering'), pk=document_id,
+    ).update(preview_status='rendering', preview_started=started)
+    return started if claimed else None
+
+
+def _replace_preview(document, png):
+    """Store ``png`` as the document's preview, removing the previous file first."""
+    name = preview_name(document)
+    for stale in {document.preview.name, name} - {''}:
+        # Saving over an existing name would make storage pick another one
+        default_storage.delete(stale)
+    return default_storage.save(name, ContentFile(png))
+
+
+def generate_preview(document_id):
+    """Worker task: render and store one preview, recording the outcome."""
+    close_old_connections()
+    try:
+        started = _claim(document_id)
+        if started is None:
+            return
+        # Outcomes are only recorded while the claim is still this worker's
+        claim = StoredDocument.objects.filter(pk=document_id, preview_status='rendering', preview_started=started)
+        try:
+            document = claim.first()
+            if document is None:
+                return
+            png = render_preview(document)
+            if png is None:
+                claim.update(preview_status='unsupported')
+                return
+            name = _replace_preview(document, png)
+            if not claim.update(preview=name, preview_status='ready') and \
+                    not StoredDocument.objects.filter(pk=document_id).exists():
+                # Blob released while rendering
+                default_storage.delete(name)
+        except Exception:
+            logger.exception("Preview generation failed for document %s", document_id)
+            claim.update(preview_status='failed')
+    finally:
+        _queued.discard(document_id)
+        close_old_connections()
+
+
+def schedule_preview(document):
+    """Queue a preview for ``document`` unless one is already on its way here."""
+    with _lock:
+        if document.pk in _queued:
+            return
+        _queued.add(document.pk)
+    # A lapsed rendering claim stays as it is; the worker takes it over
+    if document.preview_status != 'rendering':
+        document.preview_started = timezone.now()
+        StoredDocument.objects.filter(pk=document.pk, preview_status__in=('', 'pending')).update(
+            preview_status='pending', preview_started=document.preview_started)
+        document.preview_status = 'pending'
+    _pool().submit(generate_preview, document.pk)
+
+
+def _lapsed(document):
+    started = document.preview_started
+    return started is None or started < timezone.now() - PREVIEW_TIMEOUT
+
+
+def preview_state(document):
+    """Status and URL of a document's preview, queueing it when none is on its way."""
+    if document.preview_status == '' or (document.preview_status in IN_PROGRESS and _lapsed(document)):
+        schedule_preview(document)
+    # Clients see queued and rendering previews alike as pending
+    status = 'pending' if document.preview_status in IN_PROGRESS else document.preview_status
+    state = {'status': status, 'sha256': document.sha256}
+    if document.preview_status == 'ready':
+        state['url'] = reverse('document_preview', args=[document.sha256])
+    return state
@@ -0,0 +1,252 @@
+"""
+Sparse process matrix: stations x recipes x process parameters.
+
+Only the cells that hold a value are stored, one ProcessParameter row
+each. A row without a recipe applies to every recipe at that station,
+such as the bath temperature. Reads return coordinate (COO) form: axis
+lists for the stations, recipes and parameters present, plus parallel
+arrays with one entry per stored cell:
+
+    {"stations": [...], "recipes": [...], "parameters": ["temperature", ...],
+     "entries": {"station": [0, 0, 1], "recipe": [null, 0, 0],
+                 "parameter": [0, 1, 1], "value": [55.0, 3.0, 2.5], ...}}
+
+Indices point into the axis lists. ``recipe`` is null for station-wide
+cells. A line with hundreds of stations and a few filled cells per
+station stays small. Reads, bulk writes and derivation from recipe steps
+each use a fixed number of queries, whatever the size of the line.
+"""
+import re
+
+from django.db import transaction
+from django.db.models import Q
+
+from .coalesce import bump_line_version
+from .models import ProcessParameter, Recipe, RecipeStep, Station
+
+# Known parameters and their default units; chemistry uses "chem:<name>"
+PARAMETER_UNITS = {
+    'temperature': '°C',
+    'ph': '',
+    'agitation': '',
+    'voltage': 'V',
+    'current_density': 'A/dm²',
+    'rectifier_current': 'A',
+    'cathode_efficiency': '',
+    'target_thickness': 'µm',
+    'element': '',
+    'dwell_time': 's',
+    'min_dwell_time': 's',
+    'max_dwell_time': 's',
+    'drip_time': 's',
+}
+CHEMISTRY_UNIT = 'g/L'
+PARAMETER_PATTERN = re.compile(r'[a-z0-9_]+(:[a-z0-9_.-]+)?')
+
+# RecipeStep fields copied into the matrix by derive_from_recipe_steps
+DERIVED_STEP_FIELDS = (
+    'dwell_time', 'min_dwell_time', 'max_dwell_time', 'drip_time',
+    'current_density', 'rectifier_current', 'target_thickness',
+)
+
+VALUE_FIELDS = ['value', 'text_value', 'unit', 'source']
+
+
+def default_unit(parameter):
+    if parameter.startswith('chem:'):
+        return CHEMISTRY_UNIT
+    return PARAMETER_UNITS.get(parameter, '')
+
+
+def parse_id_list(raw):
+    """IDs from a comma-separated query parameter; None if absent. Raises ValueError."""
+    if not raw:
+        return None
+    return [int(part) for part in raw.split(',') if part.strip()]
+
+
+def matrix_slice(project, station_ids=None, recipe_ids=None, parameters=None):
+    """
+    The stored cells of the project's process matrix in COO form, limited
+    to the given stations, recipes and parameters. A recipe slice also
+    includes the station-wide cells that apply to it.
+    """
+    cells = ProcessParameter.objects.filter(project=project)
+    if station_ids is not None:
+        cells = cells.filter(station_id__in=station_ids)
+    if recipe_ids is not None:
+        cells = cells.filter(Q(recipe_id__in=recipe_ids) | Q(recipe__isnull=True))
+    if parameters is not None:
+        cells = cells.filter(parameter__in=parameters)
+    rows = list(cells.order_by('station__position_index', 'recipe_id', 'parameter').values_list(
+        'station_id', 'recipe_id', 'parameter', 'value', 'text_value', 'unit', 'source'))
+
+    station_rows = list(Station.objects.filter(project=project).order_by('position_index')
+                        .values_list('id', 'station_number', 'process_name'))
+    recipe_rows = list(Recipe.objects.filter(project=project).order_by('id').values_list('id', 'name'))
+
+    used_stations = {row[0] for row in rows}
+    used_recipes = {row[1] for row in rows if row[1] is not None}
+    stations = [s for s in station_rows if s[0] in used_stations]
+    recipes = [r for r in recipe_rows if r[0] in used_recipes]
+    parameters = sorted({row[2] for row in rows})
+    station_index = {s[0]: i for i, s in enumerate(stations)}
+    recipe_index = {r[0]: i for i, r in enumerate(recipes)}
+    parameter_index = {p: i for i, p in enumerate(parameters)}
+
+    columns = list(zip(*rows)) or [()] * 7
+    dense_size = len(station_rows) * (len(recipe_rows) + 1) * max(len(parameters), 1)
+    return {
+        'stations': [{'id': s[0], 'station_number': s[1], 'process_name': s[2]} for s in stations],
+        'recipes': [{'id': r[0], 'name': r[1]} for r in recipes],
+        'parameters': parameters,
+        'entries': {
+            'station': [station_index[s] for s in columns[0]],
+            'recipe': [None if r is None else recipe_index[r] for r in columns[1]],
+            'parameter': [parameter_index[p] for p in columns[2]],
+            'value': list(columns[3]),
+            'text_value': list(columns[4]),
+            'unit': list(columns[5]),
+            'source': list(columns[6]),
+        },
+        'nnz': len(rows),
+        'density_pct': round(len(rows) / dense_size * 100, 3) if dense_size else 0,
+    }
+
+
+def _clean_entry(entry, station_ids, recipe_ids):
+    """(key, values) for one write entry, or an error string."""
+    if not isinstance(entry, dict):
+        return "must be an object"
+    try:
+        station = int(entry.get('station'))
+        recipe = entry.get('recipe')
+        recipe = None if recipe in (None, '') else int(recipe)
+    except (TypeError, ValueError):
+        return "station and recipe must be IDs"
+    if station not in station_ids:
+        return f"station {station} is not on this line"
+    if recipe is not None and recipe not in recipe_ids:
+        return f"recipe {recipe} is not in this project"
+    parameter = str(entry.get('parameter') or '').strip().lower()
+    if not PARAMETER_PATTERN.fullmatch(parameter) or len(parameter) > 50:
+        return "parameter must be a lowercase name such as temperature or chem:nickel_sulfate"
+    value = entry.get('value')
+    try:
+        value = None if value in (None, '') else float(value)
+    except (TypeError, ValueError):
+        return "value must be a number"
+    text_value = str(entry.get('text_value') or '')[:100]
+    unit = entry.get('unit')
+    unit = default_unit(parameter) if unit is None else str(unit)[:20]
+    return (station, recipe, parameter), {'value': value, 'text_value': text_value, 'unit': unit}
+
+
+def upsert_entries(project, entries):
+    """
+    Bulk write cells. An entry with neither ``value`` nor ``text_value``
+    clears its cell. Written cells become manual, so re-deriving from the
+    recipe steps will not overwrite them.
+    """
+    if not isinstance(entries, list):
+        return {"error": "entries must be a list"}
+    station_ids = set(Station.objects.filter(project=project).values_list('id', flat=True))
+    recipe_ids = set(Recipe.objects.filter(project=project).values_list('id', flat=True))
+
+    cleaned = {}
+    for position, entry in enumerate(entries):
+        result = _clean_entry(entry, station_ids, recipe_ids)
+        if isinstance(result, str):
+            return {"error": f"entries[{position}]: {result}"}
+        key, values = result
+        cleaned[key] = values
+
+    existing = {
+        (cell.station_id, cell.recipe_id, cell.parameter): cell
+        for cell in ProcessParameter.objects.filter(
+            project=project,
+            station_id__in={key[0] for key in cleaned},
+            parameter__in={key[2] for key in cleaned})
+    }
+    to_create, to_update, to_delete = [], [], []
+    for key, values in cleaned.items():
+        cell = existing.get(key)
+        if values['value'] is None and not values['text_value']:
+            if cell is not None:
+                to_delete.append(cell.id)
+            continue
+        if cell is None:
+            to_create.append(ProcessParameter(project=project, station_id=key[0], recipe_id=key[1],
+                                              parameter=key[2], source='manual', **values))
+        else:
+            for field, value in values.items():
+                setattr(cell, field, value)
+            cell.source = 'manual'
+            to_update.append(cell)
+
+    with transaction.atomic():
+        if to_delete:
+            ProcessParameter.objects.filter(id__in=to_delete).delete()
+        ProcessParameter.objects.bulk_create(to_create, batch_size=1000)
+        ProcessParameter.objects.bulk_update(to_update, VALUE_FIELDS, batch_size=1000)
+    bump_line_version(project.pk)
+    return {'created': len(to_create), 'updated': len(to_update), 'deleted': len(to_delete)}
+
+
+def derive_from_recipe_steps(project, overwrite=False):
+    """
+    Rebuild the derived cells from the project's recipe steps in one
+    transaction: dwell and drip times, electrical settings, target
+    thickness and plated element per (station, recipe). Manual cells are
+    kept unless ``overwrite``. If a recipe visits a station more than
+    once, its first visit is used.
+    """
+    steps = (RecipeStep.objects.filter(recipe__project=project)
+             .order_by('recipe_id', 'step_order')
+             .values_list('station_id', 'recipe_id', 'element__symbol', 'cathode_efficiency',
+                          *DERIVED_STEP_FIELDS))
+    derived = {}
+    visited = set()
+    step_count = 0
+    for station, recipe, symbol, efficiency, *values in steps:
+        step_count += 1
+        if (station, recipe) in visited:
+            continue
+        visited.add((station, recipe))
+        cells = dict(zip(DERIVED_STEP_FIELDS, values))
+        if not cells['drip_time']:
+            cells['drip_time'] = None  # 0 is the "no drip" default
+        if symbol:
+            cells['cathode_efficiency'] = efficiency
+            derived[(station, recipe, 'element')] = (None, symbol)
+        for parameter, value in cells.items():
+            if value is not None:
+                derived[(station, recipe, parameter)] = (float(value), '')
+
+    manual = dict(
+        ((station, recipe, parameter), cell_id)
+        for cell_id, station, recipe, parameter in ProcessParameter.objects.filter(
+            project=project, source='manual', recipe__isnull=False,
+        ).values_list('id', 'station_id', 'recipe_id', 'parameter'))
+    replaced = [manual[key] for key in derived if key in manual] if overwrite else []
+    skipped = 0 if overwrite else sum(1 for key in derived if key in manual)
+
+    cells = [
+        ProcessParameter(project=project, station_id=key[0], recipe_id=key[1], parameter=key[2],
+                         value=value, text_value=text, unit=default_unit(key[2]), source='derived')
+        for key, (value, text) in derived.items()
+        if overwrite or key not in manual
+    ]
+    with transaction.atomic():
+        ProcessParameter.objects.filter(project=project, source='derived').delete()
+        if replaced:
+            ProcessParameter.objects.filter(id__in=replaced).delete()
+        ProcessParameter.objects.bulk_create(cells, batch_size=1000)
+    bump_line_version(project.pk)
+    return {
+        'steps': step_count,
+        'derived': len(cells),
+        'kept_manual': skipped,
+        'replaced_manual': len(replaced),
+        'repeated_station_visits': step_count - len(visited),
+    }
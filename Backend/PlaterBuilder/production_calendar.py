@@ -0,0 +1,115 @@
+"""
+Productive hours per projection period, derived from the project's
+ProductionCalendar.
+
+    shift = shift length - breaks
+    day   = shifts per day x shift
+    week  = working days x day - planned downtime
+    year  = 52 weeks - holiday days
+    month = year / 12
+
+Projects without a calendar fall back to one shift of
+SimulationParameters.working_hours_per_day on working_days_per_week.
+
+The result is cached per project, signed with the project's line_version.
+Saving a calendar or the parameters bumps that version (see signals.py),
+in this process or any other, so a read only compares the signature with
+the project row the caller already loaded, and a hit costs no query. The
+price is that every other line edit (a station, a recipe) bumps the
+version too and forces a rebuild, which is one small query. Local edits
+also drop the cached entry. A caller holding a project loaded before an
+edit elsewhere can still get the earlier capacity, as it would for every
+other field of that row.
+"""
+from django.core.cache import cache
+
+from .models import ProductionCalendar
+
+WEEKS_PER_YEAR = 52
+PERIODS = ('hour', 'shift', 'day', 'week', 'month', 'year')
+CALENDAR_CACHE_TIMEOUT = 24 * 60 * 60
+
+
+class CalendarCapacity:
+    """Productive hours in each projection period."""
+
+    def __init__(self, shifts_per_day=1, shift_length_hours=8.0, break_minutes_per_shift=0.0,
+                 working_days_per_week=5, planned_downtime_hours_per_week=0.0, holidays_per_year=0,
+                 source='parameters'):
+        self.source = source
+        self.shifts_per_day = max(1, shifts_per_day or 1)
+        self.working_days_per_week = working_days_per_week or 0
+
+        shift = max(0.0, (shift_length_hours or 0) - (break_minutes_per_shift or 0) / 60)
+        day = shift * self.shifts_per_day
+        week = max(0.0, day * self.working_days_per_week - (planned_downtime_hours_per_week or 0))
+        year = max(0.0, week * WEEKS_PER_YEAR - (holidays_per_year or 0) * day)
+        self.hours = {
+            'hour': 1.0,
+            'shift': shift,
+            'day': day,
+            'week': week,
+            'month': year / 12,
+            'year': year,
+        }
+
+    @classmethod
+    def from_calendar(cls, calendar):
+        return cls(
+            shifts_per_day=calendar.shifts_per_day,
+            shift_length_hours=calendar.shift_length_hours,
+            break_minutes_per_shift=calendar.break_minutes_per_shift,
+            working_days_per_week=calendar.working_days_per_week,
+            planned_downtime_hours_per_week=calendar.planned_downtime_hours_per_week,
+            holidays_per_year=calendar.holidays_per_year,
+            source='calendar',
+        )
+
+    @classmethod
+    def from_parameters(cls, params):
+        return cls(
+            shift_length_hours=params.working_hours_per_day or 8,
+            working_days_per_week=params.working_days_per_week or 5,
+        )
+
+    def project(self, parts_per_hour):
+        """Parts per period at a steady ``parts_per_hour``."""
+        return {f'parts_per_{period}': parts_per_hour * hours for period, hours in self.hours.items()}
+
+    def to_parts_per_hour(self, period, parts):
+        hours = self.hours.get(period)
+        return parts / hours if hours else 0
+
+    def as_dict(self):
+        return {
+            'source': self.source,
+            'shifts_per_day': self.shifts_per_day,
+            'working_days_per_week': self.working_days_per_week,
+            'productive_hours': {period: round(hours, 4) for period, hours in self.hours.items()},
+        }
+
+
+def calendar_cache_key(project_pk):
+    return f"calendar_capacity:{project_pk}"
+
+
+def get_calendar_capacity(project, params=None):
+    """Cached CalendarCapacity for the project's current calendar or parameters."""
+    key = calendar_cache_key(project.pk)
+    # Read before the calendar, so an edit made meanwhile leaves an entry that no longer matches
+    signature = project.line_version
+    cached = cache.get(key)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    try:
+        capacity = CalendarCapacity.from_calendar(ProductionCalendar.objects.get(project=project))
+    except ProductionCalendar.DoesNotExist:
+        if params is None:
+            params = getattr(project, 'simulation_parameters', None)
+        capacity = CalendarCapacity.from_parameters(params) if params is not None else CalendarCapacity()
+    cache.set(key, (signature, capacity), CALENDAR_CACHE_TIMEOUT)
+    return capacity
+
+
+def invalidate_calendar_capacity(project_pk):
+    cache.delete(calendar_cache_key(project_pk))
@@ -0,0 +1,331 @@
+"""
+Quote documents built from the project, its latest simulation, the
+budget and the uploaded sketches.
+
+A quote is generated on a single background worker (``QUOTE_WORKERS``).
+Every server process has its own worker, so a worker claims the quote in
+the database (pending -> rendering, with a conditional update) before it
+builds anything; a quote already claimed is left alone. A quote queued or
+claimed more than ``QUOTE_TIMEOUT`` ago, whose process died, is queued
+again when it is next requested. The HTML is produced as a sequence of small chunks and written to a
+temporary file, then handed to storage. The whole document is never held
+in memory, even for a long line with a large sketch. Sketch previews are
+base64-encoded into the page a block at a time, so the file stands on its
+own.
+
+Each quote records a hash of its inputs' version stamps (``quote_stamp``):
+the line version, the budget totals, the latest simulation id and so on,
+read in a few small queries. Checking whether a quote is current is
+therefore cheap and writes nothing; only the worker builds the full
+inputs. Requesting a quote for a project whose stamps hash the same as an
+existing quote returns that quote, ready or still on its way, without
+generating a new one. Only the newest ``QUOTE_HISTORY`` quotes of a
+project are kept.
+"""
+import base64
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+from django.utils.html import escape
+
+from .budget import budget_summary, get_budget, refresh_controls
+from .models import Budget, BudgetLine, Customers, Quote, Station, StoredDocument
+
+logger = logging.getLogger(__name__)
+
+# Bump when the document layout changes, so unchanged projects re-render
+QUOTE_FORMAT_VERSION = 1
+QUOTE_HISTORY = 5
+QUOTE_DIRECTORY = 'quotes'
+# Multiple of 3, so each base64 block encodes without padding
+EMBED_BLOCK_SIZE = 3 * 64 * 1024
+
+RESULT_FIELDS = (
+    'id', 'name', 'simulation_date', 'parts_per_hour', 'parts_per_day', 'parts_per_year',
+    'cycle_time', 'hoist_count', 'hoist_utilization', 'bottleneck_station',
+    'meets_production_goal', 'recommendations',
+)
+STATION_FIELDS = ('station_number', 'process_name', 'tank_length', 'tank_width', 'parallel_tanks')
+BUDGET_STAMP_FIELDS = ('tanks_total', 'rectifiers_total', 'hoists_total', 'controls_total', 'contingency_pct',
+                       'last_updated')
+# A queued or claimed quote untouched for this long is taken over
+QUOTE_TIMEOUT = timedelta(minutes=5)
+IN_PROGRESS = ('pending', 'rendering')
+
+_executor = None
+_lock = threading.Lock()
+# Quote ids queued or rendering in this process
+_queued = set()
+
+
+def _pool():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=getattr(settings, 'QUOTE_WORKERS', 1),
+                                           thread_name_prefix='quote')
+    return _executor
+
+
+def quote_inputs(project):
+    """Everything a quote is built from, as plain JSON-serialisable data."""
+    budget = get_budget(project)
+    refresh_controls(budget)
+    budget.refresh_from_db()
+    result = project.simulation_results.order_by('-simulation_date').values(*RESULT_FIELDS).first()
+    if result:
+        result['simulation_date'] = result['simulation_date'].isoformat()
+
+    names = {field: getattr(project, field).name for field in ('sketch', 'spec_document')}
+    stored = {document.file.name: document
+              for document in StoredDocument.objects.filter(file__in=[n for n in names.values() if n])}
+    documents = []
+    for field, name in names.items():
+        if not name:
+            continue
+        document = stored.get(name)
+        ready = document is not None and document.preview_status == 'ready'
+        documents.append({
+            'field': field,
+            'filename': os.path.basename(name),
+            'sha256': document.sha256 if document else None,
+            'preview': document.preview.name if ready else None,
+        })
+
+    return {
+        'version': QUOTE_FORMAT_VERSION,
+        'project': {
+            'project_id': project.project_id,
+            'project_name': project.project_name,
+            'equipment_type': project.get_equipment_type_display(),
+            'process': project.process,
+            'substrate': project.substrate,
+        },
+        'customer': {
+            'company_name': project.customer.company_name,
+            'point_of_contact': project.customer.point_of_contact,
+            'email': project.customer.email,
+        },
+        'simulation': result,
+        'stations': list(Station.objects.filter(project=project).order_by('position_index')
+                         .values(*STATION_FIELDS)),
+        'budget': budget_summary(budget),
+        'documents': documents,
+    }
+
+
+def quote_stamp(project):
+    """
+    Version stamps of everything quote_inputs reads, without building the
+    inputs or writing anything. Stations and parameters are covered by the
+    line version, the controls I/O by the controls version, and budget
+    line edits by the budget's totals and line aggregates.
+    """
+    names = [getattr(project, field).name for field in ('sketch', 'spec_document')]
+    return {
+        'version': QUOTE_FORMAT_VERSION,
+        'project': [project.project_id, project.project_name, project.equipment_type, project.process,
+                    project.substrate, project.line_version, project.controls_version],
+        'customer': Customers.objects.filter(pk=project.customer_id)
+                    .values('company_name', 'point_of_contact', 'email').first(),
+        'simulation': project.simulation_results.order_by('-simulation_date').values_list('id', flat=True).first(),
+        'budget': Budget.objects.filter(project=project).values(*BUDGET_STAMP_FIELDS).first(),
+        'budget_lines': BudgetLine.objects.filter(project=project).aggregate(
+            count=Count('id'), quantity=Sum('quantity'), amount=Sum('amount')),
+        'documents': [names, list(StoredDocument.objects.filter(file__in=[n for n in names if n]).order_by('file')
+                                  .values_list('sha256', 'preview_status', 'preview'))],
+    }
+
+
+def input_hash(stamp):
+    encoded = json.dumps(stamp, sort_keys=True, separators=(',', ':'), cls=DjangoJSONEncoder)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def _money(amount):
+    return f"{amount:,.2f}"
+
+
+def _table(headings, rows):
+    yield '<table><thead><tr>'
+    yield ''.join(f'<th>{escape(heading)}</th>' for heading in headings)
+    yield '</tr></thead><tbody>\n'
+    for row in rows:
+        yield '<tr>' + ''.join(f'<td>{escape(cell)}</td>' for cell in row) + '</tr>\n'
+    yield '</tbody></table>\n'
+
+
+def _embedded_image(name):
+    """A storage PNG as a data URI, encoded block by block."""
+    yield '<img alt="" src="data:image/png;base64,'
+    with default_storage.open(name, 'rb') as fh:
+        for block in iter(lambda: fh.read(EMBED_BLOCK_SIZE), b''):
+            yield base64.b64encode(block).decode('ascii')
+    yield '">'
+
+
+def quote_chunks(inputs):
+    """The quote as a sequence of HTML fragments."""
+    project, customer = inputs['project'], inputs['customer']
+    title = f"Quote: {project['project_name']} ({project['project_id']})"
+    yield (f'<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>{escape(title)}</title>'
+           '<style>body{font-family:sans-serif;margin:2em}table{border-collapse:collapse;margin:1em 0}'
+           'td,th{border:1px solid #ccc;padding:4px 8px;text-align:left}img{max-width:480px}</style>'
+           f'</head><body>\n<h1>{escape(title)}</h1>\n')
+    yield (f"<p>Prepared for {escape(customer['company_name'])}, attn. {escape(customer['point_of_contact'])} "
+           f"({escape(customer['email'])}).</p>\n")
+    yield from _table(['Process', 'Substrate', 'Equipment'],
+                      [[project['process'], project['substrate'], project['equipment_type'] or '-']])
+
+    yield '<h2>Line</h2>\n'
+    yield from _table(['Station', 'Process', 'Tank (m)', 'Parallel tanks'], (
+        [s['station_number'], s['process_name'], f"{s['tank_length'] or 0:g} x {s['tank_width'] or 0:g}",
+         s['parallel_tanks']] for s in inputs['stations']))
+
+    result = inputs['simulation']
+    yield '<h2>Throughput</h2>\n'
+    if result:
+        yield from _table(['Simulation', 'Parts/hour', 'Parts/day', 'Parts/year', 'Cycle time (s)',
+                           'Hoists', 'Hoist utilization', 'Bottleneck', 'Meets goal'], [[
+            result['name'], f"{result['parts_per_hour']:,.1f}", f"{result['parts_per_day']:,.0f}",
+            f"{result['parts_per_year']:,.0f}", f"{result['cycle_time']:,.1f}", result['hoist_count'],
+            f"{result['hoist_utilization']:.1f}%", result['bottleneck_station'] or '-',
+            'Yes' if result['meets_production_goal'] else 'No']])
+        if result['recommendations']:
+            yield f"<p>{escape(result['recommendations'])}</p>\n"
+    else:
+        yield '<p>No simulation has been run for this project.</p>\n'
+
+    budget = inputs['budget']
+    yield '<h2>Equipment budget</h2>\n'
+    yield from _table(['Item', 'Quantity', 'Unit cost', 'Amount'], (
+        [line['description'], f"{line['quantity']:g}", _money(line['unit_cost']), _money(line['amount'])]
+        for line in budget['lines']))
+    yield from _table(['Subtotal', f"Contingency ({budget['contingency_pct']:g}%)", 'Total'],
+                      [[_money(budget['subtotal']), _money(budget['contingency']), _money(budget['total'])]])
+
+    if inputs['documents']:
+        yield '<h2>Documents</h2>\n'
+    for document in inputs['documents']:
+        yield "<figure>"
+        if document['preview']:
+            yield from _embedded_image(document['preview'])
+        yield f"<figcaption>{escape(document['filename'])}</figcaption></figure>\n"
+    yield '</body></html>\n'
+
+
+def quote_name(quote):
+    return f'{QUOTE_DIRECTORY}/{quote.project.project_id}/quote-{quote.input_hash[:16]}.html'
+
+
+def _claim(quote_id):
+    """Claim the quote for this worker; returns the claim time, or None if taken."""
+    started = timezone.now()
+    lapsed = Q(started_at__isnull=True) | Q(started_at__lt=started - QUOTE_TIMEOUT)
+    claimed = Quote.objects.filter(
+        Q(status='pending') | Q(lapsed, status='rendering'), pk=quote_id,
+    ).update(status='rendering', started_at=started)
+    return started if claimed else None
+
+
+def generate_quote(quote_id):
+    """Worker task: build one quote's inputs and stream it to storage, recording the outcome."""
+    close_old_connections()
+    try:
+        started = _claim(quote_id)
+        if started is None:
+            return
+        # Outcomes are only recorded while the claim is still this worker's
+        claim = Quote.objects.filter(pk=quote_id, status='rendering', started_at=started)
+        try:
+            quote = claim.select_related('project__customer').first()
+            if quote is None:
+                return
+            with tempfile.TemporaryFile() as spool:
+                for chunk in quote_chunks(quote_inputs(quote.project)):
+                    spool.write(chunk.encode('utf-8'))
+                size = spool.tell()
+                spool.seek(0)
+                name = default_storage.save(quote_name(quote), File(spool))
+            if not claim.update(file=name, size=size, status='ready', completed_at=timezone.now()):
+                # Quote deleted or taken over while rendering
+                default_storage.delete(name)
+                return
+            _prune(quote.project_id)
+        except Exception as exc:
+            logger.exception("Quote generation failed for quote %s", quote_id)
+            claim.update(status='failed', error=str(exc)[:1000], completed_at=timezone.now())
+    finally:
+        _queued.discard(quote_id)
+        close_old_connections()
+
+
+def _prune(project_pk):
+    """Delete all but the newest QUOTE_HISTORY quotes of a project."""
+    stale = list(Quote.objects.filter(project_id=project_pk).exclude(status__in=IN_PROGRESS)
+                 .values_list('id', flat=True)[QUOTE_HISTORY:])
+    if stale:
+        Quote.objects.filter(id__in=stale).delete()
+
+
+def _schedule(quote):
+    with _lock:
+        if quote.pk in _queued:
+            return
+        _queued.add(quote.pk)
+    _pool().submit(generate_quote, quote.pk)
+
+
+def _lapsed(quote):
+    return quote.started_at is None or quote.started_at < timezone.now() - QUOTE_TIMEOUT
+
+
+def request_quote(project, force=False):
+    """
+    The quote for the project as it stands: an existing quote with the
+    same inputs, or a new one queued for generation. Returns (quote,
+    created). ``force`` regenerates even if the inputs are unchanged;
+    a failed quote is always regenerated.
+    """
+    # Bring the budget and controls up to date first, so the stamp is what the worker will read
+    refresh_controls(get_budget(project))
+    project.refresh_from_db(fields=['line_version', 'controls_version'])
+    digest = input_hash(quote_stamp(project))
+    quote = Quote.objects.filter(project=project, input_hash=digest).first()
+    if quote is not None and not force and quote.status != 'failed':
+        if quote.status in IN_PROGRESS and _lapsed(quote):
+            # Its worker died with an earlier process
+            _schedule(quote)
+        return quote, False
+
+    try:
+        with transaction.atomic():
+            if quote is not None:
+                quote.delete()
+            quote = Quote.objects.create(project=project, input_hash=digest, started_at=timezone.now())
+    except IntegrityError:
+        # Requested at the same moment elsewhere
+        return Quote.objects.get(project=project, input_hash=digest), False
+    transaction.on_commit(lambda: _schedule(quote))
+    return quote, True
+
+
+def current_quote(project):
+    """The latest quote, and whether it still matches the project. Reads only."""
+    quote = Quote.objects.filter(project=project).first()
+    if quote is None:
+        return None, False
+    return quote, quote.input_hash == input_hash(quote_stamp(project))
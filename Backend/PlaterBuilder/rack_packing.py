@@ -0,0 +1,109 @@
+"""
+Physical parts-per-rack limit from part and tank geometry.
+
+A rack has to fit every tank its recipe visits, so its envelope is the
+smallest tank_length x tank_width on the route. Stations without entered
+dimensions are skipped. ``part_spacing`` is kept between parts and
+between parts and the tank walls.
+
+Parts are packed by their length x width footprint with a guillotine
+heuristic. A grid of one orientation fills a corner. The strip left along
+either side is then packed the same way, recursively, trying both
+orientations. Geometry is rounded to whole millimetres and the recursion
+is memoised, so repeated evaluations of the same part in the same tank
+are free.
+
+``recipe_rack_loads`` is the one place the requested parts per rack is
+capped by that limit. Throughput, rectifier sizing and dwell times from
+rectifier current all use it, so they agree on what a rack carries.
+"""
+from functools import lru_cache
+
+DEFAULT_PART_SPACING = 0.02
+
+
+@lru_cache(maxsize=4096)
+def pack_rectangles(length, width, part_length, part_width, gap):
+    """Parts of ``part_length x part_width`` that fit in ``length x width`` (all in mm)."""
+    best = 0
+    for p, q in ((part_length, part_width), (part_width, part_length)):
+        if p <= 0 or q <= 0 or p > length or q > width:
+            continue
+        along = (length + gap) // (p + gap)
+        across = (width + gap) // (q + gap)
+        block = along * across
+        # Free space past the grid, already clear of the last part's gap
+        rest_length = length - along * (p + gap)
+        rest_width = width - across * (q + gap)
+        best = max(
+            best,
+            block + (pack_rectangles(rest_length, width, part_length, part_width, gap) if rest_length > 0 else 0),
+            block + (pack_rectangles(length, rest_width, part_length, part_width, gap) if rest_width > 0 else 0),
+        )
+    return best
+
+
+def _mm(metres):
+    return int(round((metres or 0) * 1000))
+
+
+def rack_envelope(stations, spacing):
+    """Usable length x width in metres of the smallest tank, or None without geometry."""
+    sized = [s for s in stations if (s.tank_length or 0) > 0 and (s.tank_width or 0) > 0]
+    if not sized:
+        return None
+    length = min(s.tank_length for s in sized) - 2 * spacing
+    width = min(s.tank_width for s in sized) - 2 * spacing
+    return max(length, 0.0), max(width, 0.0)
+
+
+def recipe_rack_capacity(recipe, spacing=DEFAULT_PART_SPACING):
+    """
+    Physical parts-per-rack limit for a recipe, with the details behind it.
+    None when the recipe has no part or its tanks have no dimensions.
+    """
+    part = recipe.part_size
+    if part is None:
+        return None
+    stations = [step.station for step in recipe.steps.all()]
+    envelope = rack_envelope(stations, spacing)
+    if envelope is None:
+        return None
+    count = pack_rectangles(_mm(envelope[0]), _mm(envelope[1]), _mm(part.length), _mm(part.width), _mm(spacing))
+    return {
+        'recipe_id': recipe.id,
+        'recipe_name': recipe.name,
+        'part_size_id': part.id,
+        'part_name': part.name,
+        'envelope_length': round(envelope[0], 4),
+        'envelope_width': round(envelope[1], 4),
+        'max_parts_per_rack': count,
+        'packing_efficiency_pct': (
+            round(count * part.length * part.width / (envelope[0] * envelope[1]) * 100, 2)
+            if envelope[0] * envelope[1] > 0 else 0),
+    }
+
+
+def part_spacing(params):
+    """Part spacing of the project's parameters, or the default."""
+    if params is None or params.part_spacing is None:
+        return DEFAULT_PART_SPACING
+    return params.part_spacing
+
+
+def capped_parts_per_rack(requested, capacity):
+    """Requested parts per rack, capped by a recipe_rack_capacity result (None means no known limit)."""
+    requested = requested or 1
+    if capacity is None:
+        return requested
+    return max(1, min(requested, capacity['max_parts_per_rack']))
+
+
+def recipe_rack_loads(recipes, params):
+    """
+    Parts per rack each recipe actually carries, by recipe id. The
+    recipes need ``part_size`` and ``steps__station`` loaded.
+    """
+    requested = (params.parts_per_rack if params is not None else 1) or 1
+    spacing = part_spacing(params)
+    return {recipe.id: capped_parts_per_rack(requested, recipe_rack_capacity(recipe, spacing)) for recipe in recipes}
@@ -0,0 +1,45 @@
+"""
+JSON renderer backed by orjson when it is installed.
+
+orjson encodes a large list of dicts several times faster than the
+standard library. Types it does not handle itself are passed to DRF's
+JSONEncoder, so the output matches JSONRenderer. That covers datetimes,
+Decimal and lazy strings. Two cases still go through JSONRenderer: an
+indented response (requested via the Accept header) and data orjson
+refuses, such as integers wider than 64 bits. Without orjson this is
+JSONRenderer. U+2028 and U+2029 are escaped afterwards, as JSONRenderer
+does.
+
+Where the two still differ: a NaN or infinite float renders as null,
+where JSONRenderer (with STRICT_JSON) raises. So the renderer is not the
+default; it is set, through LIST_RENDERERS, on the large read endpoints
+whose rows are plain model values.
+"""
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # orjson is optional
+    orjson = None
+
+_encoder = JSONEncoder()
+ORJSON_OPTIONS = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            rendered = orjson.dumps(data, default=_encoder.default, option=ORJSON_OPTIONS)
+        except (orjson.JSONEncodeError, TypeError):
+            return super().render(data, accepted_media_type, renderer_context)
+        # Line and paragraph separators are valid JSON but not valid JavaScript
+        return rendered.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
+
+# For @renderer_classes on the large read endpoints
+LIST_RENDERERS = [FastJSONRenderer, BrowsableAPIRenderer]
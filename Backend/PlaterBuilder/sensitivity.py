@@ -0,0 +1,152 @@
+"""
+Throughput sensitivity to every timing input, for tornado charts.
+
+Each RecipeStep dwell / drip time and each SimulationParameters timing
+field is moved down and up by a fraction of its value. A zero value is
+only moved up, by a small absolute step. Hoist speeds, acceleration and
+lift height are the exception: zero there means the travel model is off
+for that axis (see travel.py), not a tiny value, so an unset one is
+skipped rather than stepped to a crawl. The parts-per-hour at each end
+gives the swing and the derivative.
+
+Step perturbations only shift one station's occupied time and the
+hoist work, both by (delta x production ratio). They are evaluated
+together in one pass over a CapacitySnapshot. Keeping the two largest
+per-tank station times makes each evaluation O(1). Simulation parameters
+also change travel times and shared-resource service times, so each one
+gets a perturbed snapshot. There are only a handful of them.
+"""
+import copy
+
+from .services import CapacitySnapshot
+from .travel import TravelMatrix
+
+DEFAULT_FRACTION = 0.1
+
+# field -> (label, unit, value the simulator uses when unset, absolute step used when the value is zero).
+# No step: zero turns that part of the travel model off, so an unset field is skipped.
+PARAMETER_FIELDS = {
+    'transfer_time': ("Transfer time", 's', 10, 1.0),
+    'part_load_time': ("Part load time", 's', 60, 1.0),
+    'part_unload_time': ("Part unload time", 's', 60, 1.0),
+    'hoist_speed_horizontal': ("Hoist horizontal speed", 'm/s', 0, None),
+    'hoist_speed_vertical': ("Hoist vertical speed", 'm/s', 0, None),
+    'hoist_acceleration': ("Hoist acceleration", 'm/s²', 0, None),
+    'lift_height': ("Lift height", 'm', 0, None),
+}
+
+STEP_FIELDS = {
+    'dwell_time': "dwell",
+    'drip_time': "drip",
+}
+
+
+def _bounds(value, fraction, zero_step):
+    if value > 0:
+        return value * (1 - fraction), value * (1 + fraction)
+    return value, value + zero_step
+
+
+class SensitivityAnalysis:
+
+    def __init__(self, simulator, hoist_count=None, fraction=DEFAULT_FRACTION):
+        self.simulator = simulator
+        self.hoist_count = simulator.resolve_hoist_count(hoist_count)
+        self.fraction = fraction
+        self.parts_per_rack = simulator.parts_per_rack()
+        self.snapshot = CapacitySnapshot(simulator)
+        self.baseline = self.snapshot.parts_per_hour(self.hoist_count)
+
+    # ------------------------------------------------------------------
+    # Recipe steps: one batched pass
+    # ------------------------------------------------------------------
+    def _step_rows(self):
+        snapshot = self.snapshot
+        index = {info['station_id']: i for i, info in enumerate(snapshot.stations)}
+        tank_times = [occ / k for occ, k in zip(snapshot.occupied, snapshot.tanks)]
+        ranked = sorted(range(len(tank_times)), key=tank_times.__getitem__, reverse=True)
+        top = ranked[0] if ranked else None
+        runner_up = tank_times[ranked[1]] if len(ranked) > 1 else 0
+        hoist_capacity = self.hoist_count * 0.8 if self.hoist_count > 0 else 1
+
+        def pph(station, delta):
+            # Super-cycle with one station's occupied time and the hoist work shifted by delta
+            others = runner_up if station == top else (tank_times[top] if top is not None else 0)
+            station_time = (snapshot.occupied[station] + delta) / snapshot.tanks[station]
+            hoist_time = (snapshot.weighted_cycle_sum + delta) / hoist_capacity
+            return snapshot.parts_per_hour_at(max(others, station_time, hoist_time), self.parts_per_rack)
+
+        rows = []
+        for recipe in self.simulator.recipes:
+            for step in recipe.steps.all():
+                station = index.get(step.station_id)
+                if station is None:
+                    continue
+                values = {
+                    'dwell_time': step.dwell_time or step.min_dwell_time or 0,
+                    'drip_time': step.drip_time or 0,
+                }
+                for field, label in STEP_FIELDS.items():
+                    value = values[field]
+                    low, high = _bounds(value, self.fraction, 1.0)
+                    ratio = recipe.production_ratio
+                    rows.append(self._row(
+                        parameter=field, scope='step', unit='s',
+                        label=f"{recipe.name} step {step.step_order} ({step.station.station_number}) {label}",
+                        value=value, low=low, high=high,
+                        pph_low=pph(station, (low - value) * ratio),
+                        pph_high=pph(station, (high - value) * ratio),
+                        recipe_id=recipe.id, step_id=step.id, station_id=step.station_id,
+                    ))
+        return rows
+
+    # ------------------------------------------------------------------
+    # Simulation parameters: one perturbed snapshot each
+    # ------------------------------------------------------------------
+    def _perturbed_pph(self, field, value):
+        perturbed = copy.copy(self.simulator)
+        perturbed.params = copy.copy(self.simulator.params)
+        setattr(perturbed.params, field, value)
+        perturbed.travel = TravelMatrix(self.simulator.stations, perturbed.params)
+        return CapacitySnapshot(perturbed).parts_per_hour(self.hoist_count)
+
+    def _parameter_rows(self):
+        rows = []
+        for field, (label, unit, default, zero_step) in PARAMETER_FIELDS.items():
+            value = getattr(self.simulator.params, field) or default
+            if not value and zero_step is None:
+                continue
+            low, high = _bounds(value, self.fraction, zero_step)
+            rows.append(self._row(
+                parameter=field, scope='simulation', unit=unit, label=label,
+                value=value, low=low, high=high,
+                pph_low=self._perturbed_pph(field, low),
+                pph_high=self._perturbed_pph(field, high),
+            ))
+        return rows
+
+    # ------------------------------------------------------------------
+    # Report
+    # ------------------------------------------------------------------
+    def _row(self, value, low, high, pph_low, pph_high, **fields):
+        return {
+            **fields,
+            'value': round(value, 4),
+            'low_value': round(low, 4),
+            'high_value': round(high, 4),
+            'parts_per_hour_low': round(pph_low, 2),
+            'parts_per_hour_high': round(pph_high, 2),
+            'swing': round(abs(pph_high - pph_low), 4),
+            'derivative': round((pph_high - pph_low) / (high - low), 6) if high != low else 0,
+        }
+
+    def run(self, limit=None):
+        rows = self._step_rows() + self._parameter_rows()
+        rows.sort(key=lambda row: row['swing'], reverse=True)
+        return {
+            'baseline_parts_per_hour': round(self.baseline, 2),
+            'hoist_count': self.hoist_count,
+            'perturbation_pct': round(self.fraction * 100, 2),
+            'parameters_evaluated': len(rows),
+            'rows': rows[:limit] if limit else rows,
+        }
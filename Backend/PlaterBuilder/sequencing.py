@@ -0,0 +1,215 @@
+"""
+Recipe sequencing for mixed-model production.
+
+calculate_throughput assumes recipes blend perfectly within a super-cycle.
+In practice the order flight bars enter the line decides how long each one
+waits for the previous bar to clear a shared tank. This module finds a
+repeating order of recipes that keeps the production ratios (a 3:2:1 mix
+becomes a cycle of 6 bars) and has the shortest period.
+
+Scoring: for every ordered pair of recipes (a, b), the headway h(a, b) is
+the minimum time between a and b entering the line such that b never
+reaches a single-tank station before a has left it. It never drops below
+the load time or b's share of hoist capacity. A cyclic sequence's period
+is the sum of its consecutive headways. Duplicate-tank stations are
+assumed to absorb back-to-back visits. The headway matrix is computed
+once, so each candidate is scored with additions only.
+
+Search: exact dynamic programming over (remaining recipe counts, last
+recipe), memoizing the best completion of each partial sequence. It is
+bounded by a time budget. If the budget or state space runs out, the greedy
+nearest-headway sequence is returned instead.
+"""
+import math
+import time
+from functools import reduce
+
+MAX_DP_BARS = 400
+
+
+class _BudgetExceeded(Exception):
+    pass
+
+
+class SequenceOptimizer:
+    """Finds the best repeating flight-bar order for a ProductionSimulator."""
+
+    def __init__(self, simulator, hoist_count=None):
+        self.simulator = simulator
+        self.states_evaluated = 0
+        self.recipes = [r for r in simulator.recipes if r.steps.all() and r.production_ratio > 0]
+        self.hoist_count = simulator.resolve_hoist_count(hoist_count)
+
+        divisor = reduce(math.gcd, (r.production_ratio for r in self.recipes), 0) or 1
+        self.counts = tuple(r.production_ratio // divisor for r in self.recipes)
+        self.headways = self._headway_matrix()
+
+    # ------------------------------------------------------------------
+    # Headways
+    # ------------------------------------------------------------------
+    def _visits(self, recipe):
+        """(station_id, enter, leave) offsets from the bar entering the line."""
+        travel = self.simulator.travel
+        t = self.simulator.params.part_load_time or 60
+        visits = []
+        previous = None
+        for step in recipe.steps.all():
+            if previous is not None:
+                t += travel.move_time(previous.station_id, step.station_id)
+            enter = t
+            t += (step.dwell_time or step.min_dwell_time or 0) + (step.drip_time or 0)
+            visits.append((step.station_id, enter, t))
+            previous = step
+        return visits
+
+    def _headway_matrix(self):
+        single_tank = {s.id for s in self.simulator.stations if (s.parallel_tanks or 1) <= 1}
+        load_time = self.simulator.params.part_load_time or 60
+        hoist_capacity = max(self.hoist_count, 1) * 0.8
+
+        visits = [self._visits(r) for r in self.recipes]
+        hoist_share = [
+            self.simulator._calculate_recipe_cycle_time(r) / hoist_capacity for r in self.recipes
+        ]
+
+        matrix = []
+        for a_visits in visits:
+            leave_by_station = {}
+            for station_id, _, leave in a_visits:
+                if station_id in single_tank:
+                    leave_by_station[station_id] = max(leave, leave_by_station.get(station_id, 0))
+            row = []
+            for b, b_visits in enumerate(visits):
+                headway = max(load_time, hoist_share[b])
+                for station_id, enter, _ in b_visits:
+                    if station_id in leave_by_station:
+                        headway = max(headway, leave_by_station[station_id] - enter)
+                row.append(headway)
+            matrix.append(row)
+        return matrix
+
+    # ------------------------------------------------------------------
+    # Scoring
+    # ------------------------------------------------------------------
+    def period(self, sequence):
+        """Repeat period in seconds of a cyclic sequence of recipe indexes."""
+        if not sequence:
+            return 0
+        h = self.headways
+        return sum(h[a][b] for a, b in zip(sequence, sequence[1:] + sequence[:1]))
+
+    def _blocked_sequence(self):
+        """All bars of each recipe together, the order planners default to."""
+        return [i for i, count in enumerate(self.counts) for _ in range(count)]
+
+    def _greedy_sequence(self):
+        remaining = list(self.counts)
+        total = sum(remaining)
+        sequence = [max(range(len(remaining)), key=lambda i: remaining[i])]
+        remaining[sequence[0]] -= 1
+        for _ in range(1, total):
+            last = sequence[-1]
+            # Prefer the shortest headway; break ties towards the recipe
+            # furthest behind its share so the mix stays spread out
+            candidates = [i for i, count in enumerate(remaining) if count]
+            choice = min(candidates, key=lambda i: (
+                self.headways[last][i], -(remaining[i] / self.counts[i])))
+            sequence.append(choice)
+            remaining[choice] -= 1
+        return sequence
+
+    # ------------------------------------------------------------------
+    # Exact search
+    # ------------------------------------------------------------------
+    def _solve(self, first, deadline):
+        """Best cyclic sequence starting with recipe ``first``."""
+        h = self.headways
+        n = len(self.counts)
+        memo = {}
+
+        def best(remaining, last):
+            key = (remaining, last)
+            if key in memo:
+                return memo[key]
+            self.states_evaluated += 1
+            if self.states_evaluated % 1024 == 0 and time.perf_counter() > deadline:
+                raise _BudgetExceeded()
+            if not any(remaining):
+                result = (h[last][first], None)
+            else:
+                result = (math.inf, None)
+                for i in range(n):
+                    if remaining[i]:
+                        rest = remaining[:i] + (remaining[i] - 1,) + remaining[i + 1:]
+                        cost = h[last][i] + best(rest, i)[0]
+                        if cost < result[0]:
+                            result = (cost, i)
+            memo[key] = result
+            return result
+
+        start = self.counts[:first] + (self.counts[first] - 1,) + self.counts[first + 1:]
+        cost, _ = best(start, first)
+
+        sequence = [first]
+        remaining = start
+        while any(remaining):
+            nxt = memo[(remaining, sequence[-1])][1]
+            sequence.append(nxt)
+            remaining = remaining[:nxt] + (remaining[nxt] - 1,) + remaining[nxt + 1:]
+        return cost, sequence
+
+    def optimize(self, time_budget=1.0):
+        started = time.perf_counter()
+        deadline = started + time_budget
+        self.states_evaluated = 0
+
+        best_sequence = self._greedy_sequence()
+        best_period = self.period(best_sequence)
+        optimal = False
+
+        if sum(self.counts) <= MAX_DP_BARS:
+            try:
+                # Every cycle can be rotated to start with the first recipe
+                cost, sequence = self._solve(0, deadline)
+                if cost < best_period:
+                    best_period, best_sequence = cost, sequence
+                optimal = True
+            except _BudgetExceeded:
+                pass
+
+        return best_sequence, best_period, optimal, time.perf_counter() - started
+
+    # ------------------------------------------------------------------
+    # Report
+    # ------------------------------------------------------------------
+    def _describe(self, sequence):
+        period = self.period(sequence)
+        parts_per_rack = self.simulator.parts_per_rack()
+        return {
+            'sequence': [self.recipes[i].name for i in sequence],
+            'recipe_ids': [self.recipes[i].id for i in sequence],
+            'period': round(period, 2),
+            'parts_per_hour': round(len(sequence) / period * 3600 * parts_per_rack, 2) if period > 0 else 0,
+        }
+
+    def run(self, time_budget=1.0):
+        if not self.recipes:
+            return {"error": "No active recipes with steps found."}
+
+        sequence, _, optimal, elapsed = self.optimize(time_budget)
+        best = self._describe(sequence)
+        blocked = self._describe(self._blocked_sequence())
+        improvement = (
+            (blocked['period'] - best['period']) / blocked['period'] * 100 if blocked['period'] > 0 else 0
+        )
+        return {
+            **best,
+            'hoist_count': self.hoist_count,
+            # Keyed by id: recipe names are not unique within a project
+            'ratios': dict(zip((r.id for r in self.recipes), self.counts)),
+            'blocked_sequence': blocked,
+            'improvement_pct': round(improvement, 2),
+            'optimal': optimal,
+            'states_evaluated': self.states_evaluated,
+            'elapsed_ms': round(elapsed * 1000, 1),
+        }
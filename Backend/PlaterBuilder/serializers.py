@@ -1,7 +1,12 @@
+from django.conf import settings
+from django.db import models
+from django.urls import reverse
+from django.utils import timezone
 from rest_framework import serializers
+from . import result_codec
 from .models import (Projects, Customers, EquipmentTypeChoices,
-                     ProductionGoal, SimulationParameters, SimulationResult,
-                     Station, Recipe, RecipeStep)
+                     ProductionGoal, ProductionCalendar, SimulationParameters, SimulationResult,
+                     Station, Recipe, RecipeStep, Element, Part_Size, UploadSession, Budget, Quote)
 
 class CustomersSerializer(serializers.ModelSerializer):
     class Meta:
@@ -19,16 +24,31 @@ class ProductionGoalSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ('date_created', 'last_updated')
 
+class ProductionCalendarSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ProductionCalendar
+        fields = '__all__'
+        read_only_fields = ('date_created', 'last_updated')
+
 class SimulationParametersSerializer(serializers.ModelSerializer):
     class Meta:
         model = SimulationParameters
         fields = '__all__'
 
 class SimulationResultSerializer(serializers.ModelSerializer):
+    station_utilization = serializers.SerializerMethodField()
+    recipe_results = serializers.SerializerMethodField()
+
     class Meta:
         model = SimulationResult
         fields = '__all__'
 
+    def get_station_utilization(self, obj):
+        return obj.get_station_utilization()
+
+    def get_recipe_results(self, obj):
+        return obj.get_recipe_results()
+
 
 # --- Station / Recipe serializers ---
 
@@ -37,6 +57,16 @@ class StationSerializer(serializers.ModelSerializer):
         model = Station
         fields = '__all__'
 
+class ElementSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Element
+        fields = '__all__'
+
+class PartSizeSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Part_Size
+        fields = '__all__'
+
 class RecipeStepSerializer(serializers.ModelSerializer):
     station_number = serializers.CharField(source='station.station_number', read_only=True)
     station_process_name = serializers.CharField(source='station.process_name', read_only=True)
@@ -45,17 +75,34 @@ class RecipeStepSerializer(serializers.ModelSerializer):
         model = RecipeStep
         fields = '__all__'
 
+def recipe_step_count(recipe):
+    """
+    Number of steps in the recipe, from a ``step_count`` annotation
+    (see views.recipe_queryset) or prefetched steps when available, so
+    serializing many recipes does not count each one separately.
+    """
+    count = getattr(recipe, 'step_count', None)
+    if count is not None:
+        return count
+    prefetched = getattr(recipe, '_prefetched_objects_cache', {})
+    if 'steps' in prefetched:
+        return len(prefetched['steps'])
+    return recipe.steps.count()
+
 class RecipeSerializer(serializers.ModelSerializer):
     steps = RecipeStepSerializer(many=True, read_only=True)
-    step_count = serializers.IntegerField(source='steps.count', read_only=True)
+    step_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
         fields = '__all__'
         read_only_fields = ('date_created', 'last_updated')
 
+    def get_step_count(self, obj):
+        return recipe_step_count(obj)
+
 class RecipeListSerializer(serializers.ModelSerializer):
-    step_count = serializers.IntegerField(source='steps.count', read_only=True)
+    step_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
@@ -63,4 +110,139 @@ class RecipeListSerializer(serializers.ModelSerializer):
                   'is_active', 'step_count', 'date_created', 'last_updated']
         read_only_fields = ('date_created', 'last_updated')
 
+    def get_step_count(self, obj):
+        return recipe_step_count(obj)
+
+
+# --- Document upload serializers ---
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'project', 'field', 'filename', 'total_size', 'received_bytes',
+                  'status', 'sha256', 'file_path', 'date_created', 'last_updated']
+        read_only_fields = ('id', 'project', 'received_bytes', 'status', 'file_path',
+                            'date_created', 'last_updated')
+
+
+# --- Budget serializers ---
+
+class BudgetSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Budget
+        exclude = ('id',)
+        read_only_fields = ('project', 'tanks_total', 'rectifiers_total', 'hoists_total', 'controls_total',
+                            'date_created', 'last_updated')
+
+class QuoteSerializer(serializers.ModelSerializer):
+    download_url = serializers.SerializerMethodField()
 
+    class Meta:
+        model = Quote
+        fields = ['id', 'project', 'input_hash', 'status', 'size', 'error', 'download_url',
+                  'date_created', 'completed_at']
+        read_only_fields = fields
+
+    def get_download_url(self, obj):
+        if obj.status != 'ready':
+            return None
+        return f"{reverse('quote', args=[obj.project.project_id])}?download={obj.id}"
+
+
+# --- Read-only fast paths ---
+
+def _datetime_field(field):
+    # Resolve the current timezone once per listing instead of once per value
+    return serializers.DateTimeField(
+        default_timezone=timezone.get_current_timezone() if settings.USE_TZ else None)
+
+
+# DRF fields that turn database values into their JSON form; other model
+# fields (numbers, strings, booleans, JSON) are emitted as read
+_REPRESENTATIONS = {
+    models.DateTimeField: _datetime_field,
+    models.DateField: lambda field: serializers.DateField(),
+    models.TimeField: lambda field: serializers.TimeField(),
+    models.DurationField: lambda field: serializers.DurationField(),
+    models.UUIDField: lambda field: serializers.UUIDField(),
+    models.DecimalField: lambda field: serializers.DecimalField(
+        max_digits=field.max_digits, decimal_places=field.decimal_places),
+}
+
+
+class ValuesSerializer:
+    """
+    Read-only serializer for flat models. Produces the same dicts as the
+    matching ModelSerializer with ``fields = '__all__'``, but reads rows
+    with values_list() instead of building model instances and running
+    every field's serializer. Which columns need converting is worked out
+    once, when the serializer is defined.
+
+    ``related`` adds fields read across relations, e.g.
+    ``{'station_number': 'station__station_number'}``, or annotations.
+    ``convert`` maps a field name to a function applied to its non-null
+    values, standing in for a SerializerMethodField.
+    """
+
+    def __init__(self, model, exclude=(), related=None, convert=None):
+        self.names, self.lookups, converted = [], [], []
+        for name, lookup in (related or {}).items():
+            self.names.append(name)
+            self.lookups.append(lookup)
+        for field in model._meta.concrete_fields:
+            if field.name in exclude:
+                continue
+            position = len(self.names) if not field.primary_key else 0
+            self.names.insert(position, field.name)
+            self.lookups.insert(position, field.attname)
+            build = next((build for field_class, build in _REPRESENTATIONS.items()
+                          if isinstance(field, field_class)), None)
+            if build is not None:
+                converted.append((field, build))
+        self.converted = [(self.names.index(field.name), field, build) for field, build in converted]
+        self.functions = [(self.names.index(name), function) for name, function in (convert or {}).items()]
+
+    def data(self, queryset):
+        rows = queryset.values_list(*self.lookups)
+        if not self.converted and not self.functions:
+            return [dict(zip(self.names, row)) for row in rows]
+        converters = [(index, build(field).to_representation) for index, field, build in self.converted]
+        converters += self.functions
+        result = []
+        for row in rows:
+            row = list(row)
+            for index, converter in converters:
+                if row[index] is not None:
+                    row[index] = converter(row[index])
+            result.append(dict(zip(self.names, row)))
+        return result
+
+
+STATION_VALUES = ValuesSerializer(Station)
+RECIPE_STEP_VALUES = ValuesSerializer(RecipeStep, related={
+    'station_number': 'station__station_number',
+    'station_process_name': 'station__process_name',
+})
+# SimulationResultSerializer, breakdowns expanded from their packed form
+SIMULATION_VALUES = ValuesSerializer(SimulationResult, convert={
+    'station_utilization': result_codec.decode_station_utilization,
+    'recipe_results': result_codec.decode_recipe_results,
+})
+# History listings without the packed per-station and per-recipe breakdowns
+SIMULATION_SUMMARY_VALUES = ValuesSerializer(SimulationResult,
+                                             exclude=('station_utilization', 'recipe_results'))
+RECIPE_VALUES = ValuesSerializer(Recipe, related={'step_count': 'step_count'})
+
+
+def recipe_tree(recipes):
+    """
+    What RecipeSerializer gives for the first recipe of ``recipes`` (a
+    queryset annotated as in views.recipe_queryset), read with two
+    values_list() queries; None if there is none.
+    """
+    rows = RECIPE_VALUES.data(recipes[:1])
+    if not rows:
+        return None
+    row = rows[0]
+    steps = RECIPE_STEP_VALUES.data(RecipeStep.objects.filter(recipe_id=row['id']))
+    return {'id': row.pop('id'), 'steps': steps, 'step_count': row.pop('step_count'), **row}
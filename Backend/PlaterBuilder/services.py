@@ -1,8 +1,24 @@
+import math
+
+from django.core.cache import cache
 from django.db import models
+from django.db.models import Avg, Count, Max, Min
+from django.db.models.functions import TruncDay, TruncWeek
 from .models import (Projects, Station, Recipe, RecipeStep,
-                     SimulationParameters, ProductionGoal, SimulationResult)
+                     SimulationParameters, ProductionGoal, SimulationResult, Budget)
 from django.utils import timezone
 from datetime import datetime
+from . import result_codec
+from .budget import refresh_stations
+from .coalesce import bump_line_version
+from .production_calendar import get_calendar_capacity
+from .rack_packing import capped_parts_per_rack, part_spacing, recipe_rack_capacity
+from .travel import get_travel_matrix
+
+SHARED_RESOURCE_LABELS = {
+    'load_unload': 'load/unload station',
+    'transfer_shuttle': 'transfer shuttle',
+}
 
 
 class ProductionSimulator:
@@ -45,9 +61,24 @@ class ProductionSimulator:
         # Load active recipes with prefetched steps
         self.recipes = list(
             Recipe.objects.filter(project=self.project, is_active=True)
+            .select_related('part_size')
             .prefetch_related('steps__station')
         )
 
+        # Physical parts-per-rack limit of each recipe's part in its tanks
+        spacing = part_spacing(self.params)
+        self.rack_capacities = {}
+        for recipe in self.recipes:
+            capacity = recipe_rack_capacity(recipe, spacing)
+            if capacity is not None:
+                self.rack_capacities[recipe.id] = capacity
+
+        # Hoist move times between every pair of stations
+        self.travel = get_travel_matrix(self.project, self.stations, self.params)
+
+        # Productive hours per shift / day / week / month / year
+        self.calendar = get_calendar_capacity(self.project, self.params)
+
         # Get production goal
         self.goal, _ = ProductionGoal.objects.get_or_create(
             project=self.project,
@@ -64,9 +95,18 @@ class ProductionSimulator:
     # ------------------------------------------------------------------
     # Per-recipe cycle time
     # ------------------------------------------------------------------
+    def _recipe_transfer_time(self, recipe):
+        """Sum of hoist moves between consecutive steps of a recipe."""
+        # Prefetched steps are already in step_order (RecipeStep.Meta.ordering)
+        steps = recipe.steps.all()
+        return sum(
+            self.travel.move_time(prev.station_id, step.station_id)
+            for prev, step in zip(steps, steps[1:])
+        )
+
     def _calculate_recipe_cycle_time(self, recipe):
         """Calculate cycle time for a single recipe's steps."""
-        steps = list(recipe.steps.all().order_by('step_order'))
+        steps = recipe.steps.all()
         if not steps:
             return 0
 
@@ -75,14 +115,13 @@ class ProductionSimulator:
         # Load time
         total_time += self.params.part_load_time or 60
 
-        for i, step in enumerate(steps):
+        for step in steps:
             process_time = step.dwell_time or step.min_dwell_time or 0
             total_time += process_time
             total_time += step.drip_time or 0
 
-            # Transfer time between steps (not after last)
-            if i < len(steps) - 1:
-                total_time += self.params.transfer_time or 10
+        # Transfer time between steps (not after last)
+        total_time += self._recipe_transfer_time(recipe)
 
         # Unload time
         total_time += self.params.part_unload_time or 60
@@ -98,6 +137,8 @@ class ProductionSimulator:
         A super-cycle = sum of all production_ratios flight-bars.
         Station occupied = sum of (dwell_time + drip_time) * recipe.production_ratio
         for each recipe that visits it.
+        Duplicate tanks share that load, so 'tank_time' (occupied time per
+        tank) is what limits the line.
         """
         utilization = {}  # station_id -> occupied seconds
 
@@ -106,6 +147,7 @@ class ProductionSimulator:
                 'station_id': station.id,
                 'station_number': station.station_number,
                 'process_name': station.process_name,
+                'parallel_tanks': max(1, station.parallel_tanks or 1),
                 'occupied_time': 0,
             }
 
@@ -116,8 +158,106 @@ class ProductionSimulator:
                     drip = step.drip_time or 0
                     utilization[step.station_id]['occupied_time'] += (dwell + drip) * recipe.production_ratio
 
+        for info in utilization.values():
+            info['tank_time'] = info['occupied_time'] / info['parallel_tanks']
+
         return utilization
 
+    def _suggest_parallel_tanks(self, station_util, target_cycle_time):
+        """
+        Tanks each station needs so its per-tank time fits within
+        ``target_cycle_time``, evaluated for every station in one pass.
+        Only stations that need more tanks than they have are returned.
+        """
+        if target_cycle_time <= 0:
+            return []
+        suggestions = [
+            {
+                'station_id': info['station_id'],
+                'station_number': info['station_number'],
+                'process_name': info['process_name'],
+                'parallel_tanks': info['parallel_tanks'],
+                'required_tanks': math.ceil(round(info['occupied_time'] / target_cycle_time, 6)),
+            }
+            for info in station_util.values()
+        ]
+        suggestions = [s for s in suggestions if s['required_tanks'] > s['parallel_tanks']]
+        for s in suggestions:
+            s['additional_tanks'] = s['required_tanks'] - s['parallel_tanks']
+        suggestions.sort(key=lambda s: s['additional_tanks'], reverse=True)
+        return suggestions
+
+    # ------------------------------------------------------------------
+    # Parallel lines sharing load/unload and the transfer shuttle
+    # ------------------------------------------------------------------
+    def _shared_resources(self):
+        """
+        Per-flight-bar service time of each resource shared between lines.
+        Load/unload is only shared once there is more than one line; the
+        shuttle carries every bar onto its line and back off again.
+        """
+        resources = {}
+        if (self.params.process_lines or 1) > 1:
+            resources['load_unload'] = (self.params.part_load_time or 60) + (self.params.part_unload_time or 60)
+        if self.params.has_transfer_shuttle:
+            resources['transfer_shuttle'] = 2 * self.travel.fixed_time
+        return resources
+
+    def _calculate_line_capacity(self, bar_interval, parts_per_rack):
+        """
+        Throughput of ``process_lines`` identical lines competing for the
+        shared resources, by exact Mean Value Analysis of a closed network:
+        each line is a delay station releasing one flight bar every
+        ``bar_interval`` seconds when never blocked, and each shared resource
+        is a single-server queue.
+
+        Returns None for a single line without a shuttle (nothing is shared).
+        """
+        process_lines = max(1, self.params.process_lines or 1)
+        resources = self._shared_resources()
+        if not resources:
+            return None
+
+        # Time a line spends away from the shared resources per bar, chosen
+        # so one uncontended line reproduces its stand-alone bar interval
+        think_time = max(bar_interval - sum(resources.values()), 0)
+
+        queue = {name: 0.0 for name in resources}
+        scaling = []
+        throughput = 0.0
+        for lines in range(1, process_lines + 3):
+            residence = {name: service * (1 + queue[name]) for name, service in resources.items()}
+            throughput = lines / (think_time + sum(residence.values()))
+            queue = {name: throughput * residence[name] for name in resources}
+            scaling.append({
+                'lines': lines,
+                'parts_per_hour': round(throughput * 3600 * parts_per_rack, 2),
+                'efficiency_pct': round(throughput * bar_interval / lines * 100, 2),
+            })
+            if lines == process_lines:
+                current_throughput = throughput
+                shared = [
+                    {
+                        'name': name,
+                        'service_time': round(service, 2),
+                        'utilization_pct': round(min(throughput * service, 1) * 100, 2),
+                    }
+                    for name, service in resources.items()
+                ]
+
+        busiest = max(shared, key=lambda r: r['utilization_pct'])
+        bottleneck = busiest['name'] if busiest['utilization_pct'] >= 85 else 'process_lines'
+
+        return {
+            'process_lines': process_lines,
+            'has_transfer_shuttle': self.params.has_transfer_shuttle,
+            'line_parts_per_hour': round(3600 / bar_interval * parts_per_rack, 2),
+            'bars_per_hour': current_throughput * 3600,
+            'shared_resources': shared,
+            'bottleneck_resource': bottleneck,
+            'scaling': scaling,
+        }
+
     # ------------------------------------------------------------------
     # Optimal hoist calculation
     # ------------------------------------------------------------------
@@ -125,7 +265,7 @@ class ProductionSimulator:
         if not self.stations or not self.recipes:
             return 0
 
-        target_pph = self.goal.target_parts_per_hour or 0
+        target_pph = self.goal_parts_per_hour()
         if target_pph <= 0:
             return 1
 
@@ -139,7 +279,9 @@ class ProductionSimulator:
         if weighted_cycle <= 0:
             return 1
 
-        cycles_per_hour_needed = target_pph / (self.params.parts_per_rack or 1)
+        # Hoists are per line; parallel lines split the target between them
+        process_lines = max(1, self.params.process_lines or 1)
+        cycles_per_hour_needed = target_pph / self.parts_per_rack() / process_lines
         cycles_per_hoist_per_hour = 3600 / weighted_cycle if weighted_cycle > 0 else 0
         if cycles_per_hoist_per_hour <= 0:
             return 1
@@ -147,6 +289,36 @@ class ProductionSimulator:
         hoists_needed = int(cycles_per_hour_needed / cycles_per_hoist_per_hour) + 1
         return max(1, hoists_needed)
 
+    def goal_parts_per_hour(self):
+        """The production goal's primary target expressed in parts per hour."""
+        primary = self.goal.primary_target
+        target = getattr(self.goal, f'target_parts_per_{primary}', None)
+        if target and primary in self.calendar.hours:
+            return self.calendar.to_parts_per_hour(primary, target)
+        return self.goal.target_parts_per_hour or 0
+
+    def recipe_parts_per_rack(self, recipe, parts_per_rack=None):
+        """Requested parts per rack, capped by what physically fits for the recipe."""
+        return capped_parts_per_rack(parts_per_rack or self.params.parts_per_rack, self.rack_capacities.get(recipe.id))
+
+    def parts_per_rack(self, parts_per_rack=None):
+        """Average parts per flight bar across the recipe mix, after rack limits."""
+        requested = parts_per_rack or self.params.parts_per_rack or 1
+        total_ratio = sum(r.production_ratio for r in self.recipes)
+        if not self.rack_capacities or total_ratio <= 0:
+            return requested
+        return sum(
+            self.recipe_parts_per_rack(r, requested) * r.production_ratio for r in self.recipes
+        ) / total_ratio
+
+    def resolve_hoist_count(self, hoist_count=None):
+        """Explicit count if given, else manual, else calculated, else optimal."""
+        if hoist_count is None:
+            hoist_count = self.params.manual_hoist_count or self.params.calculated_hoist_count
+            if hoist_count is None or hoist_count <= 0:
+                hoist_count = self.calculate_optimal_hoists()
+        return hoist_count
+
     # ------------------------------------------------------------------
     # Main throughput calculation
     # ------------------------------------------------------------------
@@ -156,15 +328,12 @@ class ProductionSimulator:
         if not self.recipes:
             return {"error": "No active recipes found. Please add at least one recipe with steps."}
 
-        has_steps = any(r.steps.exists() for r in self.recipes)
+        has_steps = any(r.steps.all() for r in self.recipes)
         if not has_steps:
             return {"error": "No recipe steps found. Please add steps to at least one recipe."}
 
         # Determine hoist count
-        if hoist_count is None:
-            hoist_count = self.params.manual_hoist_count or self.params.calculated_hoist_count
-            if hoist_count is None or hoist_count <= 0:
-                hoist_count = self.calculate_optimal_hoists()
+        hoist_count = self.resolve_hoist_count(hoist_count)
 
         total_ratio = sum(r.production_ratio for r in self.recipes) or 1
 
@@ -176,12 +345,12 @@ class ProductionSimulator:
         # Station utilization
         station_util = self._calculate_station_utilization()
 
-        # Bottleneck = station with highest occupied time per super-cycle
+        # Bottleneck = station with highest occupied time per tank per super-cycle
         bottleneck_station = None
         max_occupied = 0
         for sid, info in station_util.items():
-            if info['occupied_time'] > max_occupied:
-                max_occupied = info['occupied_time']
+            if info['tank_time'] > max_occupied:
+                max_occupied = info['tank_time']
                 bottleneck_station = info
 
         # Weighted cycle sum
@@ -197,21 +366,26 @@ class ProductionSimulator:
             return {"error": "Invalid cycle time calculated. Please check recipe steps."}
 
         # Aggregate throughput
-        parts_per_rack = self.params.parts_per_rack or 1
+        parts_per_rack = self.parts_per_rack()
         parts_per_hour = (total_ratio / effective_super_cycle_time) * 3600 * parts_per_rack
 
-        hours_per_day = self.params.working_hours_per_day or 8
-        days_per_week = self.params.working_days_per_week or 5
+        # Parallel lines / shuttle contention
+        line_results = self._calculate_line_capacity(effective_super_cycle_time / total_ratio, parts_per_rack)
+        if line_results:
+            parts_per_hour = line_results.pop('bars_per_hour') * parts_per_rack
 
-        parts_per_day = parts_per_hour * hours_per_day
-        parts_per_week = parts_per_day * days_per_week
-        parts_per_month = parts_per_week * 4
-        parts_per_year = parts_per_month * 12
+        projected = self.calendar.project(parts_per_hour)
+        parts_per_shift = projected['parts_per_shift']
+        parts_per_day = projected['parts_per_day']
+        parts_per_week = projected['parts_per_week']
+        parts_per_month = projected['parts_per_month']
+        parts_per_year = projected['parts_per_year']
 
         # Per-recipe breakdown
         recipe_results = []
         for recipe in self.recipes:
-            ratio_fraction = recipe.production_ratio / total_ratio
+            # Share of parts, not bars: rack limits can load recipes differently
+            ratio_fraction = recipe.production_ratio * self.recipe_parts_per_rack(recipe) / (total_ratio * parts_per_rack)
             recipe_results.append({
                 'recipe_id': recipe.id,
                 'recipe_name': recipe.name,
@@ -224,7 +398,7 @@ class ProductionSimulator:
         # Station utilization percentages
         station_utilization_list = []
         for sid, info in station_util.items():
-            util_pct = (info['occupied_time'] / effective_super_cycle_time * 100) if effective_super_cycle_time > 0 else 0
+            util_pct = (info['tank_time'] / effective_super_cycle_time * 100) if effective_super_cycle_time > 0 else 0
             station_utilization_list.append({
                 'station_id': info['station_id'],
                 'station_number': info['station_number'],
@@ -241,14 +415,13 @@ class ProductionSimulator:
                 total_process_time += (step.dwell_time or step.min_dwell_time or 0) * recipe.production_ratio
                 total_drip_time += (step.drip_time or 0) * recipe.production_ratio
 
-        total_transfer_time = 0
-        for recipe in self.recipes:
-            step_count = recipe.steps.count()
-            if step_count > 1:
-                total_transfer_time += (self.params.transfer_time or 10) * (step_count - 1) * recipe.production_ratio
+        total_transfer_time = sum(
+            self._recipe_transfer_time(recipe) * recipe.production_ratio for recipe in self.recipes
+        )
 
         # Hoist utilization
-        hoist_utilization = min(100, (parts_per_hour / (self.goal.target_parts_per_hour or 1)) * 100) if self.goal.target_parts_per_hour else 50
+        goal_pph = self.goal_parts_per_hour()
+        hoist_utilization = min(100, (parts_per_hour / goal_pph) * 100) if goal_pph else 50
 
         # Bottleneck description
         bottleneck_description = None
@@ -259,19 +432,25 @@ class ProductionSimulator:
                 f"Station {bottleneck_station['station_number']} ({bottleneck_station['process_name']}) "
                 f"has the highest occupied time ({bottleneck_station['occupied_time']}s per super-cycle)"
             )
+            if bottleneck_station['parallel_tanks'] > 1:
+                bottleneck_description += (
+                    f", {round(bottleneck_station['tank_time'], 2)}s per tank across "
+                    f"{bottleneck_station['parallel_tanks']} parallel tanks"
+                )
+
+        # Tanks needed for no station to hold the line below the hoist limit,
+        # or below the goal if that is the looser requirement
+        target_cycle_time = hoist_effective_time
+        if goal_pph:
+            goal_cycle_time = total_ratio * 3600 * parts_per_rack / (
+                goal_pph / max(1, self.params.process_lines or 1))
+            target_cycle_time = max(target_cycle_time, goal_cycle_time)
+        parallel_tank_suggestions = self._suggest_parallel_tanks(station_util, target_cycle_time)
 
         # Check if meets production goal
-        meets_goal = False
-        if self.goal.primary_target == 'hour' and self.goal.target_parts_per_hour:
-            meets_goal = parts_per_hour >= self.goal.target_parts_per_hour
-        elif self.goal.primary_target == 'day' and self.goal.target_parts_per_day:
-            meets_goal = parts_per_day >= self.goal.target_parts_per_day
-        elif self.goal.primary_target == 'week' and self.goal.target_parts_per_week:
-            meets_goal = parts_per_week >= self.goal.target_parts_per_week
-        elif self.goal.primary_target == 'month' and self.goal.target_parts_per_month:
-            meets_goal = parts_per_month >= self.goal.target_parts_per_month
-        elif self.goal.primary_target == 'year' and self.goal.target_parts_per_year:
-            meets_goal = parts_per_year >= self.goal.target_parts_per_year
+        primary = self.goal.primary_target
+        target = getattr(self.goal, f'target_parts_per_{primary}', None)
+        meets_goal = bool(target) and projected.get(f'parts_per_{primary}', 0) >= target
 
         # Recommendations
         recommendations = []
@@ -279,16 +458,36 @@ class ProductionSimulator:
             recommendations.append("Consider increasing the number of hoists to improve throughput.")
             if bottleneck_station:
                 recommendations.append(f"Optimize process time at {bottleneck_station['station_number']} to reduce bottleneck.")
+        for suggestion in parallel_tank_suggestions[:3]:
+            recommendations.append(
+                f"Add {suggestion['additional_tanks']} parallel tank(s) at station {suggestion['station_number']} "
+                f"({suggestion['required_tanks']} total) to remove it as a bottleneck."
+            )
         if hoist_utilization > 90:
             recommendations.append("Hoist utilization is very high. Consider adding more hoists for reliability.")
         if hoist_utilization < 30:
             recommendations.append("Hoist utilization is low. Consider reducing the number of hoists to optimize costs.")
+        if line_results and line_results['bottleneck_resource'] != 'process_lines':
+            busiest = max(line_results['shared_resources'], key=lambda r: r['utilization_pct'])
+            recommendations.append(
+                f"The shared {SHARED_RESOURCE_LABELS[busiest['name']]} is {busiest['utilization_pct']}% utilized "
+                f"and limits throughput; adding lines will not help until it is relieved."
+            )
+
+        requested_parts_per_rack = self.params.parts_per_rack or 1
+        for capacity in self.rack_capacities.values():
+            if capacity['max_parts_per_rack'] < requested_parts_per_rack:
+                recommendations.append(
+                    f"Only {capacity['max_parts_per_rack']} x {capacity['part_name']} fit on a rack for recipe "
+                    f"{capacity['recipe_name']} (not {requested_parts_per_rack}); throughput uses the physical limit."
+                )
 
         # Weighted average cycle time for top-level cycle_time field
         avg_cycle_time = weighted_cycle_sum / total_ratio if total_ratio > 0 else 0
 
         return {
             "parts_per_hour": round(parts_per_hour, 2),
+            "parts_per_shift": round(parts_per_shift, 2),
             "parts_per_day": round(parts_per_day, 2),
             "parts_per_week": round(parts_per_week, 2),
             "parts_per_month": round(parts_per_month, 2),
@@ -308,6 +507,10 @@ class ProductionSimulator:
             "station_utilization": station_utilization_list,
             "total_ratio": total_ratio,
             "recipe_count": len(self.recipes),
+            "line_results": line_results,
+            "parallel_tank_suggestions": parallel_tank_suggestions,
+            "parts_per_rack": round(parts_per_rack, 2),
+            "rack_capacity": list(self.rack_capacities.values()),
         }
 
     # ------------------------------------------------------------------
@@ -319,10 +522,6 @@ class ProductionSimulator:
         if "error" in results:
             return results
 
-        hoist_count = self.params.manual_hoist_count or self.params.calculated_hoist_count
-        if hoist_count is None or hoist_count <= 0:
-            hoist_count = self.calculate_optimal_hoists()
-
         simulation_result = SimulationResult.objects.create(
             project=self.project,
             name=name,
@@ -341,8 +540,8 @@ class ProductionSimulator:
             bottleneck_description=results.get("bottleneck_description"),
             meets_production_goal=results["meets_production_goal"],
             recommendations=results.get("recommendations"),
-            recipe_results=results.get("recipe_results"),
-            station_utilization=results.get("station_utilization"),
+            recipe_results=result_codec.encode_recipe_results(results.get("recipe_results")),
+            station_utilization=result_codec.encode_station_utilization(results.get("station_utilization")),
         )
 
         return {
@@ -350,6 +549,7 @@ class ProductionSimulator:
             "name": simulation_result.name,
             "simulation_date": simulation_result.simulation_date.isoformat(),
             "parts_per_hour": simulation_result.parts_per_hour,
+            "parts_per_shift": results["parts_per_shift"],
             "parts_per_day": simulation_result.parts_per_day,
             "parts_per_week": simulation_result.parts_per_week,
             "parts_per_month": simulation_result.parts_per_month,
@@ -364,8 +564,341 @@ class ProductionSimulator:
             "bottleneck_description": simulation_result.bottleneck_description,
             "meets_production_goal": simulation_result.meets_production_goal,
             "recommendations": simulation_result.recommendations,
-            "recipe_results": simulation_result.recipe_results,
-            "station_utilization": simulation_result.station_utilization,
+            "recipe_results": results.get("recipe_results"),
+            "station_utilization": results.get("station_utilization"),
             "total_ratio": results.get("total_ratio"),
             "recipe_count": results.get("recipe_count"),
+            "line_results": results.get("line_results"),
+            "parallel_tank_suggestions": results.get("parallel_tank_suggestions"),
+            "parts_per_rack": results.get("parts_per_rack"),
+            "rack_capacity": results.get("rack_capacity"),
         }
+
+
+# ----------------------------------------------------------------------
+# Run comparison
+# ----------------------------------------------------------------------
+COMPARISON_METRICS = [
+    'parts_per_hour', 'parts_per_day', 'parts_per_week', 'parts_per_month', 'parts_per_year',
+    'cycle_time', 'total_process_time', 'total_transfer_time', 'total_drip_time',
+    'hoist_count', 'hoist_utilization',
+]
+
+
+def _aligned_deltas(values, baseline):
+    return [None if v is None or baseline is None else round(v - baseline, 2) for v in values]
+
+
+def _align_columns(unpacked_runs, column):
+    """
+    Scatter one column from each run's unpacked breakdown onto a shared id axis.
+    Returns (ids, matrix) where matrix[i][r] is the value for ids[i] in run r.
+    """
+    index = {}
+    ids = []
+    for run_ids, _ in unpacked_runs:
+        for item_id in run_ids:
+            if item_id not in index:
+                index[item_id] = len(ids)
+                ids.append(item_id)
+
+    matrix = [[None] * len(unpacked_runs) for _ in ids]
+    for run, (run_ids, columns) in enumerate(unpacked_runs):
+        for item_id, value in zip(run_ids, columns.get(column, [])):
+            matrix[index[item_id]][run] = value
+    return ids, matrix
+
+
+def _recorded_names(unpacked_runs, names):
+    """id -> name values as recorded by the first run that has the id."""
+    recorded = {}
+    for run_ids, columns in unpacked_runs:
+        values = [columns.get(name, []) for name in names]
+        for i, item_id in enumerate(run_ids):
+            if item_id not in recorded:
+                recorded[item_id] = [column[i] if i < len(column) else None for column in values]
+    return recorded
+
+
+def compare_simulation_results(project, run_ids):
+    """
+    Align N simulation runs of one project for side-by-side comparison.
+
+    The first id in ``run_ids`` is the baseline; every delta is relative to it.
+    Only the metric columns and the packed breakdowns are read.
+    Raises SimulationResult.DoesNotExist naming any ids not found.
+    """
+    rows = {
+        row['id']: row for row in SimulationResult.objects.filter(project=project, id__in=run_ids)
+        .values('id', 'name', 'simulation_date', 'station_utilization', 'recipe_results', *COMPARISON_METRICS)
+    }
+    missing = [run_id for run_id in run_ids if run_id not in rows]
+    if missing:
+        raise SimulationResult.DoesNotExist(f"Simulation results not found: {missing}")
+    runs = [rows[run_id] for run_id in run_ids]
+
+    metrics = {}
+    for metric in COMPARISON_METRICS:
+        values = [run[metric] for run in runs]
+        metrics[metric] = {'values': values, 'deltas': _aligned_deltas(values, values[0])}
+
+    # Each payload is inflated once and every column read from that copy
+    breakdowns = [result_codec.unpack(run['station_utilization'], 'station_id') for run in runs]
+    station_ids, utilization = _align_columns(breakdowns, 'utilization_pct')
+    station_names = _recorded_names(breakdowns, result_codec.STATION_NAMES)
+    positions = dict(Station.objects.filter(id__in=station_ids).values_list('id', 'position_index'))
+    station_rows = []
+    for station_id, values in zip(station_ids, utilization):
+        station_number, process_name = station_names[station_id]
+        station_rows.append({
+            'station_id': station_id,
+            'station_number': station_number,
+            'process_name': process_name,
+            'utilization_pct': values,
+            'deltas': _aligned_deltas(values, values[0]),
+        })
+    # Stations since removed from the line go last
+    station_rows.sort(key=lambda row: positions.get(row['station_id'], float('inf')))
+
+    breakdowns = [result_codec.unpack(run['recipe_results'], 'recipe_id') for run in runs]
+    recipe_ids, recipe_pph = _align_columns(breakdowns, 'parts_per_hour')
+    recipe_names = _recorded_names(breakdowns, result_codec.RECIPE_NAMES)
+    recipe_rows = []
+    for recipe_id, values in zip(recipe_ids, recipe_pph):
+        recipe_name, = recipe_names[recipe_id]
+        recipe_rows.append({
+            'recipe_id': recipe_id,
+            'recipe_name': recipe_name,
+            'parts_per_hour': values,
+            'deltas': _aligned_deltas(values, values[0]),
+        })
+
+    return {
+        'baseline_id': run_ids[0],
+        'runs': [
+            {'id': run['id'], 'name': run['name'], 'simulation_date': run['simulation_date'].isoformat()}
+            for run in runs
+        ],
+        'metrics': metrics,
+        'stations': station_rows,
+        'recipes': recipe_rows,
+    }
+
+
+# ----------------------------------------------------------------------
+# History trends
+# ----------------------------------------------------------------------
+TREND_METRICS = ['parts_per_hour', 'hoist_utilization']
+TREND_BUCKETS = {'day': TruncDay, 'week': TruncWeek}
+TREND_CACHE_TIMEOUT = 60 * 60
+
+
+def simulation_trends(project, bucket='day'):
+    """
+    Min / max / mean of the trend metrics per day or week of a project's
+    simulation history, aggregated in the database.
+
+    Results are cached under a key that includes the latest run id and run
+    count, so a new or deleted run produces a fresh key instead of serving
+    stale buckets.
+    """
+    if bucket not in TREND_BUCKETS:
+        raise ValueError(f"bucket must be one of: {', '.join(TREND_BUCKETS)}")
+
+    history = SimulationResult.objects.filter(project=project)
+    version = history.aggregate(latest=Max('id'), runs=Count('id'))
+    cache_key = f"simulation_trends:{project.pk}:{bucket}:{version['latest']}:{version['runs']}"
+    trends = cache.get(cache_key)
+    if trends is not None:
+        return trends
+
+    aggregates = {'runs': Count('id')}
+    for metric in TREND_METRICS:
+        aggregates[f'{metric}__min'] = Min(metric)
+        aggregates[f'{metric}__max'] = Max(metric)
+        aggregates[f'{metric}__mean'] = Avg(metric)
+
+    rows = (
+        history.annotate(period=TREND_BUCKETS[bucket]('simulation_date'))
+        .values('period')
+        .annotate(**aggregates)
+        .order_by('period')
+    )
+
+    buckets = []
+    for row in rows:
+        entry = {'period': row['period'].isoformat(), 'runs': row['runs']}
+        for metric in TREND_METRICS:
+            entry[metric] = {
+                stat: round(row[f'{metric}__{stat}'], 2) for stat in ('min', 'max', 'mean')
+            }
+        buckets.append(entry)
+
+    trends = {'bucket': bucket, 'metrics': TREND_METRICS, 'buckets': buckets}
+    cache.set(cache_key, trends, TREND_CACHE_TIMEOUT)
+    return trends
+
+
+# ----------------------------------------------------------------------
+# Capacity snapshot and goal seeking
+# ----------------------------------------------------------------------
+class CapacitySnapshot:
+    """
+    The throughput inputs of a line frozen once: station occupancy, hoist
+    work per super-cycle and the recipe mix. What-if evaluations of hoist
+    count, tank counts and rack loading then cost a handful of arithmetic
+    operations instead of a full ProductionSimulator rerun.
+    """
+
+    def __init__(self, simulator):
+        self.simulator = simulator
+        self.total_ratio = sum(r.production_ratio for r in simulator.recipes) or 1
+        self.stations = list(simulator._calculate_station_utilization().values())
+        self.occupied = [info['occupied_time'] for info in self.stations]
+        self.tanks = [info['parallel_tanks'] for info in self.stations]
+        self.weighted_cycle_sum = sum(
+            simulator._calculate_recipe_cycle_time(r) * r.production_ratio for r in simulator.recipes
+        )
+
+    def super_cycle_time(self, hoists, tanks=None):
+        tanks = tanks or self.tanks
+        station_time = max((occ / k for occ, k in zip(self.occupied, tanks)), default=0)
+        hoist_time = self.weighted_cycle_sum / (hoists * 0.8) if hoists > 0 else self.weighted_cycle_sum
+        return max(station_time, hoist_time)
+
+    def parts_per_hour_at(self, super_cycle_time, parts_per_rack):
+        """Total parts per hour when each line runs at ``super_cycle_time``."""
+        if super_cycle_time <= 0:
+            return 0
+        line_results = self.simulator._calculate_line_capacity(super_cycle_time / self.total_ratio, parts_per_rack)
+        if line_results:
+            return line_results['bars_per_hour'] * parts_per_rack
+        return self.total_ratio / super_cycle_time * 3600 * parts_per_rack
+
+    def parts_per_hour(self, hoists, tanks=None, parts_per_rack=None):
+        parts_per_rack = self.simulator.parts_per_rack(parts_per_rack)
+        return self.parts_per_hour_at(self.super_cycle_time(hoists, tanks), parts_per_rack)
+
+    def longest_cycle_for(self, target_parts_per_hour, parts_per_rack, iterations=60):
+        """
+        Longest per-line super-cycle that still meets the target, by
+        bisection (throughput falls monotonically as the cycle grows).
+        None if even an arbitrarily fast line cannot reach the target.
+        """
+        process_lines = max(1, self.simulator.params.process_lines or 1)
+        high = process_lines * self.total_ratio * 3600 * parts_per_rack / target_parts_per_hour
+        low = high * 1e-9
+        if self.parts_per_hour_at(low, parts_per_rack) < target_parts_per_hour:
+            return None
+        for _ in range(iterations):
+            mid = (low + high) / 2
+            if self.parts_per_hour_at(mid, parts_per_rack) >= target_parts_per_hour:
+                low = mid
+            else:
+                high = mid
+        return low
+
+    def hoists_for_cycle(self, super_cycle_time):
+        return max(1, math.ceil(round(self.weighted_cycle_sum / (0.8 * super_cycle_time), 9)))
+
+    def tanks_for_cycle(self, super_cycle_time):
+        """Tank counts so no station exceeds the cycle; existing tanks are kept."""
+        return [
+            max(k, math.ceil(round(occ / super_cycle_time, 9)))
+            for occ, k in zip(self.occupied, self.tanks)
+        ]
+
+
+# Relative cost of adding one hoist vs one parallel tank
+GOAL_SEEK_COSTS = {'hoist': 4.0, 'tank': 1.0}
+GOAL_SEEK_MAX_HOISTS = 50
+
+
+def goal_seek(simulator, max_parts_per_rack=None, costs=None):
+    """
+    Cheapest combination of hoist count, parallel tanks and parts per rack
+    that meets the project's production goal.
+
+    For each parts-per-rack option, the longest super-cycle that meets the
+    goal is found by bisection over a CapacitySnapshot. The minimum hoists
+    and tanks for that cycle follow directly, because both bounds are
+    monotone. Options are ranked by cost.
+    """
+    target = simulator.goal_parts_per_hour()
+    if target <= 0:
+        return {"error": "Set a production goal before running goal seek."}
+    check = simulator.calculate_throughput()
+    if "error" in check:
+        return check
+
+    costs = {**GOAL_SEEK_COSTS, **(costs or {})}
+    snapshot = CapacitySnapshot(simulator)
+    current_ppr = simulator.params.parts_per_rack or 1
+    max_ppr = max(current_ppr, max_parts_per_rack or current_ppr)
+    # Loading past the physical rack limit of every recipe gains nothing
+    limits = [simulator.rack_capacities.get(r.id) for r in simulator.recipes]
+    if limits and all(limits):
+        max_ppr = max(current_ppr, min(max_ppr, max(c['max_parts_per_rack'] for c in limits)))
+
+    candidates = []
+    for parts_per_rack in range(current_ppr, max_ppr + 1):
+        cycle = snapshot.longest_cycle_for(target, simulator.parts_per_rack(parts_per_rack))
+        if cycle is None:
+            candidates.append({'parts_per_rack': parts_per_rack, 'feasible': False,
+                               'reason': 'Shared load/unload or shuttle capacity cannot reach the goal'})
+            continue
+        hoists = snapshot.hoists_for_cycle(cycle)
+        if hoists > GOAL_SEEK_MAX_HOISTS:
+            candidates.append({'parts_per_rack': parts_per_rack, 'feasible': False,
+                               'reason': f'Needs more than {GOAL_SEEK_MAX_HOISTS} hoists'})
+            continue
+        tanks = snapshot.tanks_for_cycle(cycle)
+        tank_changes = [
+            {'station_id': info['station_id'], 'station_number': info['station_number'],
+             'parallel_tanks': current, 'required_tanks': required}
+            for info, current, required in zip(snapshot.stations, snapshot.tanks, tanks)
+            if required > current
+        ]
+        added_tanks = sum(t['required_tanks'] - t['parallel_tanks'] for t in tank_changes)
+        candidates.append({
+            'parts_per_rack': parts_per_rack,
+            'effective_parts_per_rack': round(simulator.parts_per_rack(parts_per_rack), 2),
+            'feasible': True,
+            'hoist_count': hoists,
+            'tank_changes': tank_changes,
+            'added_tanks': added_tanks,
+            'cost': round(hoists * costs['hoist'] + added_tanks * costs['tank'], 2),
+            'parts_per_hour': round(snapshot.parts_per_hour(hoists, tanks, parts_per_rack), 2),
+        })
+
+    feasible = [c for c in candidates if c['feasible']]
+    best = min(feasible, key=lambda c: (c['cost'], c['parts_per_rack'])) if feasible else None
+    return {
+        'target_parts_per_hour': round(target, 2),
+        'current': {
+            'hoist_count': simulator.resolve_hoist_count(),
+            'parts_per_rack': current_ppr,
+            'parts_per_hour': check['parts_per_hour'],
+        },
+        'costs': costs,
+        'feasible': best is not None,
+        'best': best,
+        'candidates': candidates,
+    }
+
+
+def apply_goal_seek(simulator, best):
+    """Write a goal-seek configuration back to the project."""
+    simulator.params.manual_hoist_count = best['hoist_count']
+    simulator.params.parts_per_rack = best['parts_per_rack']
+    simulator.params.save(update_fields=['manual_hoist_count', 'parts_per_rack', 'last_updated'])
+    required = {t['station_id']: t['required_tanks'] for t in best['tank_changes']}
+    stations = [s for s in simulator.stations if s.id in required]
+    for station in stations:
+        station.parallel_tanks = required[station.id]
+    Station.objects.bulk_update(stations, ['parallel_tanks'])
+    # bulk_update sends no signals
+    bump_line_version(simulator.project.pk)
+    budget = Budget.objects.filter(project=simulator.project).first()
+    if budget is not None and stations:
+        refresh_stations(budget, stations)
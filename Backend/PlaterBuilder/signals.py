@@ -0,0 +1,124 @@
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import budget as budget_rollup
+from .coalesce import bump_line_version
+from .document_store import unlink_documents
+from .models import (Budget, Part_Size, ProcessParameter, ProductionCalendar, ProductionGoal, Projects, Quote,
+                     Recipe, RecipeStep, SimulationParameters, Station)
+from .plating import apply_plating_dwell_times
+from .production_calendar import invalidate_calendar_capacity
+from .travel import invalidate_travel_matrix
+
+
+def _budget(project_id):
+    """The project's budget if one has been started; projects without one skip the roll-up."""
+    return Budget.objects.filter(project_id=project_id).first()
+
+
+@receiver(pre_save, sender=Station)
+def station_saving(sender, instance, **kwargs):
+    """Remember the tank size, which limits how many parts fit on a rack."""
+    instance._previous_tank = (Station.objects.filter(pk=instance.pk).values_list('tank_length', 'tank_width')
+                               .first() if instance.pk else None)
+
+
+@receiver([post_save, post_delete], sender=Station)
+def station_changed(sender, instance, **kwargs):
+    """Line geometry changed: drop derived per-project caches."""
+    invalidate_travel_matrix(instance.project_id)
+    budget = _budget(instance.project_id)
+    if budget is not None:
+        deleted = kwargs['signal'] is post_delete
+        budget_rollup.refresh_station(budget, instance, deleted=deleted)
+        if deleted or getattr(instance, '_previous_tank', None) != (instance.tank_length, instance.tank_width):
+            # Rack loads, and so rack currents, of every recipe through this tank may change
+            budget_rollup.refresh_rectifiers(budget)
+
+
+@receiver(pre_save, sender=RecipeStep)
+def recipe_step_saving(sender, instance, **kwargs):
+    """Remember the station a step is moving away from, to recost it too."""
+    instance._previous_station_id = (RecipeStep.objects.filter(pk=instance.pk).values_list('station_id', flat=True)
+                                     .first() if instance.pk else None)
+
+
+@receiver([post_save, post_delete], sender=RecipeStep)
+def recipe_step_changed(sender, instance, **kwargs):
+    """Plating stations may have changed: new line version, recost the stations involved."""
+    if RecipeStep._meta.get_field('recipe').is_cached(instance):
+        project_id = instance.recipe.project_id
+    else:
+        # The recipe may already be gone when its steps are cascade-deleted
+        project_id = Recipe.objects.filter(pk=instance.recipe_id).values_list('project_id', flat=True).first()
+    if project_id is not None:
+        bump_line_version(project_id)
+        budget = _budget(project_id)
+        if budget is not None:
+            station_ids = {instance.station_id, getattr(instance, '_previous_station_id', None)} - {None}
+            stations = list(Station.objects.filter(pk__in=station_ids))
+            if stations:
+                budget_rollup.refresh_stations(budget, stations)
+
+
+@receiver([post_save, post_delete], sender=Recipe)
+@receiver(post_delete, sender=Part_Size)
+def rack_current_changed(sender, instance, **kwargs):
+    """A recipe's part size sets its rack current: recost the rectifiers."""
+    budget = _budget(instance.project_id)
+    if budget is not None:
+        budget_rollup.refresh_rectifiers(budget)
+
+
+@receiver([post_save, post_delete], sender=Station)
+@receiver([post_save, post_delete], sender=Recipe)
+@receiver([post_save, post_delete], sender=SimulationParameters)
+@receiver([post_save, post_delete], sender=ProductionGoal)
+@receiver([post_save, post_delete], sender=ProductionCalendar)
+@receiver([post_save, post_delete], sender=Part_Size)
+@receiver([post_save, post_delete], sender=ProcessParameter)
+def line_state_changed(sender, instance, **kwargs):
+    """Line inputs changed: a new line version marks derived data (controls, coalesced results) stale."""
+    bump_line_version(instance.project_id)
+
+
+@receiver([post_save, post_delete], sender=ProductionCalendar)
+@receiver([post_save, post_delete], sender=SimulationParameters)
+def schedule_changed(sender, instance, **kwargs):
+    """Working hours changed: drop the cached calendar capacity."""
+    invalidate_calendar_capacity(instance.project_id)
+
+
+@receiver(post_save, sender=SimulationParameters)
+def rack_and_hoists_changed(sender, instance, **kwargs):
+    """Hoist count or parts per rack may have changed: recost hoists and rectifiers."""
+    budget = _budget(instance.project_id)
+    if budget is not None:
+        budget_rollup.refresh_hoists(budget)
+        budget_rollup.refresh_rectifiers(budget)
+
+
+@receiver(post_save, sender=Part_Size)
+def part_size_changed(sender, instance, created, **kwargs):
+    """Part geometry changed: re-derive dwell times of plating steps that use it."""
+    if not created:
+        apply_plating_dwell_times(instance.project, part_size_ids=[instance.id])
+        budget = _budget(instance.project_id)
+        if budget is not None:
+            budget_rollup.refresh_rectifiers(budget)
+
+
+@receiver(post_delete, sender=Projects)
+def project_deleted(sender, instance, **kwargs):
+    """Release the deleted project's links into the document store."""
+    unlink_documents(instance)
+
+
+@receiver(post_delete, sender=Quote)
+def quote_deleted(sender, instance, **kwargs):
+    """Delete the quote document once the deletion is committed."""
+    if instance.file:
+        name = instance.file.name
+        transaction.on_commit(lambda: default_storage.delete(name))
@@ -0,0 +1,577 @@
+"""
+Time-based (discrete-event) simulation of the process lines.
+
+calculate_throughput works on a steady super-cycle. It cannot see the line
+filling up at the start of a shift, or a hoist that is free while the next
+tank is still occupied. This engine moves individual flight bars through
+the line:
+
+  load   the bar is loaded by hand (part_load_time) and waits at the load
+         station until a hoist picks it up.
+  move   a free hoist drives empty to the bar, then carries it to the next
+         tank (TravelMatrix move time). The move only starts once the
+         destination has a free tank (parallel_tanks slots), so a finished
+         bar blocks its tank until it can leave.
+  treat  dwell + drip in the tank.
+  unload after the last tank the bar is carried to the unload station and
+         unloaded (part_unload_time).
+
+Bars are released in the repeating recipe order chosen by
+SequenceOptimizer. Hoists are a shared pool: collisions between hoists on
+one rail are not modelled. Load and unload times can be randomised with a
+coefficient of variation, using a seeded generator.
+
+With ``process_lines`` > 1 every line has its own tanks and hoist_count
+hoists, and the lines run in the same event loop so they can compete for
+what they share, as in ProductionSimulator._shared_resources:
+
+  load/unload  one operator loads and unloads for all lines, one bar at a
+               time in request order. A bar waiting for the operator keeps
+               its line's load or unload position.
+  shuttle      with has_transfer_shuttle, a loaded bar rides the shuttle
+               onto its line and a finished bar rides it off again, one
+               trip (the fixed handling time) at a time.
+
+A single line has its own loader and unloader, so only the shuttle is
+shared there.
+
+Results are analysed by ``time_based_simulation``:
+
+  warm-up       MSER truncation over batch means of the inter-departure
+                times. The batch is a whole number of recipe cycles.
+  steady state  batch means with a 95% t-interval. The run stops early
+                once the half-width is inside the tolerance.
+  shift total   completions inside one shift from empty lines. If the
+                run stopped early, the rest of the shift is extrapolated
+                at the steady-state rate.
+"""
+import heapq
+import math
+import random
+from collections import deque
+
+from .sequencing import SequenceOptimizer
+
+MSER_BATCH = 5
+MIN_BATCHES = 10
+DEFAULT_TOLERANCE = 0.02
+DEFAULT_MAX_BARS = 5000
+MAX_EVENTS_PER_BAR = 200
+
+# Two-sided 95% Student t quantiles by degrees of freedom
+T_95 = [
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+    2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+    2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042,
+]
+
+LOAD = 'load'
+UNLOAD = 'unload'
+
+
+def _t_quantile(df):
+    if df <= 0:
+        return math.inf
+    return T_95[df - 1] if df <= len(T_95) else 1.96
+
+
+class _Bar:
+    __slots__ = ('number', 'line', 'recipe', 'steps', 'step', 'location', 'slot', 'arrived_at', 'treated_at')
+
+    def __init__(self, number, line, recipe, steps, arrived_at):
+        self.number = number
+        self.line = line
+        self.recipe = recipe
+        self.steps = steps
+        self.step = -1          # index of the tank the bar is in; -1 at load
+        self.location = LOAD    # station index, LOAD or UNLOAD
+        self.slot = None
+        self.arrived_at = arrived_at
+        self.treated_at = arrived_at
+
+
+class LineEngine:
+    """Event-driven model of the project's lines. Advance it with ``run_until``."""
+
+    def __init__(self, simulator, hoist_count, sequence, variability=0.0, seed=0, record_timeline=False):
+        self.params = simulator.params
+        self.travel = simulator.travel
+        self.sequence = sequence
+        self.variability = variability
+        self.random = random.Random(seed)
+
+        stations = simulator.stations
+        self.lines = max(1, self.params.process_lines or 1)
+        self.station_index = {s.id: i for i, s in enumerate(stations)}
+        self.station_ids = [s.id for s in stations]
+        self.free_slots = [[list(range(max(1, s.parallel_tanks or 1)))[::-1] for s in stations]
+                           for _ in range(self.lines)]
+        self.load_station = next((s.id for s in stations if s.is_loading_station), None)
+        self.unload_station = next((s.id for s in stations if s.is_unloading_station), self.load_station)
+
+        # Per-recipe route as station indexes with treatment times
+        self.routes = {}
+        for recipe in sequence:
+            if recipe.id not in self.routes:
+                self.routes[recipe.id] = [
+                    (self.station_index[step.station_id],
+                     (step.dwell_time or step.min_dwell_time or 0) + (step.drip_time or 0))
+                    for step in recipe.steps.all() if step.station_id in self.station_index
+                ]
+
+        # hoist_count hoists per line; hoist h serves line h // hoists_per_line
+        self.hoists_per_line = max(1, hoist_count)
+        self.hoist_count = self.hoists_per_line * self.lines
+        self.hoist_free = [True] * self.hoist_count
+        self.hoist_position = [self.load_station] * self.hoist_count
+
+        # Shared between lines: one load/unload operator once there are
+        # several lines, and the transfer shuttle if there is one
+        self.shared_handling = self.lines > 1
+        self.handling_queue = deque()   # ('load' | 'unload', bar)
+        self.handling_busy = False
+        self.shuttle_time = self.travel.fixed_time if self.params.has_transfer_shuttle else None
+        self.shuttle_queue = deque()    # bars waiting to be carried onto or off their line
+        self.shuttle_busy = False
+        self.busy_time = {'load_unload': 0.0, 'transfer_shuttle': 0.0}
+
+        self.now = 0.0
+        self.events = []
+        self.counter = 0
+        self.events_processed = 0
+        self.pending = [[] for _ in range(self.lines)]   # bars waiting for a hoist / destination
+        self.load_busy = [False] * self.lines
+        self.unload_busy = [False] * self.lines
+        self.released = 0
+        self.released_per_line = [0] * self.lines
+        self.completions = []       # (time, recipe_id)
+        self.deadlocked = False
+        self.truncated = False      # a run stopped at its event cap
+
+        self.record_timeline = record_timeline
+        self.hoist_intervals = [[] for _ in range(self.hoist_count)]
+        self.tank_intervals = {}    # (line, station index, slot) -> [(start, end, state)]
+        self.stations = stations
+        self.occupants = {}         # (line, station index, slot) -> bar in that tank
+
+        for line in range(self.lines):
+            self._start_load(line)
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+    def _schedule(self, delay, kind, *payload):
+        self.counter += 1
+        heapq.heappush(self.events, (self.now + delay, self.counter, kind, payload))
+
+    def _handling_time(self, nominal):
+        if self.variability <= 0 or nominal <= 0:
+            return nominal
+        return max(0.0, self.random.gauss(nominal, nominal * self.variability))
+
+    def _station_id(self, location):
+        if location == LOAD:
+            return self.load_station
+        if location == UNLOAD:
+            return self.unload_station
+        return self.station_ids[location]
+
+    def _empty_travel(self, from_id, to_id):
+        i = self.travel.index.get(from_id)
+        j = self.travel.index.get(to_id)
+        if i is None or j is None:
+            return 0.0
+        return self.travel.times[i][j] - self.travel.fixed_time
+
+    def _record(self, intervals, start, end, state):
+        if self.record_timeline and end > start:
+            intervals.append((start, end, state))
+
+    def line_hoists(self, line):
+        return range(line * self.hoists_per_line, (line + 1) * self.hoists_per_line)
+
+    # ------------------------------------------------------------------
+    # Load / unload and the shared resources
+    # ------------------------------------------------------------------
+    def _start_load(self, line):
+        """Reserve the line's load position for its next bar and have it loaded."""
+        if self.load_busy[line] or not self.sequence:
+            return
+        recipe = self.sequence[self.released_per_line[line] % len(self.sequence)]
+        bar = _Bar(self.released, line, recipe, self.routes[recipe.id], self.now)
+        self.released += 1
+        self.released_per_line[line] += 1
+        self.load_busy[line] = True
+        self._handle_bar(LOAD, bar)
+
+    def _handle_bar(self, kind, bar):
+        """Load or unload a bar: in turn at the shared operator, or at once on a single line."""
+        if self.shared_handling:
+            self.handling_queue.append((kind, bar))
+            self._serve_handling()
+        else:
+            nominal = self.params.part_load_time if kind == LOAD else self.params.part_unload_time
+            self._schedule(self._handling_time(nominal or 60), 'handled', kind, bar)
+
+    def _serve_handling(self):
+        if self.handling_busy or not self.handling_queue:
+            return
+        kind, bar = self.handling_queue.popleft()
+        nominal = self.params.part_load_time if kind == LOAD else self.params.part_unload_time
+        duration = self._handling_time(nominal or 60)
+        self.handling_busy = True
+        self.busy_time['load_unload'] += duration
+        self._schedule(duration, 'handled', kind, bar)
+
+    def _carry_by_shuttle(self, bar):
+        self.shuttle_queue.append(bar)
+        self._serve_shuttle()
+
+    def _serve_shuttle(self):
+        if self.shuttle_busy or not self.shuttle_queue:
+            return
+        bar = self.shuttle_queue.popleft()
+        if bar.location == UNLOAD:
+            # Taken off the line: its unload position frees up
+            self.unload_busy[bar.line] = False
+        self.shuttle_busy = True
+        self.busy_time['transfer_shuttle'] += self.shuttle_time
+        self._schedule(self.shuttle_time, 'shuttled', bar)
+
+    def _destination(self, bar):
+        return bar.steps[bar.step + 1][0] if bar.step + 1 < len(bar.steps) else UNLOAD
+
+    # ------------------------------------------------------------------
+    # Hoist dispatch
+    # ------------------------------------------------------------------
+    def _dispatch(self):
+        for line in range(self.lines):
+            if self.pending[line]:
+                self._dispatch_line(line)
+
+    def _dispatch_line(self, line):
+        if not any(self.hoist_free[h] for h in self.line_hoists(line)):
+            return
+        free_slots = self.free_slots[line]
+        still_pending = []
+        for bar in self.pending[line]:
+            destination = self._destination(bar)
+            free = (not self.unload_busy[line]) if destination == UNLOAD else bool(free_slots[destination])
+            hoists = [h for h in self.line_hoists(line) if self.hoist_free[h]]
+            if not free or not hoists:
+                still_pending.append(bar)
+                continue
+
+            source_id = self._station_id(bar.location)
+            hoist = min(hoists, key=lambda h: self._empty_travel(self.hoist_position[h], source_id))
+            empty = self._empty_travel(self.hoist_position[hoist], source_id)
+            loaded = self.travel.move_time(source_id, self._station_id(destination))
+
+            # Reserve the destination now so no other bar claims it mid-move
+            if destination == UNLOAD:
+                self.unload_busy[line] = True
+                slot = None
+            else:
+                slot = free_slots[destination].pop()
+            self.hoist_free[hoist] = False
+            self._record(self.hoist_intervals[hoist], self.now, self.now + empty, 'empty')
+            self._record(self.hoist_intervals[hoist], self.now + empty, self.now + empty + loaded, 'carry')
+            self._schedule(empty, 'picked', bar, hoist, destination, slot, loaded)
+        self.pending[line] = still_pending
+
+    # ------------------------------------------------------------------
+    # Events
+    # ------------------------------------------------------------------
+    def _handle(self, kind, payload):
+        if kind == 'handled':
+            handling, bar = payload
+            if self.shared_handling:
+                self.handling_busy = False
+                self._serve_handling()
+            if handling == UNLOAD:
+                if self.shuttle_time is None:
+                    self.unload_busy[bar.line] = False
+                self.completions.append((self.now, bar.recipe.id))
+            elif self.shuttle_time is not None:
+                self._carry_by_shuttle(bar)
+            else:
+                self.pending[bar.line].append(bar)
+
+        elif kind == 'shuttled':
+            bar, = payload
+            self.shuttle_busy = False
+            self._serve_shuttle()
+            if bar.location == LOAD:
+                # Delivered to its line's load position
+                self.pending[bar.line].append(bar)
+            else:
+                self._handle_bar(UNLOAD, bar)
+
+        elif kind == 'picked':
+            # Hoist has reached the bar and lifts it out: its old place frees up
+            bar, hoist, destination, slot, loaded = payload
+            if bar.location == LOAD:
+                self.load_busy[bar.line] = False
+                self._start_load(bar.line)
+            elif bar.location != UNLOAD:
+                self.free_slots[bar.line][bar.location].append(bar.slot)
+                key = (bar.line, bar.location, bar.slot)
+                del self.occupants[key]
+                intervals = self.tank_intervals.setdefault(key, [])
+                self._record(intervals, bar.arrived_at, bar.treated_at, 'treat')
+                self._record(intervals, bar.treated_at, self.now, 'blocked')
+            self._schedule(loaded, 'dropped', bar, hoist, destination, slot)
+
+        elif kind == 'dropped':
+            bar, hoist, destination, slot = payload
+            self.hoist_free[hoist] = True
+            self.hoist_position[hoist] = self._station_id(destination)
+            bar.location = destination
+            bar.slot = slot
+            bar.arrived_at = self.now
+            if destination == UNLOAD:
+                if self.shuttle_time is not None:
+                    self._carry_by_shuttle(bar)
+                else:
+                    self._handle_bar(UNLOAD, bar)
+            else:
+                bar.step += 1
+                self.occupants[(bar.line, destination, slot)] = bar
+                self._schedule(bar.steps[bar.step][1], 'treated', bar)
+
+        elif kind == 'treated':
+            bar, = payload
+            bar.treated_at = self.now
+            self.pending[bar.line].append(bar)
+
+        self._dispatch()
+
+    def shared_utilization(self):
+        """Busy percentage of each resource shared between lines, up to now."""
+        resources = {}
+        if self.shared_handling:
+            resources['load_unload'] = self.busy_time['load_unload']
+        if self.shuttle_time is not None:
+            resources['transfer_shuttle'] = self.busy_time['transfer_shuttle']
+        return [{'name': name, 'utilization_pct': round(min(busy / self.now, 1) * 100, 2) if self.now else 0}
+                for name, busy in resources.items()]
+
+    def tank_timeline(self):
+        """Recorded tank intervals plus the bars still in a tank, up to now."""
+        timeline = {key: list(intervals) for key, intervals in self.tank_intervals.items()}
+        for key, bar in self.occupants.items():
+            intervals = timeline.setdefault(key, [])
+            treated = bar.treated_at if bar.treated_at >= bar.arrived_at else self.now
+            intervals.append((bar.arrived_at, min(treated, self.now), 'treat'))
+            if treated < self.now:
+                intervals.append((treated, self.now, 'blocked'))
+        return timeline
+
+    def run_until(self, time_limit=math.inf, completions=None, max_events=None):
+        """
+        Advance to ``time_limit`` or until ``completions`` bars have finished.
+
+        A run towards a completion count is capped at MAX_EVENTS_PER_BAR
+        events per bar, in case the line livelocks. A run bounded only by a
+        finite ``time_limit`` is not capped by default: the clock bounds it.
+        Returns False, and sets ``truncated``, if the run stopped at the cap.
+        """
+        if max_events is None and (completions is not None or not math.isfinite(time_limit)):
+            max_events = MAX_EVENTS_PER_BAR * max(completions or 0, 100)
+        processed = 0
+        while self.events:
+            if completions is not None and len(self.completions) >= completions:
+                break
+            if self.events[0][0] > time_limit:
+                self.now = time_limit
+                return True
+            if max_events is not None and processed >= max_events:
+                self.truncated = True
+                return False
+            self.now, _, kind, payload = heapq.heappop(self.events)
+            self._handle(kind, payload)
+            processed += 1
+            self.events_processed += 1
+        if not self.events and any(self.pending):
+            self.deadlocked = True
+        return True
+
+
+# ----------------------------------------------------------------------
+# Output analysis
+# ----------------------------------------------------------------------
+def _batch_means(values, size):
+    count = len(values) // size
+    return [sum(values[i * size:(i + 1) * size]) / size for i in range(count)]
+
+
+def mser_truncation(batch_means):
+    """
+    Number of leading batches to discard (MSER): the cut that minimises
+    the variance of the remaining mean. Cuts past half the series are not
+    considered.
+    """
+    n = len(batch_means)
+    if n < 2:
+        return 0
+    # Suffix sums give every candidate's mean and SSE in one pass
+    suffix_sum = [0.0] * (n + 1)
+    suffix_sq = [0.0] * (n + 1)
+    for i in range(n - 1, -1, -1):
+        suffix_sum[i] = suffix_sum[i + 1] + batch_means[i]
+        suffix_sq[i] = suffix_sq[i + 1] + batch_means[i] ** 2
+
+    best_cut, best_stat = 0, math.inf
+    for d in range(n // 2 + 1):
+        remaining = n - d
+        sse = suffix_sq[d] - suffix_sum[d] ** 2 / remaining
+        stat = max(sse, 0.0) / remaining ** 2
+        if stat < best_stat - 1e-12:
+            best_cut, best_stat = d, stat
+    return best_cut
+
+
+class SteadyStateEstimate:
+    """Warm-up cut and batch-means interval for a run's departures."""
+
+    def __init__(self, completion_times, batch_size):
+        self.batch_size = batch_size
+        self.completion_times = completion_times
+        gaps = [b - a for a, b in zip([0.0] + completion_times, completion_times)]
+        means = _batch_means(gaps, batch_size)
+        cut = mser_truncation(means)
+
+        self.warmup_bars = cut * batch_size
+        self.warmup_time = completion_times[self.warmup_bars - 1] if self.warmup_bars else 0.0
+        steady = means[cut:]
+        self.batches = len(steady)
+
+        if self.batches:
+            self.mean_gap = sum(steady) / self.batches
+        else:
+            self.mean_gap = 0.0
+        if self.batches >= 2:
+            variance = sum((m - self.mean_gap) ** 2 for m in steady) / (self.batches - 1)
+            self.half_width = _t_quantile(self.batches - 1) * math.sqrt(variance / self.batches)
+        else:
+            self.half_width = math.inf
+
+    @property
+    def relative_half_width(self):
+        return self.half_width / self.mean_gap if self.mean_gap > 0 else math.inf
+
+    def converged(self, tolerance):
+        return self.batches >= MIN_BATCHES and self.relative_half_width <= tolerance
+
+    def bars_per_hour(self, gap=None):
+        gap = self.mean_gap if gap is None else gap
+        return 3600 / gap if gap > 0 else 0
+
+
+def release_sequence(simulator, hoist_count=None):
+    """Repeating recipe order to release bars in, and the hoist count used."""
+    optimizer = SequenceOptimizer(simulator, hoist_count=hoist_count)
+    order, _, _, _ = optimizer.optimize(time_budget=0.2)
+    return [optimizer.recipes[i] for i in order], optimizer.hoist_count
+
+
+def time_based_simulation(simulator, hoist_count=None, shift_hours=None, tolerance=DEFAULT_TOLERANCE,
+                          max_bars=DEFAULT_MAX_BARS, variability=0.0, seed=0, record_timeline=False):
+    """
+    Run the line from empty and report warm-up, steady-state throughput
+    and shift-total output. Returns ``(result, engine)``.
+    """
+    check = simulator.calculate_throughput(hoist_count=hoist_count)
+    if "error" in check:
+        return check, None
+
+    sequence, hoist_count = release_sequence(simulator, hoist_count)
+    if not sequence:
+        return {"error": "No active recipes with steps found."}, None
+
+    engine = LineEngine(simulator, hoist_count, sequence, variability=variability, seed=seed,
+                        record_timeline=record_timeline)
+    parts_per_rack = simulator.parts_per_rack()
+    process_lines = engine.lines
+    shift_hours = shift_hours or simulator.calendar.hours['shift'] or 8
+    shift_seconds = shift_hours * 3600
+
+    # Whole recipe cycles of every line, whose departures interleave
+    batch_size = len(sequence) * process_lines * max(1, math.ceil(MSER_BATCH / (len(sequence) * process_lines)))
+    chunk = batch_size * MIN_BATCHES
+    estimate = None
+    converged = False
+    while len(engine.completions) < max_bars and not engine.deadlocked:
+        target = min(len(engine.completions) + chunk, max_bars)
+        if not engine.run_until(completions=target):
+            break
+        if len(engine.completions) < target and not engine.events:
+            break
+        times = [t for t, _ in engine.completions]
+        estimate = SteadyStateEstimate(times, batch_size)
+        if estimate.converged(tolerance):
+            # Steady state is pinned down; the rest of the shift is extrapolated
+            converged = True
+            break
+
+    times = [t for t, _ in engine.completions]
+    if estimate is None or len(times) != len(estimate.completion_times):
+        estimate = SteadyStateEstimate(times, batch_size)
+
+    steady_bph = estimate.bars_per_hour()
+    finished_in_shift = sum(1 for t in times if t <= shift_seconds)
+    extrapolated = engine.now < shift_seconds and not engine.deadlocked
+    shift_bars = finished_in_shift
+    if extrapolated and steady_bph > 0:
+        shift_bars += steady_bph * (shift_seconds - engine.now) / 3600
+
+    # Completions are counted over all lines
+    shift_parts = shift_bars * parts_per_rack
+    steady_pph = steady_bph * parts_per_rack
+    steady_projection = steady_pph * shift_hours
+
+    def pph_bound(gap):
+        return round(estimate.bars_per_hour(gap) * parts_per_rack, 2) if gap > 0 else None
+
+    result = {
+        'hoist_count': hoist_count,
+        'process_lines': process_lines,
+        'shared_resources': engine.shared_utilization(),
+        'sequence': [r.name for r in sequence],
+        'warmup': {
+            'time': round(estimate.warmup_time, 2),
+            'bars': estimate.warmup_bars,
+            'method': 'MSER',
+            'batch_size': batch_size,
+        },
+        'steady_state': {
+            'parts_per_hour': round(steady_pph, 2),
+            # A longer gap between departures means lower throughput
+            'ci_low': pph_bound(estimate.mean_gap + estimate.half_width),
+            'ci_high': pph_bound(estimate.mean_gap - estimate.half_width),
+            'confidence': 0.95,
+            'relative_half_width_pct': (
+                round(estimate.relative_half_width * 100, 3) if math.isfinite(estimate.relative_half_width) else None),
+            'batches': estimate.batches,
+            'converged': converged,
+        },
+        'shift': {
+            'hours': round(shift_hours, 4),
+            'parts': round(shift_parts, 2),
+            'average_parts_per_hour': round(shift_parts / shift_hours, 2) if shift_hours > 0 else 0,
+            # What multiplying the steady rate by the shift length would claim
+            'steady_state_projection': round(steady_projection, 2),
+            'warmup_loss_pct': (
+                round((steady_projection - shift_parts) / steady_projection * 100, 2) if steady_projection > 0 else 0),
+            'extrapolated': extrapolated,
+        },
+        'analytical_parts_per_hour': check['parts_per_hour'],
+        'simulated_time': round(engine.now, 2),
+        'bars_completed': len(times),
+        'events_processed': engine.events_processed,
+        'stopped_early': converged and len(times) < max_bars,
+        'deadlocked': engine.deadlocked,
+        # Stopped at the event cap: the figures cover less than was asked for
+        'truncated': engine.truncated,
+    }
+    return result, engine
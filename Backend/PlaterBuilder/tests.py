@@ -1,3 +1,1169 @@
-from django.test import TestCase
+import hashlib
+import io
+import itertools
+import json
+import math
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from unittest import mock, skipIf, skipUnless
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from . import coalesce, document_store, previews, quotes, result_codec, sequencing, serializers, uploads
+from .budget import get_budget, rack_currents, rebuild_budget, refresh_controls
+from .controls_matrix import controls_matrix, upsert_manual_points
+from .models import (Budget, BudgetLine, Customers, Element, Part_Size, ProcessParameter, ProductionCalendar,
+                     ProductionGoal, Projects, Quote, Recipe, RecipeStep, SimulationParameters, SimulationResult,
+                     Station, StoredDocument, UploadSession)
+from .plating import FARADAY, apply_plating_dwell_times, plating_dwell_times
+from .process_matrix import derive_from_recipe_steps, matrix_slice, upsert_entries
+from .production_calendar import get_calendar_capacity
+from .rack_packing import capped_parts_per_rack, pack_rectangles, rack_envelope, recipe_rack_capacity
+from .renderers import FastJSONRenderer
+from .sensitivity import SensitivityAnalysis
+from .sequencing import SequenceOptimizer
+from .services import (ProductionSimulator, apply_goal_seek, compare_simulation_results, goal_seek,
+                       simulation_trends)
+from .simulation_engine import LineEngine, release_sequence, time_based_simulation
+from .timeline import line_timeline
+from .travel import TravelMatrix
+
+
+def make_line(project_id='T1', stations=6):
+    """A project with a loading station, process stations and an unloading station, and one recipe."""
+    customer = Customers.objects.create(company_name="Acme", point_of_contact="Pat", email="pat@example.com")
+    project = Projects.objects.create(project_id=project_id, project_name="Test line", customer=customer,
+                                      process="Nickel", substrate="Steel")
+    line = [Station.objects.create(project=project, station_number=f"S{n}", process_name=f"Process {n}",
+                                   position_index=n, tank_length=1.2, tank_width=0.8, distance_to_next=1.0,
+                                   is_loading_station=n == 0, is_unloading_station=n == stations - 1)
+            for n in range(stations)]
+    recipe = Recipe.objects.create(project=project, name="Recipe A")
+    for order, station in enumerate(line[1:-1]):
+        RecipeStep.objects.create(recipe=recipe, station=station, step_order=order, dwell_time=60, drip_time=10)
+    return project
+
+
+def make_result(project, name="Run", stations=(), recipes=(), **metrics):
+    """A stored simulation result with the given station and recipe breakdown rows."""
+    fields = dict(parts_per_hour=1, parts_per_day=8, parts_per_week=40, parts_per_month=160, parts_per_year=2000,
+                  cycle_time=60, total_process_time=50, total_transfer_time=10, total_drip_time=0, hoist_count=1,
+                  hoist_utilization=50)
+    fields.update(metrics)
+    return SimulationResult.objects.create(
+        project=project, name=name, station_utilization=result_codec.encode_station_utilization(list(stations)),
+        recipe_results=result_codec.encode_recipe_results(list(recipes)), **fields)
+
+
+def line_version(project):
+    return Projects.objects.values_list('line_version', flat=True).get(pk=project.pk)
+
+
+class SingleFlightTests(TestCase):
+    def test_fingerprint_changes_on_edit(self):
+        project = make_line()
+        before = line_version(project)
+        station = Station.objects.filter(project=project).first()
+        station.tank_length = 2.0
+        station.save()
+        self.assertGreater(line_version(project), before)
+
+    def test_bulk_writes_change_fingerprint(self):
+        project = make_line()
+        before = line_version(project)
+        derive_from_recipe_steps(project)
+        self.assertGreater(line_version(project), before)
+
+    def test_fingerprint_does_not_use_last_updated(self):
+        project = make_line()
+        fingerprint = coalesce.project_fingerprint(Projects.objects.get(pk=project.pk))
+        Projects.objects.filter(pk=project.pk).update(project_name="Renamed")
+        self.assertEqual(coalesce.project_fingerprint(Projects.objects.get(pk=project.pk)), fingerprint)
+
+    def test_concurrent_callers_share_one_computation(self):
+        calls = []
+        started = threading.Event()
+        release = threading.Event()
+
+        def compute():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return {'value': len(calls)}
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(coalesce.single_flight('test:shared', compute)))
+        leader.start()
+        started.wait(5)
+        follower = threading.Thread(target=lambda: results.append(coalesce.single_flight('test:shared', compute)))
+        follower.start()
+        time.sleep(0.05)
+        release.set()
+        leader.join(5)
+        follower.join(5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'value': 1}, {'value': 1}])
+
+    def test_finished_result_is_not_reused(self):
+        self.assertEqual(coalesce.single_flight('test:sequential', lambda: {'run': 1}), {'run': 1})
+        self.assertEqual(coalesce.single_flight('test:sequential', lambda: {'run': 2}), {'run': 2})
+
+    def test_leader_returns_the_shape_followers_get(self):
+        self.assertEqual(coalesce.single_flight('test:shape', lambda: {'ids': (1, 2)}), {'ids': [1, 2]})
+
+    def test_result_is_not_written_without_a_waiting_process(self):
+        _, result_path, _ = coalesce._paths('test:alone')
+        coalesce.single_flight('test:alone', lambda: {'run': 1})
+        self.assertFalse(os.path.exists(result_path))
+
+    @skipIf(coalesce.fcntl is None, "file locking needs fcntl")
+    def test_waiting_process_reads_the_shared_result(self):
+        started = threading.Event()
+        release = threading.Event()
+        followed = []
+
+        def compute():
+            started.set()
+            release.wait(5)
+            return {'run': 1}
+
+        results = {}
+        # Separate lock file handles behave like separate processes
+        leader = threading.Thread(target=lambda: results.update(
+            leader=coalesce._compute_across_processes('test:processes', compute)))
+        leader.start()
+        started.wait(5)
+        follower = threading.Thread(target=lambda: results.update(
+            follower=coalesce._compute_across_processes('test:processes', lambda: followed.append(1))))
+        follower.start()
+        _, result_path, waiting_path = coalesce._paths('test:processes')
+        for _ in range(100):
+            if os.path.exists(waiting_path):
+                break
+            time.sleep(0.01)
+        release.set()
+        leader.join(5)
+        follower.join(5)
+        self.assertEqual(results, {'leader': {'run': 1}, 'follower': {'run': 1}})
+        self.assertEqual(followed, [])
+        self.assertFalse(os.path.exists(waiting_path))
+
+    def test_prune_keeps_lock_files(self):
+        lock_path, result_path, _ = coalesce._paths('test:prune')
+        for path in (lock_path, result_path):
+            with open(path, 'a'):
+                pass
+            os.utime(path, (0, 0))
+        coalesce._prune()
+        self.assertTrue(os.path.exists(lock_path))
+        self.assertFalse(os.path.exists(result_path))
+
+
+@skipUnless(connection.vendor == 'sqlite', "plans are checked against SQLite's EXPLAIN QUERY PLAN")
+class HotLookupIndexTests(TestCase):
+    def setUp(self):
+        self.project = make_line()
+        make_result(self.project)
+
+    def assertUsesIndex(self, queryset, index):
+        plan = queryset.explain()
+        self.assertIn(index, plan)
+        # The index also yields the rows in order, so no separate sort
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_station_order_uses_the_position_index(self):
+        self.assertUsesIndex(Station.objects.filter(project=self.project).order_by('position_index'),
+                             'station_project_position_idx')
+
+    def test_active_recipes_use_the_partial_index(self):
+        self.assertUsesIndex(Recipe.objects.filter(project=self.project, is_active=True),
+                             'recipe_project_active_idx')
+
+    def test_history_by_date_uses_the_date_index(self):
+        self.assertUsesIndex(SimulationResult.objects.filter(project=self.project).order_by('-simulation_date'),
+                             'simresult_project_date_idx')
+
+
+class ControlsMatrixTests(TestCase):
+    def test_regenerates_only_after_line_changes(self):
+        project = make_line()
+        self.assertTrue(controls_matrix(project)['regenerated'])
+        self.assertFalse(controls_matrix(project)['regenerated'])
+        Station.objects.filter(project=project, position_index=2).update(parallel_tanks=3)
+        coalesce.bump_line_version(project.pk)
+        matrix = controls_matrix(project)
+        self.assertTrue(matrix['regenerated'])
+        quantities = {point['tag']: point['quantity'] for point in matrix['points']}
+        self.assertEqual(quantities['S2-ZS'], 3)
+
+    def test_manual_point_change_regenerates(self):
+        project = make_line()
+        controls_matrix(project)
+        upsert_manual_points(project, [{'tag': 'X-1', 'io_type': 'DI', 'quantity': 1}])
+        self.assertTrue(controls_matrix(project)['regenerated'])
+
+
+def make_part_size(project, name="Panel", plated_area=0.5):
+    return Part_Size.objects.create(project=project, name=name, length=0.5, width=0.5, height=0.01, volume=0.0025,
+                                    weight=1.0, total_surface_area=0.5, plated_area=plated_area)
+
+
+class ProcessMatrixTests(TestCase):
+    def setUp(self):
+        self.project = make_line()
+        self.stations = list(Station.objects.filter(project=self.project).order_by('position_index'))
+        self.recipe = Recipe.objects.get(project=self.project)
+
+    def cell(self, station, parameter, recipe=None):
+        return ProcessParameter.objects.get(station=station, recipe=recipe, parameter=parameter)
+
+    def test_upsert_creates_updates_and_clears_cells(self):
+        first, second = self.stations[1:3]
+        result = upsert_entries(self.project, [
+            {'station': first.id, 'parameter': 'temperature', 'value': 55},
+            {'station': first.id, 'recipe': self.recipe.id, 'parameter': 'current_density', 'value': '2.5'},
+            {'station': second.id, 'recipe': self.recipe.id, 'parameter': 'element', 'text_value': 'Ni'},
+        ])
+        self.assertEqual(result, {'created': 3, 'updated': 0, 'deleted': 0})
+        self.assertEqual((self.cell(first, 'temperature').value, self.cell(first, 'temperature').unit), (55, '°C'))
+
+        result = upsert_entries(self.project, [
+            {'station': first.id, 'parameter': 'temperature', 'value': 60},
+            {'station': first.id, 'recipe': self.recipe.id, 'parameter': 'current_density', 'value': None},
+        ])
+        self.assertEqual(result, {'created': 0, 'updated': 1, 'deleted': 1})
+        self.assertEqual(self.cell(first, 'temperature').value, 60)
+        self.assertEqual(ProcessParameter.objects.filter(project=self.project).count(), 2)
+
+    def test_upsert_rejects_stations_of_other_lines(self):
+        foreign = Station.objects.filter(project=make_line('T2')).first()
+        result = upsert_entries(self.project, [{'station': foreign.id, 'parameter': 'temperature', 'value': 55}])
+        self.assertIn("entries[0]", result['error'])
+        self.assertFalse(ProcessParameter.objects.exists())
+
+    def test_slice_keeps_station_wide_cells_for_a_recipe(self):
+        first, second = self.stations[1:3]
+        other = Recipe.objects.create(project=self.project, name="Recipe B")
+        upsert_entries(self.project, [
+            {'station': first.id, 'parameter': 'temperature', 'value': 55},
+            {'station': first.id, 'recipe': self.recipe.id, 'parameter': 'dwell_time', 'value': 90},
+            {'station': first.id, 'recipe': other.id, 'parameter': 'dwell_time', 'value': 30},
+            {'station': second.id, 'recipe': self.recipe.id, 'parameter': 'dwell_time', 'value': 45},
+        ])
+        with self.assertNumQueries(3):
+            matrix = matrix_slice(self.project, station_ids=[first.id], recipe_ids=[self.recipe.id])
+        self.assertEqual([s['id'] for s in matrix['stations']], [first.id])
+        self.assertEqual([r['id'] for r in matrix['recipes']], [self.recipe.id])
+        self.assertEqual(matrix['parameters'], ['dwell_time', 'temperature'])
+        entries = matrix['entries']
+        # Where NULL recipes sort is up to the database
+        self.assertCountEqual(zip(entries['station'], entries['recipe'], entries['parameter'], entries['value']),
+                              [(0, 0, 0, 90), (0, None, 1, 55)])
+        self.assertEqual(matrix['nnz'], 2)
+
+        only_dwell = matrix_slice(self.project, parameters=['dwell_time'])
+        self.assertEqual(only_dwell['nnz'], 3)
+        self.assertEqual(only_dwell['entries']['station'], [0, 0, 1])
+
+    def test_derive_keeps_manual_cells(self):
+        first = self.stations[1]
+        derived = derive_from_recipe_steps(self.project)
+        self.assertEqual((derived['steps'], derived['kept_manual']), (4, 0))
+        self.assertEqual(self.cell(first, 'dwell_time', self.recipe).source, 'derived')
+
+        upsert_entries(self.project, [
+            {'station': first.id, 'recipe': self.recipe.id, 'parameter': 'dwell_time', 'value': 99}])
+        RecipeStep.objects.filter(recipe=self.recipe).update(dwell_time=75)
+        derived = derive_from_recipe_steps(self.project)
+        self.assertEqual(derived['kept_manual'], 1)
+        self.assertEqual((self.cell(first, 'dwell_time', self.recipe).value,
+                          self.cell(first, 'dwell_time', self.recipe).source), (99, 'manual'))
+        self.assertEqual(self.cell(self.stations[2], 'dwell_time', self.recipe).value, 75)
+
+        derived = derive_from_recipe_steps(self.project, overwrite=True)
+        self.assertEqual(derived['replaced_manual'], 1)
+        self.assertEqual((self.cell(first, 'dwell_time', self.recipe).value,
+                          self.cell(first, 'dwell_time', self.recipe).source), (75, 'derived'))
+
+
+class BudgetRollupTests(TestCase):
+    """Incremental totals must always match costing the line from scratch."""
+
+    def setUp(self):
+        self.project = make_line(stations=8)
+        self.part = make_part_size(self.project)
+        self.recipe = Recipe.objects.get(project=self.project)
+        self.recipe.part_size = self.part
+        self.recipe.save()
+        RecipeStep.objects.filter(recipe=self.recipe, step_order__in=[1, 3]).update(current_density=2.0)
+        SimulationParameters.objects.create(project=self.project, parts_per_rack=4, calculated_hoist_count=2)
+        self.budget = get_budget(self.project)
+
+    def station(self, position):
+        return Station.objects.get(project=self.project, position_index=position)
+
+    def assertMatchesRebuild(self):
+        refresh_controls(self.budget)
+        incremental = Budget.objects.get(pk=self.budget.pk)
+        lines = dict(((line.category, line.key), line.amount)
+                     for line in BudgetLine.objects.filter(project=self.project))
+        rebuilt = rebuild_budget(Budget.objects.get(pk=self.budget.pk))
+        self.assertEqual(lines, dict(((line.category, line.key), line.amount)
+                                     for line in BudgetLine.objects.filter(project=self.project)))
+        for category in ('tanks', 'rectifiers', 'hoists', 'controls'):
+            self.assertAlmostEqual(getattr(incremental, f'{category}_total'),
+                                   getattr(rebuilt, f'{category}_total'), places=2, msg=category)
+
+    def test_station_edit(self):
+        station = self.station(2)
+        station.tank_length = 2.5
+        station.parallel_tanks = 2
+        station.save()
+        self.assertMatchesRebuild()
+
+    def test_station_delete(self):
+        self.station(2).delete()
+        self.assertMatchesRebuild()
+
+    def test_tank_resize_recosts_other_rectifiers(self):
+        # A narrower tank at a non-plating station fits fewer parts per rack on the whole route
+        station = self.station(3)
+        station.tank_length = 0.6
+        station.save()
+        self.assertMatchesRebuild()
+
+    def test_step_moved_between_stations(self):
+        step = RecipeStep.objects.get(recipe=self.recipe, step_order=1)
+        step.station = self.station(6)
+        step.save()
+        self.assertMatchesRebuild()
+        self.assertFalse(BudgetLine.objects.filter(project=self.project, category='rectifiers',
+                                                   key=f'station:{self.station(2).id}').exists())
+
+    def test_recipe_part_size_changed(self):
+        self.recipe.part_size = make_part_size(self.project, name="Large panel", plated_area=2.0)
+        self.recipe.save()
+        self.assertMatchesRebuild()
+
+    def test_part_size_edited_and_deleted(self):
+        self.part.plated_area = 1.5
+        self.part.save()
+        self.assertMatchesRebuild()
+        self.part.delete()
+        self.assertMatchesRebuild()
+
+    def test_parameters_changed(self):
+        params = SimulationParameters.objects.get(project=self.project)
+        params.parts_per_rack = 10
+        params.manual_hoist_count = 3
+        params.has_transfer_shuttle = True
+        params.save()
+        self.assertMatchesRebuild()
+
+    def test_goal_seek_applied(self):
+        best = {'hoist_count': 3, 'parts_per_rack': 6,
+                'tank_changes': [{'station_id': self.station(2).id, 'required_tanks': 3}]}
+        apply_goal_seek(ProductionSimulator(self.project.project_id), best)
+        self.assertMatchesRebuild()
+        self.assertEqual(BudgetLine.objects.get(project=self.project, category='tanks',
+                                                key=f'station:{self.station(2).id}').quantity, 3)
+
+    def test_unresolved_hoist_count_does_not_simulate(self):
+        SimulationParameters.objects.filter(project=self.project).update(calculated_hoist_count=0)
+        rebuilt = rebuild_budget(self.budget)
+        line = BudgetLine.objects.get(project=self.project, category='hoists', key='line')
+        self.assertIn('unresolved', line.description)
+        self.assertEqual(line.quantity, 1)
+        self.assertEqual(rebuilt.hoists_total, line.amount)
+
+
+class CalendarCapacityTests(TestCase):
+    def test_edit_elsewhere_is_not_served_stale(self):
+        project = make_line()
+        calendar = ProductionCalendar.objects.create(project=project, shifts_per_day=1, shift_length_hours=8)
+        project.refresh_from_db()
+        self.assertEqual(get_calendar_capacity(project).hours['day'], 8)
+        # As a save in another worker would: the row and line version change without this process's signals
+        ProductionCalendar.objects.filter(pk=calendar.pk).update(shifts_per_day=2, last_updated=timezone.now())
+        coalesce.bump_line_version(project.pk)
+        project.refresh_from_db()
+        self.assertEqual(get_calendar_capacity(project).hours['day'], 16)
+
+    def test_cache_hit_reads_nothing(self):
+        project = make_line()
+        ProductionCalendar.objects.create(project=project, shifts_per_day=2, shift_length_hours=8)
+        project.refresh_from_db()
+        get_calendar_capacity(project)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_calendar_capacity(project).hours['day'], 16)
+
+    def test_sizing_uses_the_calendar_goal(self):
+        project = make_line()
+        ProductionCalendar.objects.create(project=project, shifts_per_day=1, shift_length_hours=8)
+        # 400 parts a day over 8 hours; the stored hourly figure is out of date
+        ProductionGoal.objects.update_or_create(project=project, defaults={
+            'primary_target': 'day', 'target_parts_per_day': 400, 'target_parts_per_hour': 5})
+        simulator = ProductionSimulator(project.project_id)
+        self.assertEqual(simulator.goal_parts_per_hour(), 50)
+        result = simulator.calculate_throughput()
+        self.assertAlmostEqual(result['hoist_utilization'], min(100, result['parts_per_hour'] / 50 * 100), places=1)
+
+
+class GoalSeekTests(TestCase):
+    def setUp(self):
+        self.project = make_line()
+        # One long step, so the goal needs a second tank there
+        RecipeStep.objects.filter(recipe__project=self.project, step_order=1).update(dwell_time=900)
+        self.current = ProductionSimulator(self.project.project_id).calculate_throughput()['parts_per_hour']
+
+    def seek(self, target):
+        ProductionGoal.objects.update_or_create(project=self.project,
+                                                defaults={'primary_target': 'hour', 'target_parts_per_hour': target})
+        simulator = ProductionSimulator(self.project.project_id)
+        return simulator, goal_seek(simulator)
+
+    def test_needs_a_goal(self):
+        self.assertIn('error', goal_seek(ProductionSimulator(self.project.project_id)))
+
+    def test_best_meets_the_goal(self):
+        simulator, result = self.seek(2 * self.current)
+        self.assertTrue(result['feasible'])
+        best = result['best']
+        self.assertGreaterEqual(best['parts_per_hour'], 2 * self.current)
+        self.assertEqual(best['cost'], min(c['cost'] for c in result['candidates'] if c['feasible']))
+        self.assertEqual([t['station_number'] for t in best['tank_changes']], ['S2'])
+
+    def test_apply_writes_the_configuration(self):
+        simulator, result = self.seek(2 * self.current)
+        best = result['best']
+        before = line_version(self.project)
+        apply_goal_seek(simulator, best)
+        self.assertGreater(line_version(self.project), before)
+        params = SimulationParameters.objects.get(project=self.project)
+        self.assertEqual((params.manual_hoist_count, params.parts_per_rack), (best['hoist_count'], best['parts_per_rack']))
+        self.assertEqual(Station.objects.get(project=self.project, station_number='S2').parallel_tanks, 2)
+        throughput = ProductionSimulator(self.project.project_id).calculate_throughput()
+        self.assertAlmostEqual(throughput['parts_per_hour'], best['parts_per_hour'], delta=0.05)
+
+
+class SensitivityTests(TestCase):
+    def setUp(self):
+        self.project = make_line()
+
+    def rows(self, **params):
+        SimulationParameters.objects.update_or_create(project=self.project, defaults=params)
+        analysis = SensitivityAnalysis(ProductionSimulator(self.project.project_id))
+        return {row['parameter']: row for row in analysis.run()['rows'] if row['scope'] == 'simulation'}
+
+    def test_unset_travel_fields_are_skipped(self):
+        rows = self.rows(hoist_speed_horizontal=0, hoist_speed_vertical=0, hoist_acceleration=0, lift_height=0)
+        self.assertEqual(set(rows), {'transfer_time', 'part_load_time', 'part_unload_time'})
+
+    def test_set_travel_fields_are_perturbed_around_their_value(self):
+        rows = self.rows(hoist_speed_horizontal=0.5, hoist_speed_vertical=0.2, hoist_acceleration=0.1, lift_height=1.0)
+        speed = rows['hoist_speed_horizontal']
+        self.assertEqual((speed['low_value'], speed['high_value']), (0.45, 0.55))
+        self.assertGreaterEqual(speed['parts_per_hour_high'], speed['parts_per_hour_low'])
+        self.assertIn('lift_height', rows)
+
+
+class SequencingTests(TestCase):
+    def setUp(self):
+        self.project = make_line()
+        stations = list(Station.objects.filter(project=self.project).order_by('position_index'))
+        for name, ratio, dwell in (("Recipe B", 2, 200), ("Recipe C", 3, 20)):
+            recipe = Recipe.objects.create(project=self.project, name=name, production_ratio=ratio)
+            for order, station in enumerate(stations[1:4]):
+                RecipeStep.objects.create(recipe=recipe, station=station, step_order=order, dwell_time=dwell)
+        self.optimizer = SequenceOptimizer(ProductionSimulator(self.project.project_id))
+        # An asymmetric matrix gives the search a real choice to make
+        self.optimizer.headways = [[60, 140, 75], [90, 60, 200], [130, 70, 60]]
+
+    def brute_force_period(self):
+        bars = self.optimizer._blocked_sequence()
+        return min(self.optimizer.period(list(order)) for order in set(itertools.permutations(bars)))
+
+    def test_dynamic_programming_finds_the_brute_force_optimum(self):
+        self.assertEqual(self.optimizer.counts, (1, 2, 3))
+        sequence, period, optimal, _ = self.optimizer.optimize(time_budget=5)
+        self.assertTrue(optimal)
+        self.assertEqual(period, self.brute_force_period())
+        self.assertEqual(self.optimizer.period(sequence), period)
+        self.assertEqual(sorted(sequence), self.optimizer._blocked_sequence())
+
+    def test_greedy_sequence_above_the_exact_search_limit(self):
+        with mock.patch.object(sequencing, 'MAX_DP_BARS', 5):
+            sequence, period, optimal, _ = self.optimizer.optimize(time_budget=5)
+        self.assertFalse(optimal)
+        self.assertEqual(self.optimizer.states_evaluated, 0)
+        self.assertEqual(sequence, self.optimizer._greedy_sequence())
+        self.assertGreaterEqual(period, self.brute_force_period())
+
+    def test_ratios_are_keyed_by_recipe_id(self):
+        Recipe.objects.filter(project=self.project, name="Recipe C").update(name="Recipe B")
+        result = SequenceOptimizer(ProductionSimulator(self.project.project_id)).run(time_budget=1)
+        recipes = Recipe.objects.filter(project=self.project).order_by('id')
+        self.assertEqual(result['ratios'], {recipe.id: ratio for recipe, ratio in zip(recipes, (1, 2, 3))})
+
+
+class TravelTests(TestCase):
+    def test_move_times_follow_the_trapezoidal_profile(self):
+        project = make_line(stations=3)
+        stations = list(Station.objects.filter(project=project).order_by('position_index'))
+        params = SimulationParameters(project=project, transfer_time=10, hoist_speed_horizontal=0.5,
+                                      hoist_speed_vertical=0.2, hoist_acceleration=0.1, lift_height=1.0)
+        matrix = TravelMatrix(stations, params)
+        # Pitch: 0.8 / 2 + 1.0 gap + 0.8 / 2 along the line; tank_length (1.2) runs across it
+        self.assertEqual([round(x, 9) for x in matrix.positions], [0.0, 1.8, 3.6])
+        # Lift 1 m at 0.2 m/s: 1 / 0.2 cruise + 0.2 / 0.1 ramps = 7 s, out and back in
+        vertical = 2 * 7.0
+        # 1.8 m is short of the 0.5² / 0.1 = 2.5 m needed to reach full speed: triangular profile
+        self.assertAlmostEqual(matrix.move_time(stations[0].id, stations[1].id), 10 + vertical + 2 * math.sqrt(18))
+        # 3.6 m reaches full speed: 3.6 / 0.5 + 0.5 / 0.1
+        self.assertAlmostEqual(matrix.move_time(stations[0].id, stations[2].id), 10 + vertical + 12.2)
+        self.assertAlmostEqual(matrix.move_time(stations[2].id, stations[0].id), 10 + vertical + 12.2)
+
+
+class PlatingDwellTests(TestCase):
+    def setUp(self):
+        self.project = make_line()
+        self.nickel = Element.objects.get(symbol='Ni')
+        self.step = RecipeStep.objects.get(recipe__project=self.project, step_order=1)
+        self.step.element = self.nickel
+        self.step.target_thickness = 10
+        self.step.current_density = 2
+        self.step.save()
+
+    def expected(self, amps_per_m2):
+        # Faraday's law for 10 um of nickel at 100% efficiency
+        nickel = self.nickel
+        rate = amps_per_m2 * nickel.atomic_weight / (nickel.valence * FARADAY * nickel.density * 1e6)
+        return math.ceil(10e-6 / rate)
+
+    def rows(self):
+        return {row['step_id']: row for row in plating_dwell_times(self.project)[1]}
+
+    def test_dwell_from_current_density(self):
+        row = self.rows()[self.step.id]
+        self.assertEqual(row['dwell_time'], self.expected(200))
+        self.assertEqual(row['current_dwell_time'], 60)
+
+    def test_dwell_from_rectifier_current_follows_the_rack(self):
+        self.step.recipe.part_size = make_part_size(self.project, plated_area=0.5)
+        self.step.recipe.save()
+        RecipeStep.objects.filter(pk=self.step.pk).update(current_density=None, rectifier_current=100)
+        self.assertEqual(self.rows()[self.step.id]['dwell_time'], self.expected(200))
+        SimulationParameters.objects.update_or_create(project=self.project, defaults={'parts_per_rack': 2})
+        self.project.refresh_from_db()
+        self.assertEqual(self.rows()[self.step.id]['dwell_time'], self.expected(100))
+
+    def test_missing_inputs_are_reported(self):
+        RecipeStep.objects.filter(pk=self.step.pk).update(current_density=None)
+        row = self.rows()[self.step.id]
+        self.assertIn('reason', row)
+        self.assertNotIn('dwell_time', row)
+
+    def test_apply_saves_changes_once(self):
+        before = line_version(self.project)
+        rows = apply_plating_dwell_times(self.project)
+        self.assertTrue(rows[0]['updated'])
+        self.assertEqual(RecipeStep.objects.get(pk=self.step.pk).dwell_time, self.expected(200))
+        after = line_version(self.project)
+        self.assertGreater(after, before)
+        # Nothing left to change: no write, same fingerprint
+        rows = apply_plating_dwell_times(self.project)
+        self.assertFalse(rows[0]['updated'])
+        self.assertEqual(line_version(self.project), after)
+
+
+class EventCapTests(TestCase):
+    def engine(self):
+        simulator = ProductionSimulator(make_line().project_id)
+        sequence, hoists = release_sequence(simulator, None)
+        return LineEngine(simulator, hoists, sequence)
+
+    def test_time_limited_run_reaches_its_horizon(self):
+        engine = self.engine()
+        self.assertTrue(engine.run_until(time_limit=200 * 3600))
+        self.assertEqual(engine.now, 200 * 3600)
+        self.assertFalse(engine.truncated)
+
+    def test_cap_is_reported(self):
+        engine = self.engine()
+        self.assertFalse(engine.run_until(time_limit=200 * 3600, max_events=50))
+        self.assertTrue(engine.truncated)
+        self.assertLess(engine.now, 200 * 3600)
+
+
+class TimelineTests(TestCase):
+    def test_long_window_is_simulated_to_the_end(self):
+        project = make_line(stations=10)
+        SimulationParameters.objects.update_or_create(project=project, defaults={'calculated_hoist_count': 2})
+        timeline = line_timeline(ProductionSimulator(project.project_id), width=800, hours=160)
+        self.assertFalse(timeline['truncated'])
+        self.assertEqual(timeline['simulated_to'], 160 * 3600)
+        for row in timeline['resources']:
+            if row['kind'] == 'hoist':
+                # The last pixels are busy, not idle padding after an early stop
+                self.assertNotEqual(row['values'][-1], 0)
+
+
+class RackPackingTests(TestCase):
+    def test_part_fits_a_grid(self):
+        # 5 x 5 parts of 200 x 100 mm in a 1000 x 500 mm envelope
+        self.assertEqual(pack_rectangles(1000, 500, 200, 100, 0), 25)
+        # With a 20 mm gap a 4 x 4 grid fits, and the 120 mm strip left over takes 2 more turned sideways
+        self.assertEqual(pack_rectangles(1000, 500, 200, 100, 20), 18)
+
+    def test_part_fits_only_rotated(self):
+        self.assertEqual(pack_rectangles(300, 1000, 900, 250, 0), 1)
+        self.assertEqual(pack_rectangles(300, 1000, 900, 350, 0), 0)
+
+    def test_no_geometry_means_no_limit(self):
+        project = make_line()
+        Station.objects.filter(project=project).update(tank_length=0, tank_width=0)
+        self.assertIsNone(rack_envelope(Station.objects.filter(project=project), 0.02))
+        recipe = Recipe.objects.get(project=project)
+        recipe.part_size = make_part_size(project)
+        recipe.save()
+        self.assertIsNone(recipe_rack_capacity(recipe))
+        self.assertEqual(capped_parts_per_rack(6, None), 6)
+
+    def test_rack_load_is_capped_everywhere(self):
+        project = make_line()
+        recipe = Recipe.objects.get(project=project)
+        # 0.5 x 0.5 m parts: two fit in a 1.2 x 0.8 m tank with 20 mm spacing
+        recipe.part_size = make_part_size(project, plated_area=0.5)
+        recipe.save()
+        SimulationParameters.objects.update_or_create(project=project, defaults={'parts_per_rack': 6})
+        step = RecipeStep.objects.get(recipe=recipe, step_order=1)
+        RecipeStep.objects.filter(pk=step.pk).update(current_density=2)
+        simulator = ProductionSimulator(project.project_id)
+        self.assertEqual(simulator.recipe_parts_per_rack(simulator.recipes[0]), 2)
+        # 2 A/dm² over 2 parts of 0.5 m², not 6
+        self.assertAlmostEqual(rack_currents(project)[step.station_id], 200.0)
+        RecipeStep.objects.filter(pk=step.pk).update(current_density=None, rectifier_current=200,
+                                                      element=Element.objects.get(symbol='Ni'), target_thickness=10)
+        project.refresh_from_db()
+        row = plating_dwell_times(project)[1][0]
+        self.assertEqual(row['parts_per_rack'], 2)
+        self.assertAlmostEqual(row['current_density'], 2.0)
+
+
+class ParallelTankTests(TestCase):
+    def test_bottleneck_gets_enough_tanks_for_the_target_cycle(self):
+        project = make_line()
+        RecipeStep.objects.filter(recipe__project=project, step_order=2).update(dwell_time=400)
+        simulator = ProductionSimulator(project.project_id)
+        util = simulator._calculate_station_utilization()
+        target = 150
+        suggestions = simulator._suggest_parallel_tanks(util, target)
+        self.assertEqual(len(suggestions), 1)
+        suggestion = suggestions[0]
+        bottleneck = util[suggestion['station_id']]
+        self.assertEqual(bottleneck['station_number'], 'S3')
+        tanks = suggestion['required_tanks']
+        # The fewest tanks whose per-tank time fits the target cycle
+        self.assertLessEqual(bottleneck['occupied_time'] / tanks, target)
+        self.assertGreater(bottleneck['occupied_time'] / (tanks - 1), target)
+        self.assertEqual(suggestion['additional_tanks'], tanks - 1)
+
+    def test_exact_multiple_of_the_target_needs_no_extra_tank(self):
+        # 1.1 / 0.1 is 11.000000000000002 in floating point
+        simulator = ProductionSimulator(make_line().project_id)
+        util = {1: {'station_id': 1, 'station_number': 'S1', 'process_name': 'Etch', 'parallel_tanks': 1,
+                    'occupied_time': 1.1},
+                2: {'station_id': 2, 'station_number': 'S2', 'process_name': 'Rinse', 'parallel_tanks': 2,
+                    'occupied_time': 0.2}}
+        suggestions = simulator._suggest_parallel_tanks(util, 0.1)
+        self.assertEqual([(s['station_id'], s['required_tanks'], s['additional_tanks']) for s in suggestions],
+                         [(1, 11, 10)])
+
+
+class SharedResourceTests(TestCase):
+    def rate(self, project, **parameters):
+        SimulationParameters.objects.update_or_create(project=project, defaults=parameters)
+        result, engine = time_based_simulation(ProductionSimulator(project.project_id))
+        return result
+
+    def test_lines_share_the_operator(self):
+        project = make_line(stations=8)
+        one = self.rate(project, process_lines=1)
+        two = self.rate(project, process_lines=2)
+        self.assertEqual(one['shared_resources'], [])
+        self.assertEqual([r['name'] for r in two['shared_resources']], ['load_unload'])
+        self.assertGreater(two['steady_state']['parts_per_hour'], one['steady_state']['parts_per_hour'])
+        self.assertLessEqual(two['steady_state']['parts_per_hour'], 2 * one['steady_state']['parts_per_hour'])
+
+    def test_throughput_saturates_at_the_operator_rate(self):
+        project = make_line(stations=8)
+        SimulationParameters.objects.update_or_create(project=project, defaults={
+            'part_load_time': 60, 'part_unload_time': 60, 'process_lines': 12})
+        simulator = ProductionSimulator(project.project_id)
+        # 400 s between bars per line; the operator needs 120 s per bar, so 30 bars/h at most
+        scaling = simulator._calculate_line_capacity(400, 1)['scaling']
+        rates = [row['parts_per_hour'] for row in scaling]
+        self.assertAlmostEqual(rates[0], 9.0)
+        self.assertEqual(rates, sorted(rates))
+        self.assertTrue(all(rate <= 30 for rate in rates))
+        self.assertGreater(rates[-1], 29)
+        # Past saturation an extra line adds next to nothing
+        self.assertLess(rates[-1] - rates[-2], 0.5)
+        self.assertLess(scaling[-1]['efficiency_pct'], scaling[0]['efficiency_pct'] / 4)
+
+    def test_shuttle_is_reported(self):
+        project = make_line(stations=8)
+        result = self.rate(project, process_lines=1, has_transfer_shuttle=True)
+        self.assertEqual([r['name'] for r in result['shared_resources']], ['transfer_shuttle'])
+
+
+class ResultCodecTests(TestCase):
+    stations = [{'station_id': 10 + n, 'station_number': f"S{n}", 'process_name': f"Process {n}",
+                 'occupied_time': 30 * n, 'utilization_pct': 1.5 * n} for n in range(50)]
+    recipes = [{'recipe_id': 3, 'recipe_name': "A", 'production_ratio': 2, 'cycle_time': 120.5,
+                'parts_per_hour': 29.88, 'parts_per_day': 239.04}]
+
+    def test_round_trip(self):
+        packed = result_codec.encode_station_utilization(self.stations)
+        self.assertTrue(result_codec.is_packed(packed))
+        self.assertEqual(result_codec.decode_station_utilization(packed), self.stations)
+        self.assertEqual(result_codec.station_ids(packed), [row['station_id'] for row in self.stations])
+        self.assertEqual(result_codec.column(packed, 'utilization_pct'),
+                         [row['utilization_pct'] for row in self.stations])
+        packed = result_codec.encode_recipe_results(self.recipes)
+        self.assertEqual(result_codec.decode_recipe_results(packed), self.recipes)
+
+    def test_unpack_reads_packed_and_legacy_rows_alike(self):
+        packed = result_codec.unpack(result_codec.encode_station_utilization(self.stations), 'station_id')
+        self.assertEqual(packed, result_codec.unpack(self.stations, 'station_id'))
+        ids, columns = packed
+        self.assertEqual(ids, [row['station_id'] for row in self.stations])
+        self.assertEqual(columns['process_name'], [row['process_name'] for row in self.stations])
+        self.assertEqual(result_codec.unpack(None, 'station_id'), ([], {}))
+
+    def test_comparison_inflates_each_payload_once(self):
+        project = make_line()
+        runs = [make_result(project, stations=self.stations, recipes=self.recipes).id for _ in range(3)]
+        with mock.patch.object(result_codec.zlib, 'decompress', wraps=result_codec.zlib.decompress) as inflate:
+            compare_simulation_results(project, runs)
+        self.assertEqual(inflate.call_count, 6)
+
+    def test_unpacked_rows_pass_through(self):
+        self.assertEqual(result_codec.decode_station_utilization(self.stations), self.stations)
+        self.assertIsNone(result_codec.encode_recipe_results(None))
+
+    def test_history_keeps_names_after_rename(self):
+        project = make_line()
+        station = Station.objects.filter(project=project).first()
+        rows = [{'station_id': station.id, 'station_number': station.station_number,
+                 'process_name': station.process_name, 'occupied_time': 10, 'utilization_pct': 5.0}]
+        result = SimulationResult.objects.create(
+            project=project, name="Run", parts_per_hour=1, parts_per_day=8, parts_per_week=40, parts_per_month=160,
+            parts_per_year=2000, cycle_time=60, total_process_time=50, total_transfer_time=10, total_drip_time=0,
+            hoist_count=1, hoist_utilization=50, station_utilization=result_codec.encode_station_utilization(rows))
+        station.process_name = "Renamed"
+        station.save()
+        self.assertEqual(SimulationResult.objects.get(pk=result.pk).get_station_utilization(), rows)
+
+
+class ComparisonTests(TestCase):
+    def setUp(self):
+        self.project = make_line()
+        self.stations = list(Station.objects.filter(project=self.project).order_by('position_index'))
+
+    def rows(self, utilization):
+        return [{'station_id': station.id, 'station_number': station.station_number,
+                 'process_name': station.process_name, 'occupied_time': 10, 'utilization_pct': pct}
+                for station, pct in utilization]
+
+    def test_runs_over_different_station_sets(self):
+        first, second, third = self.stations[1:4]
+        baseline = make_result(self.project, stations=self.rows([(first, 40.0), (second, 50.0)]), parts_per_hour=10)
+        later = make_result(self.project, stations=self.rows([(third, 70.0), (second, 55.5)]), parts_per_hour=12)
+        comparison = compare_simulation_results(self.project, [baseline.id, later.id])
+
+        self.assertEqual(comparison['metrics']['parts_per_hour'], {'values': [10, 12], 'deltas': [0, 2]})
+        stations = {row['station_id']: row for row in comparison['stations']}
+        self.assertEqual([row['station_id'] for row in comparison['stations']], [first.id, second.id, third.id])
+        self.assertEqual(stations[first.id]['utilization_pct'], [40.0, None])
+        self.assertEqual(stations[first.id]['deltas'], [0, None])
+        self.assertEqual(stations[second.id]['deltas'], [0, 5.5])
+        # No baseline value: nothing to take a delta from
+        self.assertEqual(stations[third.id]['utilization_pct'], [None, 70.0])
+        self.assertEqual(stations[third.id]['deltas'], [None, None])
+
+    def test_removed_stations_go_last(self):
+        first, second = self.stations[1:3]
+        baseline = make_result(self.project, stations=self.rows([(first, 40.0), (second, 50.0)]))
+        first.delete()
+        comparison = compare_simulation_results(self.project, [baseline.id])
+        self.assertEqual([row['station_number'] for row in comparison['stations']], ['S2', 'S1'])
+
+    def test_names_come_from_the_first_run_that_recorded_them(self):
+        station = self.stations[1]
+        baseline = make_result(self.project, stations=self.rows([(station, 40.0)]))
+        station.station_number, station.process_name = 'S1A', "Renamed"
+        station.save()
+        later = make_result(self.project, stations=self.rows([(station, 45.0)]))
+
+        row, = compare_simulation_results(self.project, [baseline.id, later.id])['stations']
+        self.assertEqual((row['station_number'], row['process_name']), ('S1', "Process 1"))
+        row, = compare_simulation_results(self.project, [later.id, baseline.id])['stations']
+        self.assertEqual((row['station_number'], row['process_name']), ('S1A', "Renamed"))
+
+    def test_missing_runs_are_named(self):
+        run = make_result(self.project)
+        with self.assertRaisesMessage(SimulationResult.DoesNotExist, str([run.id + 1])):
+            compare_simulation_results(self.project, [run.id, run.id + 1])
+
+
+class TrendTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.project = make_line()
+        # Monday and Wednesday of one week, in the project time zone
+        for day, pph in ((2, 10), (2, 20), (4, 30)):
+            self.add_run(datetime(2026, 3, day, 12, tzinfo=timezone.get_current_timezone()), pph)
+
+    def add_run(self, when, pph):
+        result = make_result(self.project, parts_per_hour=pph)
+        SimulationResult.objects.filter(pk=result.pk).update(simulation_date=when)
+        return result
+
+    def test_daily_buckets(self):
+        trends = simulation_trends(self.project, 'day')
+        self.assertEqual([(b['period'][:10], b['runs']) for b in trends['buckets']],
+                         [('2026-03-02', 2), ('2026-03-04', 1)])
+        self.assertEqual(trends['buckets'][0]['parts_per_hour'], {'min': 10, 'max': 20, 'mean': 15})
+
+    def test_weekly_buckets_start_on_monday(self):
+        bucket, = simulation_trends(self.project, 'week')['buckets']
+        self.assertEqual((bucket['period'][:10], bucket['runs']), ('2026-03-02', 3))
+        self.assertEqual(bucket['parts_per_hour'], {'min': 10, 'max': 30, 'mean': 20})
+
+    def test_new_run_is_not_served_from_the_cache(self):
+        simulation_trends(self.project, 'day')
+        with self.assertNumQueries(1):
+            simulation_trends(self.project, 'day')
+        self.add_run(datetime(2026, 3, 4, 15, tzinfo=timezone.get_current_timezone()), 50)
+        buckets = simulation_trends(self.project, 'day')['buckets']
+        self.assertEqual((buckets[1]['runs'], buckets[1]['parts_per_hour']['max']), (2, 50))
+
+    def test_unknown_bucket_is_rejected(self):
+        with self.assertRaises(ValueError):
+            simulation_trends(self.project, 'month')
+
+
+class ChunkedUploadTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        settings = override_settings(FILE_UPLOAD_TEMP_DIR=self.directory, MEDIA_ROOT=self.directory)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.project = make_line()
+        self.content = os.urandom(3000)
+        self.session = uploads.start_upload(self.project, 'sketch', 'sketch.png', len(self.content))
+
+    def append(self, offset, length=1000):
+        return uploads.append_chunk(self.session, io.BytesIO(self.content[offset:offset + length]), offset, length)
+
+    def test_chunks_complete_the_upload(self):
+        for offset in (0, 1000, 2000):
+            self.append(offset)
+        self.assertEqual(self.session.status, 'complete')
+        self.project.refresh_from_db()
+        with self.project.sketch.open('rb') as fh:
+            self.assertEqual(fh.read(), self.content)
+
+    def test_blob_released_before_the_link_is_stored_again(self):
+        other = make_line('T2')
+        uploads.save_uploaded_file(other, 'sketch', SimpleUploadedFile('sketch.png', self.content))
+        link_document = uploads.link_document
+
+        def released_first(project, field, document):
+            # Another project drops the last link between the lookup and this link
+            if not released_first.done:
+                released_first.done = True
+                StoredDocument.objects.filter(pk=document.pk).delete()
+                default_storage.delete(document.file.name)
+            return link_document(project, field, document)
+        released_first.done = False
+
+        with mock.patch.object(uploads, 'link_document', released_first):
+            for offset in (0, 1000, 2000):
+                self.append(offset)
+        self.assertEqual(self.session.status, 'complete')
+        self.assertFalse(os.path.exists(uploads.partial_path(self.session)))
+        self.project.refresh_from_db()
+        with self.project.sketch.open('rb') as fh:
+            self.assertEqual(fh.read(), self.content)
+
+    def test_retry_of_a_written_chunk_conflicts(self):
+        self.append(0)
+        stale = UploadSession.objects.get(pk=self.session.pk)
+        stale.received_bytes = 0
+        result = uploads.append_chunk(stale, io.BytesIO(self.content[:1000]), 0, 1000)
+        self.assertTrue(result['conflict'])
+        self.assertEqual(os.path.getsize(uploads.partial_path(self.session)), 1000)
+
+    def test_chunk_in_flight_elsewhere_conflicts(self):
+        UploadSession.objects.filter(pk=self.session.pk).update(writer=uuid.uuid4(), writer_heartbeat=timezone.now())
+        self.assertTrue(self.append(0)['conflict'])
+        self.assertEqual(UploadSession.objects.get(pk=self.session.pk).received_bytes, 0)
+
+    def test_lapsed_claim_is_taken_over(self):
+        UploadSession.objects.filter(pk=self.session.pk).update(
+            writer=uuid.uuid4(), writer_heartbeat=timezone.now() - uploads.WRITER_TIMEOUT * 2)
+        self.assertEqual(self.append(0).received_bytes, 1000)
+
+    def test_expire_removes_stale_sessions_and_partial_files(self):
+        self.append(0)
+        UploadSession.objects.filter(pk=self.session.pk).update(last_updated=timezone.now() - timedelta(days=2))
+        orphan = os.path.join(os.path.dirname(uploads.partial_path(self.session)), 'gone.part')
+        open(orphan, 'wb').close()
+        os.utime(orphan, (0, 0))
+        self.assertEqual(uploads.expire_uploads(), (1, 1))
+        self.assertEqual(UploadSession.objects.get(pk=self.session.pk).status, 'aborted')
+        self.assertFalse(os.path.exists(uploads.partial_path(self.session)))
+        self.assertFalse(os.path.exists(orphan))
+
+
+class DocumentStoreTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=self.directory)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        patcher = mock.patch.object(document_store, 'schedule_preview')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.project = make_line()
+        self.other = make_line('T2')
+        self.content = os.urandom(2000)
+        self.sha256 = hashlib.sha256(self.content).hexdigest()
+
+    def save(self, project, field='sketch', content=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return uploads.save_uploaded_file(project, field, SimpleUploadedFile('sketch.png', content or self.content))
+
+    def test_hash_only_link_needs_a_blob_the_project_links(self):
+        self.save(self.project)
+        session = uploads.start_upload(self.other, 'sketch', 'copy.png', len(self.content), self.sha256)
+        self.assertEqual(session.status, 'pending')
+        self.other.refresh_from_db()
+        self.assertFalse(self.other.sketch)
+
+        session = uploads.start_upload(self.project, 'spec_document', 'spec.png', len(self.content), self.sha256)
+        self.assertEqual(session.status, 'complete')
+        self.assertEqual(StoredDocument.objects.get(sha256=self.sha256).ref_count, 2)
+
+    def test_identical_uploads_share_one_counted_blob(self):
+        self.save(self.project)
+        self.save(self.other)
+        self.save(self.project)
+        document = StoredDocument.objects.get()
+        self.assertEqual(document.ref_count, 2)
+        self.assertEqual(len(os.listdir(os.path.dirname(document.file.path))), 1)
+
+    def test_relink_releases_the_previous_blob(self):
+        self.save(self.project)
+        path = StoredDocument.objects.get(sha256=self.sha256).file.path
+        self.save(self.project, content=os.urandom(1000))
+        self.assertFalse(StoredDocument.objects.filter(sha256=self.sha256).exists())
+        self.assertFalse(os.path.exists(path))
+
+    def test_project_delete_releases_its_links(self):
+        self.save(self.project)
+        self.save(self.other)
+        path = StoredDocument.objects.get().file.path
+        with self.captureOnCommitCallbacks(execute=True):
+            self.project.delete()
+        self.assertEqual(StoredDocument.objects.get().ref_count, 1)
+        self.assertTrue(os.path.exists(path))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.other.delete()
+        self.assertFalse(StoredDocument.objects.exists())
+        self.assertFalse(os.path.exists(path))
+
+    def test_dedupe_documents_moves_legacy_files_into_the_store(self):
+        legacy = []
+        for project in (self.project, self.other):
+            name = default_storage.save(f'sketches/{project.project_id}.png', ContentFile(self.content))
+            Projects.objects.filter(pk=project.pk).update(sketch=name)
+            legacy.append(name)
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('dedupe_documents', stdout=io.StringIO())
+        document = StoredDocument.objects.get()
+        self.assertEqual((document.sha256, document.ref_count), (self.sha256, 2))
+        self.assertEqual(set(Projects.objects.values_list('sketch', flat=True)), {document.file.name})
+        self.assertFalse(any(default_storage.exists(name) for name in legacy))
+
+
+class PreviewClaimTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=self.directory)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.document = StoredDocument.objects.create(sha256='ab' * 32, file='documents/blobs/ab/sketch.png', size=10,
+                                                      preview_status='pending', preview_started=timezone.now())
+
+    def test_only_one_worker_claims(self):
+        self.assertIsNotNone(previews._claim(self.document.pk))
+        self.assertIsNone(previews._claim(self.document.pk))
+
+    def test_lapsed_claim_is_taken_over(self):
+        self.assertIsNotNone(previews._claim(self.document.pk))
+        StoredDocument.objects.filter(pk=self.document.pk).update(
+            preview_started=timezone.now() - previews.PREVIEW_TIMEOUT - timedelta(seconds=1))
+        self.assertIsNotNone(previews._claim(self.document.pk))
+
+    def test_claimed_document_is_not_rendered_again(self):
+        previews._claim(self.document.pk)
+        with mock.patch.object(previews, 'render_preview') as render:
+            previews.generate_preview(self.document.pk)
+        render.assert_not_called()
+        self.assertEqual(StoredDocument.objects.get(pk=self.document.pk).preview_status, 'rendering')
+
+    def test_preview_replaces_the_old_file(self):
+        with mock.patch.object(previews, 'render_preview', return_value=b'first'):
+            previews.generate_preview(self.document.pk)
+        StoredDocument.objects.filter(pk=self.document.pk).update(preview_status='pending')
+        with mock.patch.object(previews, 'render_preview', return_value=b'second'):
+            previews.generate_preview(self.document.pk)
+        document = StoredDocument.objects.get(pk=self.document.pk)
+        self.assertEqual(document.preview_status, 'ready')
+        self.assertEqual(document.preview.name, previews.preview_name(document))
+        with document.preview.open('rb') as fh:
+            self.assertEqual(fh.read(), b'second')
+        self.assertEqual(os.listdir(os.path.dirname(document.preview.path)), [os.path.basename(document.preview.name)])
+
+
+class QuoteTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=self.directory)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.project = make_line()
+
+    def request(self):
+        quote, created = quotes.request_quote(self.project)
+        if created:
+            quotes.generate_quote(quote.pk)
+        return Quote.objects.get(pk=quote.pk)
+
+    def test_checking_a_quote_writes_nothing(self):
+        quote = self.request()
+        Budget.objects.all().delete()
+        with self.assertNumQueries(5):
+            _, current = quotes.current_quote(self.project)
+        self.assertFalse(current)
+        self.assertFalse(Budget.objects.exists())
+        self.assertEqual(quote.status, 'ready')
+
+    def test_quote_goes_stale_with_its_inputs(self):
+        self.request()
+        self.assertTrue(quotes.current_quote(self.project)[1])
+        Budget.objects.filter(project=self.project).update(contingency_pct=20)
+        self.assertFalse(quotes.current_quote(self.project)[1])
+        self.request()
+        station = Station.objects.filter(project=self.project).first()
+        station.parallel_tanks = 2
+        station.save()
+        self.project.refresh_from_db()
+        self.assertFalse(quotes.current_quote(self.project)[1])
+
+    def test_unchanged_project_reuses_the_quote(self):
+        first = self.request()
+        second, created = quotes.request_quote(self.project)
+        self.assertFalse(created)
+        self.assertEqual(second.pk, first.pk)
+
+    def test_claimed_quote_is_not_rendered_twice(self):
+        quote, _ = quotes.request_quote(self.project)
+        self.assertIsNotNone(quotes._claim(quote.pk))
+        quotes.generate_quote(quote.pk)
+        self.assertEqual(Quote.objects.get(pk=quote.pk).status, 'rendering')
+        Quote.objects.filter(pk=quote.pk).update(started_at=timezone.now() - quotes.QUOTE_TIMEOUT - timedelta(seconds=1))
+        quotes.generate_quote(quote.pk)
+        self.assertEqual(Quote.objects.get(pk=quote.pk).status, 'ready')
+
+
+class FastPathParityTests(TestCase):
+    """The values() fast paths must give what the ModelSerializers give."""
+
+    def setUp(self):
+        self.project = make_line()
+        Station.objects.filter(project=self.project, position_index=2).update(process_name="Nickel \u2028 strike é")
+        ProductionSimulator(self.project.project_id).run_simulation(name="Run")
+        self.recipe = Recipe.objects.get(project=self.project)
+
+    def assertSameJSON(self, fast, slow):
+        self.assertEqual(json.loads(FastJSONRenderer().render(fast)), json.loads(JSONRenderer().render(slow)))
+
+    def test_stations(self):
+        stations = Station.objects.filter(project=self.project)
+        self.assertSameJSON(serializers.STATION_VALUES.data(stations),
+                            serializers.StationSerializer(stations, many=True).data)
+
+    def test_recipe_steps(self):
+        steps = RecipeStep.objects.filter(recipe=self.recipe)
+        self.assertSameJSON(serializers.RECIPE_STEP_VALUES.data(steps),
+                            serializers.RecipeStepSerializer(steps.select_related('station'), many=True).data)
+
+    def test_simulation_history(self):
+        results = SimulationResult.objects.filter(project=self.project)
+        fast = serializers.SIMULATION_VALUES.data(results)
+        self.assertTrue(fast[0]['station_utilization'])
+        self.assertSameJSON(fast, serializers.SimulationResultSerializer(results, many=True).data)
+
+    def test_recipe_tree(self):
+        recipes = Recipe.objects.filter(project=self.project).annotate(step_count=Count('steps'))
+        self.assertSameJSON(serializers.recipe_tree(recipes.filter(pk=self.recipe.pk)),
+                            serializers.RecipeSerializer(recipes.get(pk=self.recipe.pk)).data)
+
+    def test_renderer_escapes_like_json_renderer(self):
+        data = {'name': "Nickel \u2028 strike \u2029 é", 'count': 3, 'ok': True, 'none': None}
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+
+class RecipeQueryCountTests(TestCase):
+    def setUp(self):
+        self.project = make_line(stations=10)
+        stations = list(Station.objects.filter(project=self.project).order_by('position_index'))[1:-1]
+        for n in range(5):
+            recipe = Recipe.objects.create(project=self.project, name=f"Recipe {n}")
+            for order, station in enumerate(stations):
+                RecipeStep.objects.create(recipe=recipe, station=station, step_order=order, dwell_time=30)
+        self.recipe = Recipe.objects.filter(project=self.project).last()
+
+    def test_recipe_list_reads_the_project_and_the_recipes(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('recipes', args=[self.project.project_id]))
+        self.assertEqual(len(response.json()), 6)
+        self.assertEqual({recipe['step_count'] for recipe in response.json()}, {8})
+
+    def test_recipe_detail_reads_the_project_recipe_and_steps(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('recipe_detail', args=[self.project.project_id, self.recipe.id]))
+        self.assertEqual(len(response.json()['steps']), 8)
@@ -0,0 +1,113 @@
+"""
+Hoist travel times between stations, derived from line geometry.
+
+Stations sit side by side along the line in ``position_index`` order. The
+centre-to-centre pitch between neighbours is half of each tank's width plus
+the ``distance_to_next`` gap between them. Tanks are taken to stand across
+the line: ``tank_length`` runs perpendicular to hoist travel, along the
+flight bar, and only ``tank_width`` adds to the distance along the line.
+A line whose tanks stand lengthwise should enter the length as the width.
+A hoist move between two stations is:
+
+    transfer_time                      fixed handling (latch, settle)
+  + 2 x vertical profile(lift_height)  lift out, lower in
+  + horizontal profile(|x_i - x_j|)
+
+Each profile is trapezoidal: accelerate at ``hoist_acceleration`` up to the
+axis speed, cruise, decelerate. It is triangular when the distance is too
+short to reach full speed. With no geometry entered (all widths, gaps and
+lift height zero), every move collapses to ``transfer_time``, matching the
+flat model used before.
+
+The all-pairs matrix is built once per line geometry and cached per project.
+Station edits drop the cached entry (see signals.py).
+"""
+import math
+
+from django.core.cache import cache
+
+TRAVEL_MATRIX_CACHE_TIMEOUT = 24 * 60 * 60
+
+
+def trapezoidal_move_time(distance, max_speed, acceleration):
+    """Seconds to travel ``distance`` metres from rest to rest."""
+    if distance <= 0 or max_speed <= 0:
+        return 0.0
+    if acceleration <= 0:
+        return distance / max_speed
+    # Distance spent accelerating to max_speed and braking back to zero
+    ramp_distance = max_speed * max_speed / acceleration
+    if distance >= ramp_distance:
+        return distance / max_speed + max_speed / acceleration
+    return 2 * math.sqrt(distance / acceleration)
+
+
+def station_positions(stations):
+    """Centre position in metres of each station, in the order given."""
+    positions = []
+    x = 0.0
+    previous = None
+    for station in stations:
+        if previous is not None:
+            x += (previous.tank_width or 0) / 2 + (previous.distance_to_next or 0) + (station.tank_width or 0) / 2
+        positions.append(x)
+        previous = station
+    return positions
+
+
+class TravelMatrix:
+    """All-pairs hoist move time in seconds, indexed by station id."""
+
+    def __init__(self, stations, params):
+        self.index = {station.id: i for i, station in enumerate(stations)}
+        self.positions = station_positions(stations)
+
+        transfer_time = params.transfer_time or 10
+        acceleration = params.hoist_acceleration or 0
+        vertical = 2 * trapezoidal_move_time(params.lift_height or 0, params.hoist_speed_vertical or 0, acceleration)
+        self.fixed_time = transfer_time + vertical
+
+        self.times = [
+            [self.fixed_time + trapezoidal_move_time(abs(xj - xi), params.hoist_speed_horizontal or 0, acceleration)
+             for xj in self.positions]
+            for xi in self.positions
+        ]
+
+    def move_time(self, from_station_id, to_station_id):
+        i = self.index.get(from_station_id)
+        j = self.index.get(to_station_id)
+        if i is None or j is None:
+            return self.fixed_time
+        return self.times[i][j]
+
+
+def _signature(stations, params):
+    return (
+        tuple((s.id, s.position_index, s.tank_width, s.distance_to_next) for s in stations),
+        params.transfer_time, params.lift_height, params.hoist_speed_horizontal,
+        params.hoist_speed_vertical, params.hoist_acceleration,
+    )
+
+
+def travel_cache_key(project_pk):
+    return f"travel_matrix:{project_pk}"
+
+
+def get_travel_matrix(project, stations, params):
+    """
+    Cached TravelMatrix for the project's current geometry. ``stations`` must
+    be in line order. A parameter change alters the signature, so it rebuilds
+    without explicit invalidation.
+    """
+    key = travel_cache_key(project.pk)
+    signature = _signature(stations, params)
+    cached = cache.get(key)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    matrix = TravelMatrix(stations, params)
+    cache.set(key, (signature, matrix), TRAVEL_MATRIX_CACHE_TIMEOUT)
+    return matrix
+
+
+def invalidate_travel_matrix(project_pk):
+    cache.delete(travel_cache_key(project_pk))
@@ -0,0 +1,267 @@
+"""
+Chunked, resumable uploads of project documents.
+
+The client opens an UploadSession with the file name and total size, then
+PUTs raw bytes starting at the session's ``received_bytes``. Each request
+body is read from the socket CHUNK_SIZE bytes at a time and appended to a
+partial file on local disk. A worker therefore holds at most one chunk per
+upload, whatever the file size. An interrupted client reads the session
+back and carries on from ``received_bytes``.
+
+A request claims the session before writing, with a conditional update
+that only succeeds at the expected offset and while no other request is
+writing. Concurrent retries of the same chunk therefore get a conflict
+instead of writing the bytes twice. The claim is refreshed as each block
+is written; one left behind by a request that died mid-body lapses after
+WRITER_TIMEOUT.
+
+Each chunk also feeds a SHA-256 kept per session in this process. If
+another worker took the earlier chunks, the hash is rebuilt from the
+partial file. When the last byte arrives the file goes to the
+content-addressed store (see document_store), which keeps one copy per
+unique content, and the project field is linked to it.
+
+Sessions left pending for UPLOAD_EXPIRY are aborted, and their partial
+files removed, by ``expire_uploads`` (the expire_uploads command).
+"""
+import os
+import re
+import tempfile
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+
+from .document_store import DOCUMENT_FIELDS, find_document, hash_file, link_document, store_document
+from .models import StoredDocument, UploadSession
+
+CHUNK_SIZE = 1024 * 1024
+# Size the client is asked to send per PUT; the server reads it CHUNK_SIZE at a time
+CLIENT_CHUNK_SIZE = 8 * CHUNK_SIZE
+
+UPLOAD_FIELDS = DOCUMENT_FIELDS
+# A chunk's claim lapses if its request writes nothing for this long
+WRITER_TIMEOUT = timedelta(minutes=2)
+UPLOAD_EXPIRY = timedelta(days=1)
+
+# session id -> (bytes hashed, running sha256) for uploads in progress here
+_digests = {}
+
+
+class _PartialFile(File):
+    """Lets FileSystemStorage move the finished file instead of copying it."""
+
+    def temporary_file_path(self):
+        return self.name
+
+
+def _partial_directory():
+    directory = os.path.join(
+        getattr(settings, 'FILE_UPLOAD_TEMP_DIR', None) or tempfile.gettempdir(),
+        'platerbuilder-uploads')
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def partial_path(session):
+    return os.path.join(_partial_directory(), f'{session.id}.part')
+
+
+def save_uploaded_file(project, field, uploaded_file):
+    """
+    Store a file from request.FILES and link it. Django has already
+    spooled large files to disk; they are hashed from there and moved,
+    or not stored at all if the content is known.
+    """
+    sha256 = hash_file(uploaded_file).hexdigest()
+    document = store_document(uploaded_file, sha256, uploaded_file.size, uploaded_file.name)
+    return link_document(project, field, document)
+
+
+def parse_content_range(header):
+    """Start offset from ``Content-Range: bytes <start>-<end>/<total>``, or None."""
+    match = re.fullmatch(r'bytes (\d+)-(\d+)/(\d+|\*)', (header or '').strip())
+    return int(match.group(1)) if match else None
+
+
+def start_upload(project, field, filename, total_size, sha256=None):
+    """
+    Open an upload session. With the ``sha256`` (and size) of a blob the
+    project already links the field is linked at once and no bytes are
+    sent. Any other hash is only checked against the uploaded bytes.
+    """
+    if field not in UPLOAD_FIELDS:
+        return {"error": f"field must be one of: {', '.join(UPLOAD_FIELDS)}"}
+    if not filename:
+        return {"error": "filename is required"}
+    try:
+        total_size = int(total_size)
+    except (TypeError, ValueError):
+        return {"error": "total_size must be an integer"}
+    if total_size <= 0:
+        return {"error": "total_size must be positive"}
+    sha256 = (sha256 or '').lower()
+    if sha256 and not re.fullmatch(r'[0-9a-f]{64}', sha256):
+        return {"error": "sha256 must be 64 hexadecimal characters"}
+
+    session = UploadSession(
+        project=project, field=field, filename=get_valid_filename(os.path.basename(filename)),
+        total_size=total_size, sha256=sha256)
+    document = find_document(sha256, total_size, project=project) if sha256 else None
+    if document is not None:
+        try:
+            session.file_path = link_document(project, field, document)
+        except StoredDocument.DoesNotExist:
+            # Released while we looked; fall back to a normal upload
+            pass
+        else:
+            session.received_bytes = total_size
+            session.status = 'complete'
+    session.save()
+    if session.status == 'pending':
+        open(partial_path(session), 'wb').close()
+    return session
+
+
+def _running_digest(session, path, offset):
+    hashed, digest = _digests.get(session.pk, (None, None))
+    if hashed != offset:
+        with open(path, 'rb') as fh:
+            digest = hash_file(fh, offset)
+    return digest
+
+
+def append_chunk(session, stream, offset, length):
+    """
+    Write ``length`` bytes from ``stream`` at ``offset``, which must equal
+    the bytes already received. Progress is recorded even if the client
+    drops mid-body. The upload is finished when the last byte arrives.
+    """
+    if session.status != 'pending':
+        return {"error": f"Upload is {session.status}"}
+    if offset != session.received_bytes:
+        return {"error": f"Chunk starts at byte {offset}, expected {session.received_bytes}",
+                "conflict": True}
+    if length <= 0 or offset + length > session.total_size:
+        return {"error": f"Chunk of {length} bytes at {offset} does not fit a {session.total_size} byte file"}
+
+    sessions = UploadSession.objects.filter(pk=session.pk)
+    writer = uuid.uuid4()
+    now = timezone.now()
+    claimed = sessions.filter(status='pending', received_bytes=offset).filter(
+        Q(writer__isnull=True) | Q(writer_heartbeat__lt=now - WRITER_TIMEOUT),
+    ).update(writer=writer, writer_heartbeat=now)
+    if not claimed:
+        session.refresh_from_db(fields=['status', 'received_bytes'])
+        return {"error": f"Another request is writing this upload; resume at byte {session.received_bytes}",
+                "conflict": True}
+
+    path = partial_path(session)
+    if not os.path.exists(path):
+        open(path, 'wb').close()
+    digest = _running_digest(session, path, offset)
+    written = 0
+    lost = False
+    try:
+        with open(path, 'r+b') as out:
+            # Drop anything past the recorded offset left by an earlier failed request
+            out.seek(offset)
+            out.truncate()
+            while written < length:
+                piece = stream.read(min(CHUNK_SIZE, length - written))
+                if not piece:
+                    break
+                # The claim lapsed while the client stalled: another request owns the file now
+                if not sessions.filter(writer=writer).update(writer_heartbeat=timezone.now()):
+                    lost = True
+                    break
+                out.write(piece)
+                digest.update(piece)
+                written += len(piece)
+    finally:
+        if not lost:
+            lost = not sessions.filter(writer=writer).update(
+                received_bytes=offset + written, writer=None, writer_heartbeat=None, last_updated=timezone.now())
+        if lost:
+            _digests.pop(session.pk, None)
+            session.refresh_from_db(fields=['status', 'received_bytes'])
+        else:
+            _digests[session.pk] = (offset + written, digest)
+            session.received_bytes = offset + written
+
+    if lost:
+        return {"error": f"Another request took over this upload; resume at byte {session.received_bytes}",
+                "conflict": True}
+    if written < length:
+        return {"error": f"Expected {length} bytes, received {written}", "conflict": True}
+    if session.received_bytes == session.total_size:
+        return finish_upload(session)
+    return session
+
+
+def finish_upload(session):
+    path = partial_path(session)
+    sha256 = _running_digest(session, path, session.total_size).hexdigest()
+    _digests.pop(session.pk, None)
+    if session.sha256 and session.sha256 != sha256:
+        abort_upload(session)
+        return {"error": f"Upload hash {sha256} does not match the declared {session.sha256}"}
+
+    while True:
+        with open(path, 'rb') as fh:
+            document = store_document(_PartialFile(fh, name=path), sha256, session.total_size, session.filename)
+        try:
+            session.file_path = link_document(session.project, session.field, document)
+            break
+        except StoredDocument.DoesNotExist:
+            # The existing blob was released before the link; store the bytes afresh.
+            # A partial file already moved into a new blob cannot be stored again.
+            if not os.path.exists(path):
+                raise
+    if os.path.exists(path):
+        # Still here if the content was already stored
+        os.remove(path)
+    session.sha256 = sha256
+    session.status = 'complete'
+    session.save(update_fields=['sha256', 'file_path', 'status', 'last_updated'])
+    return session
+
+
+def abort_upload(session):
+    _digests.pop(session.pk, None)
+    path = partial_path(session)
+    if os.path.exists(path):
+        os.remove(path)
+    if session.status == 'pending':
+        session.status = 'aborted'
+        session.save(update_fields=['status', 'last_updated'])
+    return session
+
+
+def expire_uploads(max_age=UPLOAD_EXPIRY):
+    """
+    Abort sessions pending without progress for ``max_age`` and remove
+    partial files no pending session owns. Returns (sessions, files) removed.
+    """
+    cutoff = timezone.now() - max_age
+    expired = list(UploadSession.objects.filter(status='pending', last_updated__lt=cutoff)
+                   .filter(Q(writer__isnull=True) | Q(writer_heartbeat__lt=cutoff)))
+    for session in expired:
+        abort_upload(session)
+
+    pending = {f'{session_id}.part' for session_id in
+               UploadSession.objects.filter(status='pending').values_list('id', flat=True)}
+    orphans = 0
+    with os.scandir(_partial_directory()) as entries:
+        for entry in entries:
+            try:
+                if entry.name not in pending and entry.stat().st_mtime < cutoff.timestamp():
+                    os.remove(entry.path)
+                    orphans += 1
+            except OSError:
+                pass
+    return len(expired), orphans
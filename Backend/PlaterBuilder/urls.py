@@ -38,6 +38,10 @@ urlpatterns = [
     # Upload and document API endpoints
     path("api/projects/<str:project_id>/upload-spec/", views.upload_spec, name="upload_spec"),
     path("api/projects/<str:project_id>/upload-sketch/", views.upload_sketch, name="upload_sketch"),
+    path("api/projects/<str:project_id>/uploads/", views.upload_sessions, name="upload_sessions"),
+    path("api/projects/<str:project_id>/uploads/<uuid:upload_id>/", views.upload_session, name="upload_session"),
+    path("api/projects/<str:project_id>/previews/", views.document_previews, name="document_previews"),
+    path("api/documents/<str:sha256>/preview/", views.document_preview, name="document_preview"),
     
     # Utility API endpoints
     path("api/equipment-types/", views.equipment_type_choices, name="equipment_type_choices"),
@@ -51,13 +55,27 @@ urlpatterns = [
 
     # Simulation-related API endpoints
     path("api/projects/<str:project_id>/production-goal/", views.production_goal, name="production_goal"),
+    path("api/projects/<str:project_id>/production-calendar/", views.production_calendar, name="production_calendar"),
     path("api/projects/<str:project_id>/simulation/parameters/", views.simulation_parameters, name="simulation_parameters"),
     path("api/projects/<str:project_id>/simulation/run/", views.run_simulation, name="run_simulation"),
     path("api/projects/<str:project_id>/simulation/quick/", views.quick_simulation, name="quick_simulation"),
+    path("api/projects/<str:project_id>/simulation/sequence/", views.recipe_sequence, name="recipe_sequence"),
+    path("api/projects/<str:project_id>/simulation/goal-seek/", views.goal_seek, name="goal_seek"),
+    path("api/projects/<str:project_id>/simulation/sensitivity/", views.sensitivity_analysis, name="sensitivity_analysis"),
+    path("api/projects/<str:project_id>/simulation/time-based/", views.time_based_simulation, name="time_based_simulation"),
+    path("api/projects/<str:project_id>/simulation/timeline/", views.simulation_timeline, name="simulation_timeline"),
+    path("api/projects/<str:project_id>/simulation/compare/", views.compare_simulations, name="compare_simulations"),
+    path("api/projects/<str:project_id>/simulation/trends/", views.simulation_trends, name="simulation_trends"),
 
     # Station endpoints
     path("api/projects/<str:project_id>/stations/", views.stations, name="stations"),
 
+    # Part geometry / plating endpoints
+    path("api/projects/<str:project_id>/part-sizes/", views.part_sizes, name="part_sizes"),
+    path("api/projects/<str:project_id>/plating/dwell-times/", views.plating_dwell_times, name="plating_dwell_times"),
+    path("api/projects/<str:project_id>/rack-packing/", views.rack_packing, name="rack_packing"),
+    path("api/elements/", views.elements, name="elements"),
+
     # Recipe endpoints
     path("api/projects/<str:project_id>/recipes/", views.recipes, name="recipes"),
     path("api/projects/<str:project_id>/recipes/<int:recipe_id>/", views.recipe_detail, name="recipe_detail"),
@@ -1,19 +1,21 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import HttpResponse
-from rest_framework.decorators import api_view
+from django.http import FileResponse, HttpResponse
+from rest_framework.decorators import api_view, renderer_classes
 from rest_framework.response import Response
 from rest_framework import status, viewsets
 from rest_framework.parsers import MultiPartParser, FormParser
 from .models import (Projects, Customers, EquipmentTypeChoices,
-                     ProductionGoal, SimulationParameters, SimulationResult,
-                     Station, Recipe, RecipeStep)
+                     ProductionGoal, ProductionCalendar, SimulationParameters, SimulationResult,
+                     Station, Recipe, RecipeStep, Element, Part_Size, StoredDocument, UploadSession)
 from .serializers import (ProjectsSerializer, CustomersSerializer,
-                          ProductionGoalSerializer, SimulationParametersSerializer, SimulationResultSerializer,
-                          StationSerializer, RecipeSerializer, RecipeListSerializer, RecipeStepSerializer)
+                          ProductionGoalSerializer, ProductionCalendarSerializer, SimulationParametersSerializer,
+                          StationSerializer, RecipeSerializer, RecipeListSerializer, RecipeStepSerializer,
+                          ElementSerializer, PartSizeSerializer, UploadSessionSerializer)
 import os
 from django.conf import settings
 from django.core.files.storage import default_storage
-from django.core.files.base import ContentFile
+from django.db.models import Count, Prefetch
+from .renderers import LIST_RENDERERS
 
 # API endpoints for Projects
 @api_view(['GET'])
@@ -163,18 +165,11 @@ def upload_spec(request, project_id):
     if 'spec_document' not in request.FILES:
         return Response({'error': 'No file provided'}, status=status.HTTP_400_BAD_REQUEST)
     
-    # Handle file upload
-    uploaded_file = request.FILES['spec_document']
-    file_path = f'documents/specs/{project_id}/{uploaded_file.name}'
-    
-    # Save the file
-    path = default_storage.save(file_path, ContentFile(uploaded_file.read()))
-    
-    # Update project with file path
-    # Note: You'll need to add this field to your Projects model
-    # project.spec_document = path
-    # project.save()
-    
+    from .uploads import save_uploaded_file
+
+    # Large files are spooled to disk by Django's upload handlers; known content is not stored again
+    path = save_uploaded_file(project, 'spec_document', request.FILES['spec_document'])
+
     return Response({'file_path': path}, status=status.HTTP_201_CREATED)
 
 @api_view(['POST'])
@@ -190,115 +185,259 @@ def upload_sketch(request, project_id):
     if 'sketch' not in request.FILES:
         return Response({'error': 'No file provided'}, status=status.HTTP_400_BAD_REQUEST)
     
-    # Handle file upload
-    uploaded_file = request.FILES['sketch']
-    file_path = f'documents/sketches/{project_id}/{uploaded_file.name}'
-    
-    # Save the file
-    path = default_storage.save(file_path, ContentFile(uploaded_file.read()))
-    
-    # Update project with file path
-    # Note: You'll need to add this field to your Projects model
-    # project.sketch = path
-    # project.save()
-    
+    from .uploads import save_uploaded_file
+
+    path = save_uploaded_file(project, 'sketch', request.FILES['sketch'])
+
     return Response({'file_path': path}, status=status.HTTP_201_CREATED)
 
 
+@api_view(['GET', 'POST'])
+def upload_sessions(request, project_id):
+    """
+    Start a chunked, resumable upload (POST) or list the pending ones (GET).
+    The sha256 of a document the project already links completes the
+    upload immediately without any bytes sent.
+    """
+    try:
+        project = Projects.objects.get(project_id=project_id)
+    except Projects.DoesNotExist:
+        return Response(status=status.HTTP_404_NOT_FOUND)
+
+    if request.method == 'GET':
+        sessions = project.upload_sessions.filter(status='pending')
+        return Response(UploadSessionSerializer(sessions, many=True).data)
+
+    from .uploads import CLIENT_CHUNK_SIZE, start_upload
+
+    session = start_upload(project, request.data.get('field'), request.data.get('filename'),
+                           request.data.get('total_size'), request.data.get('sha256'))
+    if isinstance(session, dict):
+        return Response(session, status=status.HTTP_400_BAD_REQUEST)
+    data = UploadSessionSerializer(session).data
+    data['chunk_size'] = CLIENT_CHUNK_SIZE
+    return Response(data, status=status.HTTP_201_CREATED)
+
+@api_view(['GET', 'PUT', 'DELETE'])
+def upload_session(request, project_id, upload_id):
+    """
+    Report progress (GET), append the raw request body at the next offset (PUT)
+    or abort (DELETE) a chunked upload. The upload completes with its last byte.
+    """
+    try:
+        session = UploadSession.objects.select_related('project').get(
+            id=upload_id, project__project_id=project_id)
+    except UploadSession.DoesNotExist:
+        return Response(status=status.HTTP_404_NOT_FOUND)
+
+    from .uploads import abort_upload, append_chunk, parse_content_range
+
+    if request.method == 'DELETE':
+        abort_upload(session)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    if request.method == 'PUT':
+        header = request.META.get('HTTP_CONTENT_RANGE')
+        offset = parse_content_range(header) if header else session.received_bytes
+        if offset is None:
+            return Response({'error': 'Content-Range must look like "bytes start-end/total"'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            length = 0
+        # Read the body directly; request.data would buffer it through a parser
+        result = append_chunk(session, request.stream, offset, length)
+        if isinstance(result, dict):
+            code = status.HTTP_409_CONFLICT if result.pop('conflict', False) else status.HTTP_400_BAD_REQUEST
+            result['received_bytes'] = session.received_bytes
+            return Response(result, status=code)
+
+    return Response(UploadSessionSerializer(session).data)
+
+
+@api_view(['GET'])
+def document_previews(request, project_id):
+    """
+    Preview status and URL of the project's spec document and sketch.
+    Missing previews are queued for the background workers.
+    """
+    try:
+        project = Projects.objects.get(project_id=project_id)
+    except Projects.DoesNotExist:
+        return Response(status=status.HTTP_404_NOT_FOUND)
+
+    from .previews import preview_state
+
+    names = {field: getattr(project, field).name for field in ('spec_document', 'sketch')}
+    documents = {document.file.name: document
+                 for document in StoredDocument.objects.filter(file__in=[n for n in names.values() if n])}
+    return Response({
+        field: preview_state(documents[name]) if name in documents else None
+        for field, name in names.items()
+    })
+
+@api_view(['GET'])
+def document_preview(request, sha256):
+    """
+    Serve a document's preview image. The URL is content-addressed, so
+    browsers may cache it indefinitely.
+    """
+    try:
+        document = StoredDocument.objects.get(sha256=sha256)
+    except StoredDocument.DoesNotExist:
+        return Response(status=status.HTTP_404_NOT_FOUND)
+
+    from .previews import PREVIEW_CACHE_SECONDS, preview_state
+
+    state = preview_state(document)
+    if state['status'] != 'ready':
+        code = status.HTTP_202_ACCEPTED if state['status'] == 'pending' else status.HTTP_404_NOT_FOUND
+        return Response(state, status=code)
+
+    etag = f'"{sha256}"'
+    if request.META.get('HTTP_IF_NONE_MATCH') == etag:
+        response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = FileResponse(default_storage.open(document.preview.name, 'rb'), content_type='image/png')
+    response['ETag'] = etag
+    response['Cache-Control'] = f'public, max-age={PREVIEW_CACHE_SECONDS}, immutable'
+    return response
+
+
 @api_view(['GET', 'POST', 'PUT'])
 def process_matrix(request, project_id):
     """
-    Handle process matrix operations for a project
+    Handle process matrix operations for a project.
+    GET returns the stored cells in coordinate form, optionally sliced with
+    ?station=ID,ID&recipe=ID&parameter=name,name. POST derives the cells
+    from the recipe steps ({"overwrite": true} also replaces manual cells).
+    PUT bulk-writes cells: {"entries": [{"station", "recipe", "parameter", "value", ...}]}.
     """
     try:
         project = Projects.objects.get(project_id=project_id)
     except Projects.DoesNotExist:
         return Response(status=status.HTTP_404_NOT_FOUND)
-    
+
+    from .process_matrix import derive_from_recipe_steps, matrix_slice, parse_id_list, upsert_entries
+
     if request.method == 'GET':
-        # Return process matrix data
-        # You'll need to implement this based on your process matrix model
-        return Response({'message': 'Process matrix data retrieval to be implemented'})
-    
+        try:
+            station_ids = parse_id_list(request.query_params.get('station'))
+            recipe_ids = parse_id_list(request.query_params.get('recipe'))
+        except ValueError:
+            return Response({'error': 'station and recipe must be comma-separated IDs'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        parameter = request.query_params.get('parameter')
+        parameters = [name.strip() for name in parameter.split(',') if name.strip()] if parameter else None
+        return Response(matrix_slice(project, station_ids, recipe_ids, parameters))
+
     elif request.method == 'POST':
-        # Create new process matrix
-        # You'll need to implement this based on your process matrix model
-        return Response({'message': 'Process matrix creation to be implemented'})
-    
+        overwrite = str(request.data.get('overwrite', '')).lower() in ('1', 'true', 'yes')
+        summary = derive_from_recipe_steps(project, overwrite=overwrite)
+        return Response({**summary, 'matrix': matrix_slice(project)}, status=status.HTTP_201_CREATED)
+
     elif request.method == 'PUT':
-        # Update process matrix
-        # You'll need to implement this based on your process matrix model
-        return Response({'message': 'Process matrix update to be implemented'})
+        result = upsert_entries(project, request.data.get('entries'))
+        if 'error' in result:
+            return Response(result, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result)
 
 @api_view(['GET', 'POST', 'PUT'])
 def controls_matrix(request, project_id):
     """
-    Handle controls matrix operations for a project
+    Handle controls matrix operations for a project.
+    GET returns the I/O points, regenerating them if the line changed since
+    the last read. POST forces a regeneration. PUT bulk-writes manual points:
+    {"points": [{"tag", "device", "io_type", "quantity", "station_number", ...}]}.
     """
     try:
         project = Projects.objects.get(project_id=project_id)
     except Projects.DoesNotExist:
         return Response(status=status.HTTP_404_NOT_FOUND)
-    
+
+    from .controls_matrix import controls_matrix as build_controls_matrix, upsert_manual_points
+
     if request.method == 'GET':
-        # Return controls matrix data
-        # You'll need to implement this based on your controls matrix model
-        return Response({'message': 'Controls matrix data retrieval to be implemented'})
-    
+        return Response(build_controls_matrix(project))
+
     elif request.method == 'POST':
-        # Create new controls matrix
-        # You'll need to implement this based on your controls matrix model
-        return Response({'message': 'Controls matrix creation to be implemented'})
-    
+        return Response(build_controls_matrix(project, regenerate=True), status=status.HTTP_201_CREATED)
+
     elif request.method == 'PUT':
-        # Update controls matrix
-        # You'll need to implement this based on your controls matrix model
-        return Response({'message': 'Controls matrix update to be implemented'})
+        result = upsert_manual_points(project, request.data.get('points'))
+        if 'error' in result:
+            return Response(result, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result)
 
 @api_view(['GET', 'POST', 'PUT'])
 def budget(request, project_id):
     """
-    Handle budget operations for a project
+    Equipment budget rolled up from the line.
+    GET returns the cached totals and lines (costing the line on first use),
+    POST recosts every line, PUT updates unit costs and recosts.
     """
     try:
         project = Projects.objects.get(project_id=project_id)
     except Projects.DoesNotExist:
-        return Response(status=status.HTTP_404_NOT_FOUND)
-    
+        return Response({'error': 'Project not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    from .budget import budget_summary, get_budget, rebuild_budget, refresh_controls
+    from .serializers import BudgetSerializer
+
+    budget = get_budget(project)
     if request.method == 'GET':
-        # Return budget data
-        # You'll need to implement this based on your budget model
-        return Response({'message': 'Budget data retrieval to be implemented'})
-    
+        refresh_controls(budget)
+        budget.refresh_from_db()
+        response_status = status.HTTP_200_OK
     elif request.method == 'POST':
-        # Create new budget
-        # You'll need to implement this based on your budget model
-        return Response({'message': 'Budget creation to be implemented'})
-    
-    elif request.method == 'PUT':
-        # Update budget
-        # You'll need to implement this based on your budget model
-        return Response({'message': 'Budget update to be implemented'})
+        rebuild_budget(budget)
+        response_status = status.HTTP_201_CREATED
+    else:
+        serializer = BudgetSerializer(budget, data=request.data, partial=True)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        rebuild_budget(serializer.save())
+        response_status = status.HTTP_200_OK
+    return Response({**BudgetSerializer(budget).data, **budget_summary(budget)}, status=response_status)
 
 @api_view(['GET', 'POST'])
 def quote(request, project_id):
     """
-    Handle quote operations for a project
+    Quote document for a project.
+    GET returns the latest quote and whether it still matches the project
+    (?download=<id> streams a ready quote's HTML). POST returns the quote
+    for the project as it stands, queueing generation when the inputs
+    changed: 200 if it already exists, 202 if queued. {"force": true}
+    regenerates regardless.
     """
     try:
         project = Projects.objects.get(project_id=project_id)
     except Projects.DoesNotExist:
-        return Response(status=status.HTTP_404_NOT_FOUND)
-    
+        return Response({'error': 'Project not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    from .models import Quote
+    from .quotes import current_quote, request_quote
+    from .serializers import QuoteSerializer
+
     if request.method == 'GET':
-        # Return quote data
-        # You'll need to implement this based on your quote model
-        return Response({'message': 'Quote data retrieval to be implemented'})
-    
-    elif request.method == 'POST':
-        # Generate new quote
-        # You'll need to implement this based on your quote model
-        return Response({'message': 'Quote generation to be implemented'})
+        download = request.query_params.get('download')
+        if download:
+            try:
+                document = Quote.objects.get(project=project, pk=int(download), status='ready')
+            except (ValueError, Quote.DoesNotExist):
+                return Response({'error': 'Quote not found'}, status=status.HTTP_404_NOT_FOUND)
+            return FileResponse(default_storage.open(document.file.name, 'rb'), content_type='text/html',
+                                as_attachment=True, filename=f"quote-{project.project_id}-{document.id}.html")
+        latest, is_current = current_quote(project)
+        if latest is None:
+            return Response({'quote': None, 'current': False})
+        return Response({'quote': QuoteSerializer(latest).data, 'current': is_current})
+
+    force = str(request.data.get('force', '')).lower() in ('1', 'true', 'yes')
+    document, _ = request_quote(project, force=force)
+    data = {'quote': QuoteSerializer(document).data, 'current': True}
+    return Response(data, status=status.HTTP_200_OK if document.status == 'ready' else status.HTTP_202_ACCEPTED)
 
 # Basic view for the home page
 def index(request):
@@ -374,50 +513,15 @@ def production_goal(request, project_id):
             # Update other targets based on primary target
             primary = request.data.get('primary_target', goal.primary_target)
             
-            # If we have simulation parameters, use them to calculate other targets
-            try:
-                params = SimulationParameters.objects.get(project=project)
-                hours_per_day = params.working_hours_per_day
-                days_per_week = params.working_days_per_week
-            except SimulationParameters.DoesNotExist:
-                hours_per_day = 8
-                days_per_week = 5
-            
-            # Update the targets based on the primary target
-            if primary == 'hour' and request.data.get('target_parts_per_hour'):
-                pph = float(request.data.get('target_parts_per_hour'))
-                goal.target_parts_per_day = pph * hours_per_day
-                goal.target_parts_per_week = goal.target_parts_per_day * days_per_week
-                goal.target_parts_per_month = goal.target_parts_per_week * 4
-                goal.target_parts_per_year = goal.target_parts_per_month * 12
-                goal.save()
-            elif primary == 'day' and request.data.get('target_parts_per_day'):
-                ppd = float(request.data.get('target_parts_per_day'))
-                goal.target_parts_per_hour = ppd / hours_per_day
-                goal.target_parts_per_week = ppd * days_per_week
-                goal.target_parts_per_month = goal.target_parts_per_week * 4
-                goal.target_parts_per_year = goal.target_parts_per_month * 12
-                goal.save()
-            elif primary == 'week' and request.data.get('target_parts_per_week'):
-                ppw = float(request.data.get('target_parts_per_week'))
-                goal.target_parts_per_day = ppw / days_per_week
-                goal.target_parts_per_hour = goal.target_parts_per_day / hours_per_day
-                goal.target_parts_per_month = ppw * 4
-                goal.target_parts_per_year = goal.target_parts_per_month * 12
-                goal.save()
-            elif primary == 'month' and request.data.get('target_parts_per_month'):
-                ppm = float(request.data.get('target_parts_per_month'))
-                goal.target_parts_per_week = ppm / 4
-                goal.target_parts_per_day = goal.target_parts_per_week / days_per_week
-                goal.target_parts_per_hour = goal.target_parts_per_day / hours_per_day
-                goal.target_parts_per_year = ppm * 12
-                goal.save()
-            elif primary == 'year' and request.data.get('target_parts_per_year'):
-                ppy = float(request.data.get('target_parts_per_year'))
-                goal.target_parts_per_month = ppy / 12
-                goal.target_parts_per_week = goal.target_parts_per_month / 4
-                goal.target_parts_per_day = goal.target_parts_per_week / days_per_week
-                goal.target_parts_per_hour = goal.target_parts_per_day / hours_per_day
+            # Derive the other targets from the project's working calendar
+            from .production_calendar import get_calendar_capacity
+
+            calendar = get_calendar_capacity(project)
+            target = request.data.get(f'target_parts_per_{primary}')
+            if primary in calendar.hours and target:
+                pph = calendar.to_parts_per_hour(primary, float(target))
+                for period, parts in calendar.project(pph).items():
+                    setattr(goal, f'target_{period}', parts)
                 goal.save()
             
             # Return updated data
@@ -426,6 +530,30 @@ def production_goal(request, project_id):
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+@api_view(['GET', 'POST', 'PUT'])
+def production_calendar(request, project_id):
+    """
+    Get or update the working calendar (shifts, breaks, downtime, holidays)
+    used for shift / day / week / month / year projections
+    """
+    try:
+        project = Projects.objects.get(project_id=project_id)
+    except Projects.DoesNotExist:
+        return Response(status=status.HTTP_404_NOT_FOUND)
+
+    from .production_calendar import get_calendar_capacity
+
+    calendar, created = ProductionCalendar.objects.get_or_create(project=project)
+    if request.method == 'GET':
+        serializer = ProductionCalendarSerializer(calendar)
+    else:
+        serializer = ProductionCalendarSerializer(calendar, data=request.data, partial=True)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        serializer.save(project=project)
+
+    return Response({**serializer.data, 'capacity': get_calendar_capacity(project).as_dict()})
+
 @api_view(['GET', 'POST', 'PUT'])
 def simulation_parameters(request, project_id):
     """
@@ -436,11 +564,15 @@ def simulation_parameters(request, project_id):
     except Projects.DoesNotExist:
         return Response(status=status.HTTP_404_NOT_FOUND)
     
+    from .coalesce import project_fingerprint, single_flight
+
     if request.method == 'GET':
-        # Get or create simulation parameters
-        parameters, created = SimulationParameters.objects.get_or_create(project=project)
-        serializer = SimulationParametersSerializer(parameters)
-        return Response(serializer.data)
+        # Get or create simulation parameters; concurrent first reads share one create
+        def read_parameters():
+            parameters, created = SimulationParameters.objects.get_or_create(project=project)
+            return SimulationParametersSerializer(parameters).data
+
+        return Response(single_flight(f'parameters:{project_fingerprint(project)}', read_parameters))
     
     elif request.method in ['POST', 'PUT']:
         # Get existing or create new
@@ -456,8 +588,9 @@ def simulation_parameters(request, project_id):
             
             # If parameters are updated, recalculate hoist count
             from .services import ProductionSimulator
-            simulator = ProductionSimulator(project_id)
-            optimal_hoists = simulator.calculate_optimal_hoists()
+            project.refresh_from_db(fields=['line_version'])
+            optimal_hoists = single_flight(f'optimal-hoists:{project_fingerprint(project)}',
+                                           lambda: ProductionSimulator(project_id).calculate_optimal_hoists())
             
             parameters = SimulationParameters.objects.get(project=project)
             parameters.calculated_hoist_count = optimal_hoists
@@ -470,6 +603,7 @@ def simulation_parameters(request, project_id):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 @api_view(['GET', 'POST'])
+@renderer_classes(LIST_RENDERERS)
 def run_simulation(request, project_id):
     """
     Run production simulation and return results
@@ -481,9 +615,13 @@ def run_simulation(request, project_id):
     
     # Get simulation history for GET requests
     if request.method == 'GET':
+        # Read straight from the rows, as SimulationResultSerializer would give them
+        from .serializers import SIMULATION_SUMMARY_VALUES, SIMULATION_VALUES
         simulations = SimulationResult.objects.filter(project=project).order_by('-simulation_date')
-        serializer = SimulationResultSerializer(simulations, many=True)
-        return Response(serializer.data)
+        if request.query_params.get('summary'):
+            # Without the per-station / per-recipe breakdowns
+            return Response(SIMULATION_SUMMARY_VALUES.data(simulations))
+        return Response(SIMULATION_VALUES.data(simulations))
     
     # Run new simulation for POST requests
     elif request.method == 'POST':
@@ -526,10 +664,9 @@ def quick_simulation(request, project_id):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
     try:
+        from .coalesce import project_fingerprint, single_flight
         from .services import ProductionSimulator
         
-        simulator = ProductionSimulator(project_id)
-        
         # Get manual hoist count if provided in query params
         hoist_count = request.query_params.get('hoists', None)
         if hoist_count:
@@ -538,7 +675,10 @@ def quick_simulation(request, project_id):
             except ValueError:
                 hoist_count = None
         
-        results = simulator.calculate_throughput(hoist_count=hoist_count)
+        # Identical concurrent requests for the same line state share one run
+        results = single_flight(
+            f'quick:{project_fingerprint(project)}:{hoist_count}',
+            lambda: ProductionSimulator(project_id).calculate_throughput(hoist_count=hoist_count))
         
         if "error" in results:
             print(f"Quick simulation error for project {project_id}: {results.get('error')}", file=__import__('sys').stderr)
@@ -555,9 +695,229 @@ def quick_simulation(request, project_id):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['GET'])
+def recipe_sequence(request, project_id):
+    """
+    Best repeating flight-bar order for the recipe mix: ?budget_ms=1000&hoists=N
+    """
+    try:
+        project = Projects.objects.get(project_id=project_id)
+    except Projects.DoesNotExist:
+        return Response({'error': 'Project not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    try:
+        budget_ms = min(int(request.query_params.get('budget_ms', 1000)), 10000)
+        hoist_count = request.query_params.get('hoists')
+        hoist_count = int(hoist_count) if hoist_count else None
+    except ValueError:
+        return Response({'error': 'budget_ms and hoists must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+
+    from .services import ProductionSimulator
+    from .sequencing import SequenceOptimizer
+
+    simulator = ProductionSimulator(project_id)
+    result = SequenceOptimizer(simulator, hoist_count=hoist_count).run(time_budget=budget_ms / 1000)
+    if "error" in result:
+        return Response(result, status=status.HTTP_400_BAD_REQUEST)
+    return Response(result)
+
+
+@api_view(['GET', 'POST'])
+def goal_seek(request, project_id):
+    """
+    Cheapest hoists / parallel tanks / parts per rack meeting the production goal.
+    GET previews the search; POST also applies the best configuration.
+    Options: max_parts_per_rack, hoist_cost, tank_cost (default: from the budget)
+    """
+    try:
+        project = Projects.objects.get(project_id=project_id)
+    except Projects.DoesNotExist:
+        return Response({'error': 'Project not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    options = request.query_params if request.method == 'GET' else request.data
+    try:
+        max_parts_per_rack = int(options['max_parts_per_rack']) if options.get('max_parts_per_rack') else None
+        costs = {name: float(options[f'{name}_cost']) for name in ('hoist', 'tank') if options.get(f'{name}_cost')}
+    except (TypeError, ValueError):
+        return Response({'error': 'max_parts_per_rack must be an integer and costs must be numbers'},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    from .budget import goal_seek_costs
+    from .services import ProductionSimulator, goal_seek as seek_goal, apply_goal_seek
+
+    # Costs not given fall back to the project's budget, then to the defaults
+    costs = {**goal_seek_costs(project), **costs}
+    simulator = ProductionSimulator(project_id)
+    result = seek_goal(simulator, max_parts_per_rack=max_parts_per_rack, costs=costs)
+    if "error" in result:
+        return Response(result, status=status.HTTP_400_BAD_REQUEST)
+
+    if request.method == 'POST':
+        if not result['feasible']:
+            return Response(result, status=status.HTTP_400_BAD_REQUEST)
+        apply_goal_seek(simulator, result['best'])
+        result['applied'] = True
+    return Response(result)
+
+
+@api_view(['GET'])
+def sensitivity_analysis(request, project_id):
+    """
+    Throughput swing from every recipe step and timing parameter, ranked
+    for a tornado chart: ?pct=10&hoists=N&limit=25
+    """
+    try:
+        project = Projects.objects.get(project_id=project_id)
+    except Projects.DoesNotExist:
+        return Response({'error': 'Project not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    try:
+        pct = float(request.query_params.get('pct', 10))
+        hoist_count = request.query_params.get('hoists')
+        hoist_count = int(hoist_count) if hoist_count else None
+        limit = request.query_params.get('limit')
+        limit = int(limit) if limit else None
+    except ValueError:
+        return Response({'error': 'pct must be a number; hoists and limit must be integers'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    if not 0 < pct < 100:
+        return Response({'error': 'pct must be between 0 and 100'}, status=status.HTTP_400_BAD_REQUEST)
+
+    from .services import ProductionSimulator
+    from .sensitivity import SensitivityAnalysis
+
+    simulator = ProductionSimulator(project_id)
+    check = simulator.calculate_throughput(hoist_count=hoist_count)
+    if "error" in check:
+        return Response(check, status=status.HTTP_400_BAD_REQUEST)
+    analysis = SensitivityAnalysis(simulator, hoist_count=hoist_count, fraction=pct / 100)
+    return Response(analysis.run(limit=limit))
+
+
+@api_view(['GET'])
+def time_based_simulation(request, project_id):
+    """
+    Discrete-event run of the line from empty, with warm-up detection.
+    Options: hoists, shift_hours, tolerance (relative CI half-width),
+    variability (load / unload coefficient of variation), seed, max_bars
+    """
+    try:
+        project = Projects.objects.get(project_id=project_id)
+    except Projects.DoesNotExist:
+        return Response({'error': 'Project not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    options = request.query_params
+    try:
+        hoist_count = int(options['hoists']) if options.get('hoists') else None
+        shift_hours = float(options['shift_hours']) if options.get('shift_hours') else None
+        tolerance = float(options.get('tolerance', 0.02))
+        variability = float(options.get('variability', 0))
+        seed = int(options.get('seed', 0))
+        max_bars = min(int(options.get('max_bars', 5000)), 20000)
+    except ValueError:
+        return Response({'error': 'hoists, seed and max_bars must be integers; '
+                                  'shift_hours, tolerance and variability must be numbers'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    if tolerance <= 0 or variability < 0 or max_bars <= 0:
+        return Response({'error': 'tolerance and max_bars must be positive and variability non-negative'},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    from .services import ProductionSimulator
+    from .simulation_engine import time_based_simulation as simulate_line
+
+    result, _ = simulate_line(ProductionSimulator(project_id), hoist_count=hoist_count, shift_hours=shift_hours,
+                              tolerance=tolerance, max_bars=max_bars, variability=variability, seed=seed)
+    if "error" in result:
+        return Response(result, status=status.HTTP_400_BAD_REQUEST)
+    return Response(result)
+
+
+@api_view(['GET'])
+def simulation_timeline(request, project_id):
+    """
+    Hoist / tank Gantt rows from the time-based engine, run-length encoded
+    at the requested pixel width: ?width=1000&hours=8&start=0&hoists=N
+    """
+    try:
+        project = Projects.objects.get(project_id=project_id)
+    except Projects.DoesNotExist:
+        return Response({'error': 'Project not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    options = request.query_params
+    try:
+        width = int(options.get('width', 1000))
+        hours = float(options['hours']) if options.get('hours') else None
+        start_hours = float(options.get('start', 0))
+        hoist_count = int(options['hoists']) if options.get('hoists') else None
+        variability = float(options.get('variability', 0))
+        seed = int(options.get('seed', 0))
+    except ValueError:
+        return Response({'error': 'width, hoists and seed must be integers; '
+                                  'hours, start and variability must be numbers'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    if width <= 0 or variability < 0 or (hours is not None and not 0 < hours <= 24 * 7):
+        return Response({'error': 'width must be positive, hours between 0 and one week '
+                                  'and variability non-negative'},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    from .services import ProductionSimulator
+    from .timeline import line_timeline
+
+    result = line_timeline(ProductionSimulator(project_id), width=width, hours=hours, start_hours=start_hours,
+                           hoist_count=hoist_count, variability=variability, seed=seed)
+    if "error" in result:
+        return Response(result, status=status.HTTP_400_BAD_REQUEST)
+    return Response(result)
+
+
+@api_view(['GET'])
+def compare_simulations(request, project_id):
+    """
+    Compare saved simulation runs: ?ids=12,15,20 (first id is the baseline)
+    """
+    try:
+        project = Projects.objects.get(project_id=project_id)
+    except Projects.DoesNotExist:
+        return Response({'error': 'Project not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    try:
+        run_ids = [int(run_id) for run_id in request.query_params.get('ids', '').split(',') if run_id.strip()]
+    except ValueError:
+        return Response({'error': 'ids must be a comma-separated list of simulation result IDs'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    run_ids = list(dict.fromkeys(run_ids))
+    if not run_ids:
+        return Response({'error': 'Provide at least one simulation result ID in ids'},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    from .services import compare_simulation_results
+    try:
+        return Response(compare_simulation_results(project, run_ids))
+    except SimulationResult.DoesNotExist as e:
+        return Response({'error': str(e)}, status=status.HTTP_404_NOT_FOUND)
+
+
+@api_view(['GET'])
+def simulation_trends(request, project_id):
+    """
+    Bucketed min/max/mean of simulation history: ?bucket=day|week
+    """
+    try:
+        project = Projects.objects.get(project_id=project_id)
+    except Projects.DoesNotExist:
+        return Response({'error': 'Project not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    from .services import simulation_trends as build_trends
+    try:
+        return Response(build_trends(project, request.query_params.get('bucket', 'day')))
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
 # ---- Station views ----
 
 @api_view(['GET', 'POST', 'PUT', 'DELETE'])
+@renderer_classes(LIST_RENDERERS)
 def stations(request, project_id):
     try:
         project = Projects.objects.get(project_id=project_id)
@@ -565,9 +925,8 @@ def stations(request, project_id):
         return Response(status=status.HTTP_404_NOT_FOUND)
 
     if request.method == 'GET':
-        qs = Station.objects.filter(project=project)
-        serializer = StationSerializer(qs, many=True)
-        return Response(serializer.data)
+        from .serializers import STATION_VALUES
+        return Response(STATION_VALUES.data(Station.objects.filter(project=project)))
 
     elif request.method == 'POST':
         request.data['project'] = project.id
@@ -599,9 +958,124 @@ def stations(request, project_id):
             return Response({"error": "Station not found"}, status=status.HTTP_404_NOT_FOUND)
 
 
+
+# ---- Part geometry / plating views ----
+
+@api_view(['GET', 'POST', 'PUT', 'DELETE'])
+def part_sizes(request, project_id):
+    try:
+        project = Projects.objects.get(project_id=project_id)
+    except Projects.DoesNotExist:
+        return Response(status=status.HTTP_404_NOT_FOUND)
+
+    if request.method == 'GET':
+        qs = Part_Size.objects.filter(project=project)
+        serializer = PartSizeSerializer(qs, many=True)
+        return Response(serializer.data)
+
+    elif request.method == 'POST':
+        request.data['project'] = project.id
+        serializer = PartSizeSerializer(data=request.data)
+        if serializer.is_valid():
+            serializer.save()
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    elif request.method == 'PUT':
+        try:
+            entry_id = request.data.get('id')
+            part_size = Part_Size.objects.get(id=entry_id, project=project)
+            serializer = PartSizeSerializer(part_size, data=request.data, partial=True)
+            if serializer.is_valid():
+                serializer.save()
+                return Response(serializer.data)
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        except Part_Size.DoesNotExist:
+            return Response({"error": "Part size not found"}, status=status.HTTP_404_NOT_FOUND)
+
+    elif request.method == 'DELETE':
+        try:
+            entry_id = request.data.get('id')
+            part_size = Part_Size.objects.get(id=entry_id, project=project)
+            part_size.delete()
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        except Part_Size.DoesNotExist:
+            return Response({"error": "Part size not found"}, status=status.HTTP_404_NOT_FOUND)
+
+
+@api_view(['GET'])
+def elements(request):
+    serializer = ElementSerializer(Element.objects.all(), many=True)
+    return Response(serializer.data)
+
+
+@api_view(['GET'])
+def rack_packing(request, project_id):
+    """
+    Parts that physically fit on a rack for each recipe's part in its tanks,
+    and the parts per rack the simulation will actually use
+    """
+    try:
+        project = Projects.objects.get(project_id=project_id)
+    except Projects.DoesNotExist:
+        return Response(status=status.HTTP_404_NOT_FOUND)
+
+    from .services import ProductionSimulator
+
+    simulator = ProductionSimulator(project_id)
+    recipes = []
+    for recipe in simulator.recipes:
+        capacity = simulator.rack_capacities.get(recipe.id)
+        recipes.append({
+            'recipe_id': recipe.id,
+            'recipe_name': recipe.name,
+            'parts_per_rack': simulator.recipe_parts_per_rack(recipe),
+            'rack_limited': bool(capacity and capacity['max_parts_per_rack'] < (simulator.params.parts_per_rack or 1)),
+            'packing': capacity,
+        })
+    return Response({
+        'requested_parts_per_rack': simulator.params.parts_per_rack or 1,
+        'effective_parts_per_rack': round(simulator.parts_per_rack(), 2),
+        'part_spacing': simulator.params.part_spacing,
+        'recipes': recipes,
+    })
+
+
+@api_view(['GET', 'POST'])
+def plating_dwell_times(request, project_id):
+    """
+    Dwell times derived from target thickness and current density for every
+    plating step. GET previews; POST saves them (optionally ?recipe=ID).
+    """
+    try:
+        project = Projects.objects.get(project_id=project_id)
+    except Projects.DoesNotExist:
+        return Response(status=status.HTTP_404_NOT_FOUND)
+
+    recipe_id = request.query_params.get('recipe')
+    try:
+        recipe_ids = [int(recipe_id)] if recipe_id else None
+    except ValueError:
+        return Response({'error': 'recipe must be a recipe ID'}, status=status.HTTP_400_BAD_REQUEST)
+
+    from .plating import plating_dwell_times as compute_dwell_times, apply_plating_dwell_times
+
+    if request.method == 'POST':
+        rows = apply_plating_dwell_times(project, recipe_ids=recipe_ids)
+    else:
+        _, rows = compute_dwell_times(project, recipe_ids=recipe_ids)
+    return Response({'steps': rows, 'computed': sum(1 for row in rows if 'dwell_time' in row)})
+
+
 # ---- Recipe views ----
 
+def recipe_queryset(project):
+    """Recipes of a project with their step counts annotated, for the recipe serializers."""
+    return Recipe.objects.filter(project=project).annotate(step_count=Count('steps'))
+
+
 @api_view(['GET', 'POST'])
+@renderer_classes(LIST_RENDERERS)
 def recipes(request, project_id):
     try:
         project = Projects.objects.get(project_id=project_id)
@@ -609,8 +1083,7 @@ def recipes(request, project_id):
         return Response(status=status.HTTP_404_NOT_FOUND)
 
     if request.method == 'GET':
-        qs = Recipe.objects.filter(project=project).prefetch_related('steps')
-        serializer = RecipeListSerializer(qs, many=True)
+        serializer = RecipeListSerializer(recipe_queryset(project), many=True)
         return Response(serializer.data)
 
     elif request.method == 'POST':
@@ -623,22 +1096,28 @@ def recipes(request, project_id):
 
 
 @api_view(['GET', 'PUT', 'DELETE'])
+@renderer_classes(LIST_RENDERERS)
 def recipe_detail(request, project_id, recipe_id):
     try:
         project = Projects.objects.get(project_id=project_id)
     except Projects.DoesNotExist:
         return Response(status=status.HTTP_404_NOT_FOUND)
 
+    if request.method == 'GET':
+        # The recipe and its steps as RecipeSerializer gives them, read straight from the rows
+        from .serializers import recipe_tree
+        tree = recipe_tree(recipe_queryset(project).filter(id=recipe_id))
+        if tree is None:
+            return Response({"error": "Recipe not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(tree)
+
     try:
-        recipe = Recipe.objects.prefetch_related('steps__station').get(id=recipe_id, project=project)
+        recipe = recipe_queryset(project).prefetch_related(
+            Prefetch('steps', queryset=RecipeStep.objects.select_related('station'))).get(id=recipe_id)
     except Recipe.DoesNotExist:
         return Response({"error": "Recipe not found"}, status=status.HTTP_404_NOT_FOUND)
 
-    if request.method == 'GET':
-        serializer = RecipeSerializer(recipe)
-        return Response(serializer.data)
-
-    elif request.method == 'PUT':
+    if request.method == 'PUT':
         serializer = RecipeSerializer(recipe, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
@@ -651,6 +1130,7 @@ def recipe_detail(request, project_id, recipe_id):
 
 
 @api_view(['GET', 'POST', 'PUT', 'DELETE'])
+@renderer_classes(LIST_RENDERERS)
 def recipe_steps(request, project_id, recipe_id):
     try:
         project = Projects.objects.get(project_id=project_id)
@@ -663,9 +1143,8 @@ def recipe_steps(request, project_id, recipe_id):
         return Response({"error": "Recipe not found"}, status=status.HTTP_404_NOT_FOUND)
 
     if request.method == 'GET':
-        qs = RecipeStep.objects.filter(recipe=recipe).select_related('station')
-        serializer = RecipeStepSerializer(qs, many=True)
-        return Response(serializer.data)
+        from .serializers import RECIPE_STEP_VALUES
+        return Response(RECIPE_STEP_VALUES.data(RecipeStep.objects.filter(recipe=recipe)))
 
     elif request.method == 'POST':
         request.data['recipe'] = recipe.id
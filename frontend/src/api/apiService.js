@@ -85,44 +85,118 @@ export const createCustomer = async (customerData) => {
 };
 
 // File upload functions
-export const uploadSpecDocument = async (projectId, file) => {
-  const formData = new FormData();
-  formData.append('spec_document', file);
-  
-  try {
-    const response = await axios.post(
-      `${API_URL}/projects/${projectId}/upload-spec/`,
-      formData,
-      {
-        headers: {
-          'Content-Type': 'multipart/form-data',
-        },
-      }
-    );
+// Files are sent in chunks to a resumable upload session, so a dropped
+// connection only repeats the chunk in flight. Files small enough to hash in
+// the browser send their SHA-256 first; if the server already has the same
+// content the upload completes without sending any bytes.
+const MAX_CHUNK_RETRIES = 3;
+const MAX_HASHED_FILE_SIZE = 64 * 1024 * 1024;
+
+const sha256Hex = async (file) => {
+  if (!window.crypto?.subtle || file.size > MAX_HASHED_FILE_SIZE) {
+    return undefined;
+  }
+  const digest = await window.crypto.subtle.digest('SHA-256', await file.arrayBuffer());
+  return Array.from(new Uint8Array(digest), (b) => b.toString(16).padStart(2, '0')).join('');
+};
+
+export const startUpload = async (projectId, field, file) => {
+  try {
+    const response = await apiClient.post(`/projects/${projectId}/uploads/`, {
+      field,
+      filename: file.name,
+      total_size: file.size,
+      sha256: await sha256Hex(file),
+    });
     return response.data;
   } catch (error) {
-    console.error('Error uploading spec document:', error);
+    console.error('Error starting upload:', error);
     throw error;
   }
 };
 
-export const uploadSketch = async (projectId, file) => {
-  const formData = new FormData();
-  formData.append('sketch', file);
-  
+export const getUploadSession = async (projectId, uploadId) => {
+  try {
+    const response = await apiClient.get(`/projects/${projectId}/uploads/${uploadId}/`);
+    return response.data;
+  } catch (error) {
+    console.error('Error fetching upload session:', error);
+    throw error;
+  }
+};
+
+export const uploadChunk = async (projectId, uploadId, file, start, end) => {
+  const response = await apiClient.put(
+    `/projects/${projectId}/uploads/${uploadId}/`,
+    file.slice(start, end),
+    {
+      headers: {
+        'Content-Type': 'application/octet-stream',
+        'Content-Range': `bytes ${start}-${end - 1}/${file.size}`,
+      },
+    }
+  );
+  return response.data;
+};
+
+export const abortUpload = async (projectId, uploadId) => {
   try {
-    const response = await axios.post(
-      `${API_URL}/projects/${projectId}/upload-sketch/`,
-      formData,
-      {
-        headers: {
-          'Content-Type': 'multipart/form-data',
-        },
+    await apiClient.delete(`/projects/${projectId}/uploads/${uploadId}/`);
+  } catch (error) {
+    console.error('Error aborting upload:', error);
+    throw error;
+  }
+};
+
+export const uploadDocument = async (projectId, field, file, onProgress) => {
+  try {
+    let session = await startUpload(projectId, field, file);
+    const chunkSize = session.chunk_size;
+    let retries = 0;
+    while (session.status === 'pending') {
+      const start = session.received_bytes;
+      try {
+        session = await uploadChunk(projectId, session.id, file, start, Math.min(start + chunkSize, file.size));
+        retries = 0;
+      } catch (error) {
+        if (++retries > MAX_CHUNK_RETRIES) {
+          throw error;
+        }
+        // Resume from whatever the server has stored
+        session = await getUploadSession(projectId, session.id);
       }
+      if (onProgress) {
+        onProgress(session.received_bytes / session.total_size);
+      }
+    }
+    return { file_path: session.file_path };
+  } catch (error) {
+    console.error(`Error uploading ${field}:`, error);
+    throw error;
+  }
+};
+
+export const uploadSpecDocument = async (projectId, file, onProgress) => {
+  return uploadDocument(projectId, 'spec_document', file, onProgress);
+};
+
+export const uploadSketch = async (projectId, file, onProgress) => {
+  return uploadDocument(projectId, 'sketch', file, onProgress);
+};
+
+// Preview status per document field; ready previews get an absolute image URL
+export const getDocumentPreviews = async (projectId) => {
+  try {
+    const response = await apiClient.get(`/projects/${projectId}/previews/`);
+    const origin = new URL(API_URL).origin;
+    return Object.fromEntries(
+      Object.entries(response.data).map(([field, preview]) => [
+        field,
+        preview && preview.url ? { ...preview, url: `${origin}${preview.url}` } : preview,
+      ])
     );
-    return response.data;
   } catch (error) {
-    console.error('Error uploading sketch:', error);
+    console.error('Error fetching document previews:', error);
     throw error;
   }
 };
@@ -148,6 +222,26 @@ export const updateProductionGoal = async (projectId, goalData) => {
   }
 };
 
+export const getProductionCalendar = async (projectId) => {
+  try {
+    const response = await apiClient.get(`/projects/${projectId}/production-calendar/`);
+    return response.data;
+  } catch (error) {
+    console.error(`Error fetching production calendar for project ${projectId}:`, error);
+    throw error;
+  }
+};
+
+export const updateProductionCalendar = async (projectId, calendarData) => {
+  try {
+    const response = await apiClient.put(`/projects/${projectId}/production-calendar/`, calendarData);
+    return response.data;
+  } catch (error) {
+    console.error(`Error updating production calendar:`, error);
+    throw error;
+  }
+};
+
 // Simulation Parameters API functions
 export const getSimulationParameters = async (projectId) => {
   try {
@@ -194,9 +288,12 @@ export const runSimulation = async (projectId, options = {}) => {
   }
 };
 
-export const getSimulationResults = async (projectId) => {
+// options.summary: omit the per-station and per-recipe breakdowns (much faster for long histories)
+export const getSimulationResults = async (projectId, options = {}) => {
   try {
-    const response = await apiClient.get(`/projects/${projectId}/simulation/run/`);
+    const response = await apiClient.get(`/projects/${projectId}/simulation/run/`, {
+      params: options.summary ? { summary: 1 } : {},
+    });
     return response.data;
   } catch (error) {
     console.error(`Error fetching simulation results:`, error);
@@ -204,6 +301,100 @@ export const getSimulationResults = async (projectId) => {
   }
 };
 
+export const getRecipeSequence = async (projectId, options = {}) => {
+  try {
+    const response = await apiClient.get(`/projects/${projectId}/simulation/sequence/`, {
+      params: options
+    });
+    return response.data;
+  } catch (error) {
+    console.error(`Error optimizing recipe sequence:`, error);
+    throw error;
+  }
+};
+
+export const previewGoalSeek = async (projectId, options = {}) => {
+  try {
+    const response = await apiClient.get(`/projects/${projectId}/simulation/goal-seek/`, {
+      params: options
+    });
+    return response.data;
+  } catch (error) {
+    console.error(`Error running goal seek:`, error);
+    throw error;
+  }
+};
+
+export const applyGoalSeek = async (projectId, options = {}) => {
+  try {
+    const response = await apiClient.post(`/projects/${projectId}/simulation/goal-seek/`, options);
+    return response.data;
+  } catch (error) {
+    console.error(`Error applying goal seek:`, error);
+    throw error;
+  }
+};
+
+export const getSensitivityAnalysis = async (projectId, options = {}) => {
+  try {
+    const response = await apiClient.get(`/projects/${projectId}/simulation/sensitivity/`, {
+      params: options
+    });
+    return response.data;
+  } catch (error) {
+    console.error(`Error running sensitivity analysis:`, error);
+    throw error;
+  }
+};
+
+export const runTimeBasedSimulation = async (projectId, options = {}) => {
+  try {
+    const response = await apiClient.get(`/projects/${projectId}/simulation/time-based/`, {
+      params: options
+    });
+    return response.data;
+  } catch (error) {
+    console.error(`Error running time-based simulation:`, error);
+    throw error;
+  }
+};
+
+export const getSimulationTimeline = async (projectId, options = {}) => {
+  try {
+    const response = await apiClient.get(`/projects/${projectId}/simulation/timeline/`, {
+      params: options
+    });
+    return response.data;
+  } catch (error) {
+    console.error(`Error fetching simulation timeline:`, error);
+    throw error;
+  }
+};
+
+export const compareSimulationResults = async (projectId, resultIds) => {
+  try {
+    const response = await apiClient.get(`/projects/${projectId}/simulation/compare/`, {
+      params: { ids: resultIds.join(',') }
+    });
+    return response.data;
+  } catch (error) {
+    console.error(`Error comparing simulation results:`, error);
+    throw error;
+  }
+};
+
+export const getSimulationTrends = async (projectId, bucket = 'day') => {
+  try {
+    const response = await apiClient.get(`/projects/${projectId}/simulation/trends/`, {
+      params: { bucket }
+    });
+    return response.data;
+  } catch (error) {
+    console.error(`Error fetching simulation trends:`, error);
+    throw error;
+  }
+};
+
 // ---- Station API functions ----
 
 export const fetchStations = async (projectId) => {
@@ -342,4 +533,225 @@ export const deleteRecipeStep = async (projectId, recipeId, stepId) => {
     console.error('Error deleting recipe step:', error);
     throw error;
   }
-};
\ No newline at end of file
+};
+// ---- Part geometry / plating API functions ----
+
+export const fetchPartSizes = async (projectId) => {
+  try {
+    const response = await apiClient.get(`/projects/${projectId}/part-sizes/`);
+    return response.data;
+  } catch (error) {
+    console.error(`Error fetching part sizes for project ${projectId}:`, error);
+    throw error;
+  }
+};
+
+export const createPartSize = async (projectId, partSizeData) => {
+  try {
+    const response = await apiClient.post(`/projects/${projectId}/part-sizes/`, partSizeData);
+    return response.data;
+  } catch (error) {
+    console.error('Error creating part size:', error);
+    throw error;
+  }
+};
+
+export const updatePartSize = async (projectId, partSizeData) => {
+  try {
+    const response = await apiClient.put(`/projects/${projectId}/part-sizes/`, partSizeData);
+    return response.data;
+  } catch (error) {
+    console.error('Error updating part size:', error);
+    throw error;
+  }
+};
+
+export const deletePartSize = async (projectId, partSizeId) => {
+  try {
+    const response = await apiClient.delete(`/projects/${projectId}/part-sizes/`, {
+      data: { id: partSizeId }
+    });
+    return response.data;
+  } catch (error) {
+    console.error('Error deleting part size:', error);
+    throw error;
+  }
+};
+
+export const fetchElements = async () => {
+  try {
+    const response = await apiClient.get(`/elements/`);
+    return response.data;
+  } catch (error) {
+    console.error('Error fetching elements:', error);
+    throw error;
+  }
+};
+
+export const previewPlatingDwellTimes = async (projectId) => {
+  try {
+    const response = await apiClient.get(`/projects/${projectId}/plating/dwell-times/`);
+    return response.data;
+  } catch (error) {
+    console.error('Error computing plating dwell times:', error);
+    throw error;
+  }
+};
+
+export const applyPlatingDwellTimes = async (projectId) => {
+  try {
+    const response = await apiClient.post(`/projects/${projectId}/plating/dwell-times/`);
+    return response.data;
+  } catch (error) {
+    console.error('Error applying plating dwell times:', error);
+    throw error;
+  }
+};
+
+export const getRackPacking = async (projectId) => {
+  try {
+    const response = await apiClient.get(`/projects/${projectId}/rack-packing/`);
+    return response.data;
+  } catch (error) {
+    console.error('Error computing rack packing:', error);
+    throw error;
+  }
+};
+
+// ---- Process matrix API functions ----
+
+// Sparse (coordinate form) matrix; filters: { station, recipe, parameter } as comma-separated lists
+export const getProcessMatrix = async (projectId, filters = {}) => {
+  try {
+    const response = await apiClient.get(`/projects/${projectId}/process-matrix/`, { params: filters });
+    return response.data;
+  } catch (error) {
+    console.error('Error fetching process matrix:', error);
+    throw error;
+  }
+};
+
+export const deriveProcessMatrix = async (projectId, overwrite = false) => {
+  try {
+    const response = await apiClient.post(`/projects/${projectId}/process-matrix/`, { overwrite });
+    return response.data;
+  } catch (error) {
+    console.error('Error deriving process matrix:', error);
+    throw error;
+  }
+};
+
+// entries: [{ station, recipe (null for station-wide), parameter, value, text_value, unit }]
+export const updateProcessMatrix = async (projectId, entries) => {
+  try {
+    const response = await apiClient.put(`/projects/${projectId}/process-matrix/`, { entries });
+    return response.data;
+  } catch (error) {
+    console.error('Error updating process matrix:', error);
+    throw error;
+  }
+};
+
+// ---- Controls matrix API functions ----
+
+export const getControlsMatrix = async (projectId) => {
+  try {
+    const response = await apiClient.get(`/projects/${projectId}/controls-matrix/`);
+    return response.data;
+  } catch (error) {
+    console.error('Error fetching controls matrix:', error);
+    throw error;
+  }
+};
+
+export const regenerateControlsMatrix = async (projectId) => {
+  try {
+    const response = await apiClient.post(`/projects/${projectId}/controls-matrix/`);
+    return response.data;
+  } catch (error) {
+    console.error('Error regenerating controls matrix:', error);
+    throw error;
+  }
+};
+
+// points: [{ tag, device, io_type, quantity (0 removes), station_number, description }]
+export const updateControlPoints = async (projectId, points) => {
+  try {
+    const response = await apiClient.put(`/projects/${projectId}/controls-matrix/`, { points });
+    return response.data;
+  } catch (error) {
+    console.error('Error updating control points:', error);
+    throw error;
+  }
+};
+
+// ---- Budget API functions ----
+
+export const getBudget = async (projectId) => {
+  try {
+    const response = await apiClient.get(`/projects/${projectId}/budget/`);
+    return response.data;
+  } catch (error) {
+    console.error('Error fetching budget:', error);
+    throw error;
+  }
+};
+
+export const rebuildBudget = async (projectId) => {
+  try {
+    const response = await apiClient.post(`/projects/${projectId}/budget/`);
+    return response.data;
+  } catch (error) {
+    console.error('Error rebuilding budget:', error);
+    throw error;
+  }
+};
+
+// costs: any of tank_base_cost, tank_cost_per_m3, tank_depth, hoist_cost, shuttle_cost,
+// rectifier_base_cost, rectifier_cost_per_amp, control_point_cost, contingency_pct
+export const updateBudget = async (projectId, costs) => {
+  try {
+    const response = await apiClient.put(`/projects/${projectId}/budget/`, costs);
+    return response.data;
+  } catch (error) {
+    console.error('Error updating budget:', error);
+    throw error;
+  }
+};
+
+// ---- Quote API functions ----
+
+// Returns { quote, current }: the latest quote and whether it matches the project as it stands
+export const getQuote = async (projectId) => {
+  try {
+    const response = await apiClient.get(`/projects/${projectId}/quote/`);
+    return response.data;
+  } catch (error) {
+    console.error('Error fetching quote:', error);
+    throw error;
+  }
+};
+
+// Status 202 means the quote is being generated; poll getQuote until it is ready
+export const generateQuote = async (projectId, force = false) => {
+  try {
+    const response = await apiClient.post(`/projects/${projectId}/quote/`, { force });
+    return response.data;
+  } catch (error) {
+    console.error('Error generating quote:', error);
+    throw error;
+  }
+};
+
+export const downloadQuote = async (projectId, quoteId) => {
+  try {
+    const response = await apiClient.get(`/projects/${projectId}/quote/`, {
+      params: { download: quoteId },
+      responseType: 'blob',
+    });
+    return response.data;
+  } catch (error) {
+    console.error('Error downloading quote:', error);
+    throw error;
+  }
+};
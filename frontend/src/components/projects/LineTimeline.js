@@ -0,0 +1,125 @@
+// src/components/projects/LineTimeline.js
+import React, { useState } from 'react';
+import { getSimulationTimeline } from '../../api/apiService';
+import { FontAwesomeIcon } from '@fortawesome/react-fontawesome';
+import { faClock } from '@fortawesome/free-solid-svg-icons';
+
+const ROW_HEIGHT = 18;
+const LABEL_WIDTH = 80;
+const CHART_WIDTH = 800;
+
+// Colours per legend state; index 0 (idle) is left blank
+const STATE_COLORS = {
+  hoist: { empty: '#ffc658', carry: '#8884d8' },
+  tank: { treat: '#82ca9d', blocked: '#ff7f7f' },
+};
+
+// Expand one run-length encoded row into SVG rects, skipping idle runs
+const renderRow = (resource, legend, y) => {
+  const rects = [];
+  let x = 0;
+  resource.values.forEach((value, i) => {
+    const run = resource.runs[i];
+    const state = legend[resource.kind][value];
+    const color = STATE_COLORS[resource.kind][state];
+    if (color) {
+      rects.push(
+        <rect key={i} x={LABEL_WIDTH + x} y={y + 2} width={run} height={ROW_HEIGHT - 4} fill={color}>
+          <title>{`${resource.label}: ${state}`}</title>
+        </rect>
+      );
+    }
+    x += run;
+  });
+  return rects;
+};
+
+const LineTimeline = ({ projectId }) => {
+  const [timeline, setTimeline] = useState(null);
+  const [hours, setHours] = useState('');
+  const [loading, setLoading] = useState(false);
+  const [error, setError] = useState(null);
+
+  const loadTimeline = async () => {
+    setLoading(true);
+    try {
+      const options = { width: CHART_WIDTH };
+      if (hours) {
+        options.hours = hours;
+      }
+      setTimeline(await getSimulationTimeline(projectId, options));
+      setError(null);
+    } catch (err) {
+      setError(err.response?.data?.error || 'Error loading the line timeline.');
+    } finally {
+      setLoading(false);
+    }
+  };
+
+  return (
+    <div className="card mb-4">
+      <div className="card-header bg-light">
+        <h5 className="mb-0">
+          <FontAwesomeIcon icon={faClock} className="me-2" />
+          Hoist &amp; Tank Timeline
+        </h5>
+      </div>
+      <div className="card-body">
+        <div className="d-flex align-items-end mb-3">
+          <div className="me-2">
+            <label htmlFor="timelineHours" className="form-label">Hours (default: one shift)</label>
+            <input
+              type="number"
+              className="form-control"
+              id="timelineHours"
+              min="0.1"
+              step="0.5"
+              value={hours}
+              onChange={(e) => setHours(e.target.value)}
+            />
+          </div>
+          <button className="btn btn-outline-primary" onClick={loadTimeline} disabled={loading}>
+            {loading ? <span className="spinner-border spinner-border-sm" role="status"></span> : 'Show Timeline'}
+          </button>
+        </div>
+
+        {error && <div className="alert alert-danger">{error}</div>}
+
+        {timeline && (
+          <>
+            <p className="text-muted mb-2">
+              <small>
+                {timeline.moves} hoist moves, {timeline.bars_completed} flight bars completed in{' '}
+                {(timeline.end - timeline.start) / 3600} h ({timeline.pixel_seconds} s per pixel)
+              </small>
+            </p>
+            <div style={{ overflowX: 'auto' }}>
+              <svg width={LABEL_WIDTH + timeline.width} height={timeline.resources.length * ROW_HEIGHT}>
+                {timeline.resources.map((resource, row) => (
+                  <g key={`${resource.kind}-${resource.label}`}>
+                    <text x={0} y={row * ROW_HEIGHT + ROW_HEIGHT - 5} fontSize="11">
+                      {resource.label}
+                    </text>
+                    {renderRow(resource, timeline.legend, row * ROW_HEIGHT)}
+                  </g>
+                ))}
+              </svg>
+            </div>
+            <div className="mt-2">
+              {Object.entries(STATE_COLORS).flatMap(([kind, states]) =>
+                Object.entries(states).map(([state, color]) => (
+                  <span key={`${kind}-${state}`} className="me-3">
+                    <span style={{ display: 'inline-block', width: 12, height: 12, background: color }} className="me-1"></span>
+                    <small>{kind} {state}</small>
+                  </span>
+                ))
+              )}
+            </div>
+          </>
+        )}
+      </div>
+    </div>
+  );
+};
+
+export default LineTimeline;
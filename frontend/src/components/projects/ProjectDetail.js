@@ -1,7 +1,10 @@
 // src/components/projects/ProjectDetail.js
 import React, { useState, useEffect } from 'react';
 import { useParams, Link, useNavigate } from 'react-router-dom';
-import { fetchProjectById, uploadSpecDocument, uploadSketch } from '../../api/apiService';
+import { fetchProjectById, uploadSpecDocument, uploadSketch, getDocumentPreviews } from '../../api/apiService';
+
+const PREVIEW_POLL_MS = 2000;
+const PREVIEW_POLL_LIMIT = 15;
 
 const ProjectDetail = () => {
   const { projectId } = useParams();
@@ -14,6 +17,7 @@ const ProjectDetail = () => {
     specDocument: { loading: false, error: null, success: false },
     sketch: { loading: false, error: null, success: false },
   });
+  const [previews, setPreviews] = useState({});
 
   useEffect(() => {
     const getProjectDetails = async () => {
@@ -30,6 +34,45 @@ const ProjectDetail = () => {
     getProjectDetails();
   }, [projectId]);
 
+  // Previews render in the background; poll while any are pending
+  useEffect(() => {
+    if (!project) return undefined;
+    let cancelled = false;
+    let timer = null;
+    let polls = 0;
+
+    const loadPreviews = async () => {
+      try {
+        const data = await getDocumentPreviews(projectId);
+        if (cancelled) return;
+        setPreviews(data);
+        const pending = Object.values(data).some((preview) => preview && preview.status === 'pending');
+        if (pending && ++polls < PREVIEW_POLL_LIMIT) {
+          timer = setTimeout(loadPreviews, PREVIEW_POLL_MS);
+        }
+      } catch (err) {
+        // Previews are optional; the download links still work
+      }
+    };
+
+    loadPreviews();
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [projectId, project]);
+
+  const renderPreview = (preview, alt) => {
+    if (!preview) return null;
+    if (preview.status === 'ready') {
+      return <img src={preview.url} alt={alt} className="img-fluid img-thumbnail mb-2" loading="lazy" />;
+    }
+    if (preview.status === 'pending') {
+      return <p className="text-muted"><small>Generating preview...</small></p>;
+    }
+    return null;
+  };
+
   const handleSpecUpload = async (e) => {
     const file = e.target.files[0];
     if (!file) return;
@@ -142,6 +185,7 @@ const ProjectDetail = () => {
             <div className="card-body">
               {project.spec_document ? (
                 <div>
+                  {renderPreview(previews.spec_document, 'Specification document first page')}
                   <p>Current document: {project.spec_document}</p>
                   <a href={project.spec_document} className="btn btn-sm btn-info" target="_blank" rel="noopener noreferrer">
                     View Document
@@ -191,6 +235,7 @@ const ProjectDetail = () => {
             <div className="card-body">
               {project.sketch ? (
                 <div>
+                  {renderPreview(previews.sketch, 'Sales sketch preview')}
                   <p>Current sketch: {project.sketch}</p>
                   <a href={project.sketch} className="btn btn-sm btn-info" target="_blank" rel="noopener noreferrer">
                     View Sketch
@@ -6,6 +6,7 @@ import { fetchProjectById, fetchStations, fetchRecipes, getProductionGoal, updat
 import { LineChart, Line, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer, BarChart, Bar } from 'recharts';
 import { FontAwesomeIcon } from '@fortawesome/react-fontawesome';
 import { faPlay, faSave, faArrowLeft, faChartLine } from '@fortawesome/free-solid-svg-icons';
+import LineTimeline from './LineTimeline';
 
 const Simulation = () => {
   const { projectId } = useParams();
@@ -35,8 +36,10 @@ const Simulation = () => {
     hoist_speed_horizontal: 0.5,
     hoist_speed_vertical: 0.2,
     hoist_acceleration: 0.1,
+    lift_height: 0,
     transfer_time: 10,
     parts_per_rack: 1,
+    part_spacing: 0.02,
     working_hours_per_day: 8,
     working_days_per_week: 5,
     part_load_time: 60,
@@ -464,6 +467,19 @@ const Simulation = () => {
                   min="0.1"
                 />
               </div>
+              <div className="mb-3">
+                <label htmlFor="lift_height" className="form-label">Lift Height (m)</label>
+                <input
+                  type="number"
+                  className="form-control"
+                  id="lift_height"
+                  name="lift_height"
+                  value={simulationParams.lift_height}
+                  onChange={handleParamChange}
+                  step="0.1"
+                  min="0"
+                />
+              </div>
               
               <h5 className="card-subtitle mb-3 mt-4">Time Parameters</h5>
               <div className="mb-3">
@@ -517,6 +533,21 @@ const Simulation = () => {
                   min="1"
                 />
               </div>
+
+              <div className="mb-3">
+                <label htmlFor="part_spacing" className="form-label">Part Spacing on Rack (m)</label>
+                <input
+                  type="number"
+                  className="form-control"
+                  id="part_spacing"
+                  name="part_spacing"
+                  value={simulationParams.part_spacing}
+                  onChange={handleParamChange}
+                  min="0"
+                  step="0.005"
+                />
+                <small className="text-muted">Parts per rack is capped by how many parts physically fit in the smallest tank.</small>
+              </div>
               
               <h5 className="card-subtitle mb-3 mt-4">Schedule</h5>
               <div className="mb-3">
@@ -864,6 +895,8 @@ const Simulation = () => {
               )}
             </div>
           </div>
+
+          <LineTimeline projectId={projectId} />
         </div>
       </div>
     </div>
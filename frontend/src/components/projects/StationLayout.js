@@ -25,6 +25,7 @@ const StationLayout = () => {
     tank_length: '0',
     tank_width: '0',
     distance_to_next: '0',
+    parallel_tanks: '1',
     is_loading_station: false,
     is_unloading_station: false,
     notes: '',
@@ -84,6 +85,7 @@ const StationLayout = () => {
       tank_length: station.tank_length || '0',
       tank_width: station.tank_width || '0',
       distance_to_next: station.distance_to_next || '0',
+      parallel_tanks: station.parallel_tanks || '1',
       is_loading_station: station.is_loading_station,
       is_unloading_station: station.is_unloading_station,
       notes: station.notes || '',
@@ -112,6 +114,7 @@ const StationLayout = () => {
       tank_length: '0',
       tank_width: '0',
       distance_to_next: '0',
+      parallel_tanks: '1',
       is_loading_station: false,
       is_unloading_station: false,
       notes: '',
@@ -288,6 +291,11 @@ const StationLayout = () => {
                 <input type="number" className="form-control" id="distance_to_next" name="distance_to_next"
                   value={formData.distance_to_next} onChange={handleChange} step="0.01" />
               </div>
+              <div className="col-md-2">
+                <label htmlFor="parallel_tanks" className="form-label">Parallel Tanks</label>
+                <input type="number" className="form-control" id="parallel_tanks" name="parallel_tanks"
+                  value={formData.parallel_tanks} onChange={handleChange} min="1" step="1" />
+              </div>
               <div className="col-md-2">
                 <div className="form-check mt-4">
                   <input type="checkbox" className="form-check-input" id="is_loading_station" name="is_loading_station"